@@ -0,0 +1,84 @@
+"""脚本包冷加载基准测试
+
+比较首次加载(无上次目录)的耗时:
+- 旧实现: 即使没有可复用的条目也逐层生成每个条目的规范化 JSON,
+  校验期间循环垃圾回收反复遍历新建的模型对象
+- 当前实现: 首次加载直接校验, 加载期间暂停循环垃圾回收
+
+运行: cd src-python && python -m benchmarks.bench_catalog_load
+"""
+
+import json
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+from handyapi.adb.core import ScriptCatalog
+from handyapi.adb.core.scriptCatalog import assign_ids
+from handyapi.adb.models.scriptModel import ScriptPackage
+
+
+def make_package(groups: int, scripts: int, params: int, options: int) -> t.Dict[str, t.Any]:
+    """生成 groups 个分组, 每组 scripts 个脚本, 每个脚本 params 个单选参数"""
+
+    def script(i: int) -> t.Dict[str, t.Any]:
+        return {
+            "name": f"s{i}", "type": "python", "path": f"s{i}.py", "label": f"s{i}",
+            "description": "",
+            "parameters": [
+                {
+                    "name": f"-p{j}", "type": "select", "label": f"p{j}", "description": "",
+                    "options": [{"label": f"o{k}", "value": f"v{k}"} for k in range(options)],
+                }
+                for j in range(params)
+            ],
+        }
+
+    return {
+        "id": 1, "name": "bench", "label": "bench", "description": "",
+        "install": "install.ps1", "python": "python",
+        "scripts": [
+            {
+                "name": f"g{g}", "type": "scriptgroup", "label": f"g{g}", "description": "",
+                "children": [script(i) for i in range(scripts)],
+            }
+            for g in range(groups)
+        ],
+    }
+
+
+def old_load(source: Path) -> ScriptCatalog:
+    """旧的首次加载流程"""
+    data = json.loads(source.read_text(encoding="utf-8"))
+    raw = assign_ids(data["scripts"], data.get("id"))
+    items = ScriptCatalog._merge(raw, {})
+    package = ScriptPackage.model_validate({**data, "scripts": items}, context={"source": source})
+    return ScriptCatalog(package, raw)
+
+
+def best_of(fn: t.Callable[[], t.Any], number: int) -> float:
+    times = []
+    for _ in range(number):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp())
+    print(f"{'scripts':>7} {'size(KB)':>9} {'old(ms)':>10} {'new(ms)':>10}")
+    for groups, scripts, params, options in ((5, 10, 3, 5), (20, 50, 5, 10), (40, 50, 5, 20)):
+        source = tmp / f"package-{groups}-{scripts}.json"
+        source.write_text(json.dumps(make_package(groups, scripts, params, options)))
+        assert old_load(source).paths == ScriptCatalog.load(source).paths
+        number = 20 if groups * scripts < 1000 else 3
+        old = best_of(lambda: old_load(source), number)
+        new = best_of(lambda: ScriptCatalog.load(source), number)
+        print(f"{groups * scripts:>7} {source.stat().st_size // 1024:>9} "
+              f"{old * 1e3:>10.1f} {new * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""python 脚本启动延迟基准测试(仅 POSIX)
+
+比较一个导入常用模块、输出一行后退出的短脚本从启动到退出的耗时:
+- 子进程: ExecutionEngine 以 asyncio.create_subprocess_exec 启动新解释器(当前默认方式)
+- fork 服务器: 预加载模块的 zygote fork 子进程, 以 runpy 执行脚本
+
+计时前先经 ScriptFactory 创建 PythonScript, 以 BaseScript.execute / stop / force_stop
+分别用两种方式跑完整个任务生命周期, 确认 fork 服务器下的输出、HANDY_SCRIPT_LOG_FILE、
+退出码及停止行为与子进程方式一致。
+
+运行: cd src-python && python -m benchmarks.bench_fork_server [次数]
+"""
+
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+from handyapi.adb.core import ExecutionEngine, ForkServerPool, ScriptFactory
+from handyapi.adb.models.scriptModel import ExecuteParam, ScriptInfo
+
+SCRIPT = """\
+import argparse, json, logging, os, subprocess
+parser = argparse.ArgumentParser()
+parser.add_argument("value")
+args = parser.parse_args()
+print(json.dumps({"value": args.value, "log": os.environ.get("HANDY_SCRIPT_LOG_FILE")}))
+"""
+
+LOOP_SCRIPT = """\
+import sys, time
+print("started", flush=True)
+print("to stderr", file=sys.stderr, flush=True)
+try:
+    time.sleep(30)
+except KeyboardInterrupt:
+    print("interrupted", flush=True)
+    raise
+"""
+
+
+def run_task(
+    tmp: Path, name: str, forkservers: t.Optional[ForkServerPool], engine: ExecutionEngine,
+    stop: t.Optional[str] = None,
+) -> t.Tuple[t.Optional[int], str]:
+    """以 PythonScript 执行一次任务(可在输出第一行后停止), 返回退出码与日志"""
+    info = ScriptInfo.model_validate(
+        {"name": name, "type": "python", "path": f"{name}.py", "label": name,
+         "description": "", "parameters": [{"name": "value", "type": "input", "default": "",
+                                             "label": "value", "description": ""}]},
+        context={"source": str(tmp / "package.json")},
+    )
+    log = tmp / f"{name}-{stop}-{forkservers is not None}.log"
+    log.unlink(missing_ok=True)
+    task = ScriptFactory.create_script(info, str(log), engine, 0, sys.executable, forkservers)
+    done = threading.Event()
+    task.on_finish = lambda _: done.set()
+    task.execute(ExecuteParam({"value": "ok"}))
+    if stop is not None:
+        while b"started" not in log.read_bytes():
+            time.sleep(0.01)
+        task.force_stop() if stop == "force" else task.stop()
+    assert done.wait(30), f"{name} did not finish"
+    return task.returncode, log.read_text().replace(str(log), "<log>")
+
+
+def check_lifecycle(tmp: Path, engine: ExecutionEngine, pool: ForkServerPool) -> None:
+    """fork 服务器与子进程方式的任务结果必须一致"""
+    (tmp / "loop.py").write_text(LOOP_SCRIPT)
+    for name, stop in (("helper", None), ("loop", "stop"), ("loop", "force")):
+        expected = run_task(tmp, name, None, engine, stop)
+        actual = run_task(tmp, name, pool, engine, stop)
+        assert actual == expected, (name, stop, actual, expected)
+        print(f"{name + ' ' + (stop or 'run'):>12}: exit {actual[0]}, output matches")
+
+
+def run(
+    engine: ExecutionEngine,
+    cmdline: t.List[str],
+    log: Path,
+    factory: t.Optional[t.Callable] = None,
+) -> t.Tuple[float, int]:
+    """启动一次并等待退出, 返回耗时与退出码"""
+    done = threading.Event()
+    result: t.List[int] = []
+
+    def on_exit(code: int) -> None:
+        result.append(code)
+        done.set()
+
+    with log.open("wb") as out:
+        started = time.perf_counter()
+        engine.spawn(cmdline, on_exit, None, factory, stdout=out, stderr=out,
+                     env={"HANDY_SCRIPT_LOG_FILE": str(log)})
+        done.wait()
+        elapsed = time.perf_counter() - started
+    return elapsed, result[0]
+
+
+def main():
+    if not ForkServerPool.supported():
+        print("fork server is not supported on this platform")
+        return
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    tmp = Path(tempfile.mkdtemp())
+    script = tmp / "helper.py"
+    script.write_text(SCRIPT)
+    log = tmp / "helper.log"
+    cmdline = [sys.executable, str(script), "ok"]
+
+    engine = ExecutionEngine()
+    pool = ForkServerPool()
+    check_lifecycle(tmp, engine, pool)
+    server = pool.get(sys.executable)
+    # 首次使用时启动 zygote, 不计入结果
+    run(engine, cmdline, log, server.create_process)
+    expected = log.read_text()
+
+    for name, factory in (("subprocess", None), ("fork server", server.create_process)):
+        times = []
+        for _ in range(number):
+            elapsed, code = run(engine, cmdline, log, factory)
+            assert code == 0 and log.read_text() == expected, log.read_text()
+            times.append(elapsed)
+        print(f"{name:>12}: median {statistics.median(times) * 1e3:7.1f} ms, "
+              f"min {min(times) * 1e3:7.1f} ms")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
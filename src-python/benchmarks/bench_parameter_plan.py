@@ -0,0 +1,123 @@
+"""参数计划基准测试
+
+比较一次执行的参数处理耗时:
+- 旧实现: BaseScript 与 utils 各校验一次, _get_cmdline 执行两次,
+  选择参数每次检查都重新生成选项值列表
+- 参数计划: 加载时编译, 校验与生成命令行一次完成
+
+运行: cd src-python && python -m benchmarks.bench_parameter_plan
+"""
+
+import random
+import timeit
+import typing as t
+
+from handyapi.adb.models.scriptModel import ExecuteParam, ScriptInfo
+
+
+def make_script(count: int, options: int) -> t.Tuple[ScriptInfo, ExecuteParam]:
+    """生成 count 个参数(输入/单选/多选/开关轮流)的脚本及一组合法参数"""
+    parameters = []
+    values: t.Dict[str, t.Any] = {}
+    for i in range(count):
+        name = f"-p{i}" if i % 2 else f"p{i}"
+        kind = i % 4
+        if kind == 0:
+            parameters.append({
+                "name": name, "type": "input", "default": "", "label": name, "description": ""
+            })
+            values[name] = f" value{i} "
+        elif kind in (1, 2):
+            opts = [{"label": f"o{j}", "value": f"opt{j}"} for j in range(options)]
+            multiple = kind == 2
+            parameters.append({
+                "name": name, "type": "select", "label": name, "description": "",
+                "multiple": multiple, "options": opts,
+            })
+            picks = [f"opt{random.randrange(options)}" for _ in range(3)]
+            values[name] = picks if multiple else picks[0]
+        else:
+            parameters.append({"name": name, "type": "switch", "label": name, "description": ""})
+            values[name] = bool(i % 3)
+    info = ScriptInfo.model_validate(
+        {
+            "name": "bench",
+            "type": "winpowershell",
+            "path": "/bench.ps1",
+            "label": "bench",
+            "description": "",
+            "parameters": parameters,
+        },
+        context={"source": "/"},
+    )
+    return info, ExecuteParam(values)
+
+
+def old_check(param, value) -> bool:
+    """旧的 check_value: 每次重新生成选项值列表"""
+    if param.type == "select":
+        if param.multiple and isinstance(value, list):
+            return all(opt in [o.value for o in param.options] for opt in value)
+        return value in [o.value for o in param.options]
+    return param.check_value(value)
+
+
+def old_validate(info: ScriptInfo, parameters: ExecuteParam) -> None:
+    values = parameters.model_dump()
+    for param in info.parameters:
+        if param.name not in values:
+            raise ValueError(f"Missing required parameter: {param.name}")
+        if not old_check(param, values[param.name]):
+            raise ValueError(f"Invalid value for parameter '{param.name}'")
+
+
+def old_cmdline(info: ScriptInfo, parameters: ExecuteParam) -> t.List[str]:
+    old_validate(info, parameters)
+    cmdline = ["powershell", "-NoLogo", "-NonInteractive", "-ExecutionPolicy",
+               "remoteSigned", "-File", info.path]
+    for param in info.parameters:
+        name = param.name
+        value = parameters.root[name]
+        if name.startswith("-"):
+            if isinstance(value, bool):
+                if value:
+                    cmdline.append(name)
+            elif isinstance(value, str):
+                if value.strip() != '':
+                    cmdline.append(name)
+        if isinstance(value, str) and len(value.strip()):
+            cmdline.append(value.strip())
+        if isinstance(value, list):
+            for v in value:
+                if v.strip():
+                    cmdline.append(v.strip())
+    return cmdline
+
+
+def old_execute(info: ScriptInfo, parameters: ExecuteParam) -> t.List[str]:
+    """旧的 execute 流程: 校验一次, 生成命令行两次(各自再校验)"""
+    old_validate(info, parameters)
+    str(old_cmdline(info, parameters))
+    return old_cmdline(info, parameters)
+
+
+def new_execute(info: ScriptInfo, parameters: ExecuteParam) -> t.List[str]:
+    return ["powershell", "-NoLogo", "-NonInteractive", "-ExecutionPolicy",
+            "remoteSigned", "-File", info.path,
+            *info.plan.build(parameters.root, expand_lists=True)]
+
+
+def main():
+    number = 200
+    print(f"{'params':>6} {'options':>7} {'old(us)':>10} {'plan(us)':>10}")
+    for count, options in ((10, 10), (50, 100), (200, 1000)):
+        info, parameters = make_script(count, options)
+        assert old_execute(info, parameters) == new_execute(info, parameters)
+        old_time = timeit.timeit(lambda: old_execute(info, parameters), number=number)
+        new_time = timeit.timeit(lambda: new_execute(info, parameters), number=number)
+        print(f"{count:>6} {options:>7} {old_time / number * 1e6:>10.1f} "
+              f"{new_time / number * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
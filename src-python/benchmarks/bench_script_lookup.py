@@ -0,0 +1,95 @@
+"""脚本查找基准测试
+
+比较 ScriptManager.find_script_info (索引) 与旧的递归遍历在不同目录规模下的耗时。
+
+运行: cd src-python && python -m benchmarks.bench_script_lookup
+"""
+
+import json
+import random
+import tempfile
+import timeit
+import typing as t
+from pathlib import Path
+
+from handyapi.adb.core import ScriptManager
+from handyapi.adb.models.scriptModel import GroupInfo, ScriptInfo
+
+
+def make_package(count: int, per_group: int = 50) -> dict:
+    """生成包含 count 个脚本的脚本包, 每 per_group 个脚本一个二级分组"""
+    groups = []
+    for g in range(0, count, per_group):
+        children = [
+            {
+                "name": f"script{i}",
+                "type": "python",
+                "path": f"./script{i}.py",
+                "label": f"script {i}",
+                "description": "",
+                "parameters": [],
+            }
+            for i in range(g, min(g + per_group, count))
+        ]
+        groups.append({
+            "name": f"group{g}",
+            "type": "scriptgroup",
+            "label": f"group {g}",
+            "description": "",
+            "children": [{
+                "name": f"sub{g}",
+                "type": "scriptgroup",
+                "label": f"sub {g}",
+                "description": "",
+                "children": children,
+            }],
+        })
+    return {
+        "id": 1,
+        "name": "bench",
+        "label": "bench",
+        "description": "",
+        "install": "",
+        "python": None,
+        "scripts": groups,
+    }
+
+
+def tree_walk(mgr: ScriptManager, sid: int) -> t.Optional[ScriptInfo]:
+    """旧实现: 递归遍历整个脚本树"""
+
+    def find_in_group(group, sid):
+        for item in group:
+            if isinstance(item, ScriptInfo) and item.id == sid:
+                return item
+            elif isinstance(item, GroupInfo):
+                found = find_in_group(item.children, sid)
+                if found:
+                    return found
+        return None
+
+    return find_in_group(mgr.scriptPackage.scripts.root, sid)
+
+
+def main():
+    number = 2000
+    print(f"{'scripts':>8} {'index(us)':>10} {'walk(us)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (100, 1000, 10000):
+            source = Path(tmp) / f"package{count}.json"
+            source.write_text(json.dumps(make_package(count)), encoding="utf-8")
+            mgr = ScriptManager(str(source), tmp)
+            ids = list(mgr.catalog.scripts.keys())
+            sample = [random.choice(ids) for _ in range(number)]
+
+            it = iter(sample * 2)
+            index_time = timeit.timeit(
+                lambda: mgr.find_script_info(next(it)), number=number)
+            walk_time = timeit.timeit(
+                lambda: tree_walk(mgr, next(it)), number=number)
+            print(f"{count:>8} {index_time / number * 1e6:>10.2f} "
+                  f"{walk_time / number * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
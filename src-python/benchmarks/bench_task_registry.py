@@ -0,0 +1,167 @@
+"""任务注册表并发压力测试
+
+在线程池中并发执行大量 execute / status / delete 调用(与 FastAPI 同步接口的
+运行方式相同), 统计吞吐并检查:
+
+- 任务ID全部唯一
+- 所有任务最终都已结束, 注册表中只剩未被删除的任务
+- 调度器执行槽全部释放, 队列为空
+- 每个任务的事件以 add 开始, remove 之后不再有事件
+
+脚本类型 python 在测试中被替换为不启动子进程的桩实现, 任务在引擎线程中
+经过一小段随机时间后结束。
+
+运行: cd src-python && python -m benchmarks.bench_task_registry [调用次数] [线程数]
+"""
+
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing as t
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from handyapi.adb.core import ScriptFactory, ScriptManager, TaskScheduler
+from handyapi.adb.core.baseScript import BaseScript
+from handyapi.adb.models.scriptModel import ExecuteParam, ScriptStatus
+
+
+# 非 Windows 平台上运行时补齐 execute() 用到的创建标志
+subprocess.CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+subprocess.CREATE_NEW_CONSOLE = getattr(subprocess, "CREATE_NEW_CONSOLE", 0)
+
+
+@ScriptFactory.register_script_type("python")
+class StubScript(BaseScript):
+    """不启动子进程的桩脚本"""
+
+    def _get_cmdline(self, parameters: ExecuteParam) -> t.List[str]:
+        return ["stub", self.info.path]
+
+    def _spawn(self, cmdline: t.List[str], **kwargs) -> None:
+        if self.out:
+            self.out.close()
+            self.out = None
+        assert self.engine is not None
+        self.engine.loop.call_soon_threadsafe(
+            self.engine.loop.call_later, random.uniform(0, 0.005), self._finish, 0
+        )
+
+
+PACKAGE = {
+    "id": 1,
+    "name": "bench",
+    "label": "bench",
+    "description": "",
+    "install": "",
+    "python": None,
+    "scripts": [{
+        "name": "stub",
+        "type": "python",
+        "path": "./stub.py",
+        "label": "stub",
+        "description": "",
+        "parameters": [],
+    }],
+}
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "package.json"
+        source.write_text(json.dumps(PACKAGE), encoding="utf-8")
+        mgr = ScriptManager(
+            str(source), tmp, scheduler=TaskScheduler(max_concurrency=16)
+        )
+        sid = next(iter(mgr.catalog.scripts))
+
+        events: t.List[t.Tuple[int, str, int]] = []
+        publish = mgr.events.publish
+
+        def record(kind: str, data: t.Optional[dict] = None) -> int:
+            seq = publish(kind, data)
+            if data:
+                tid = data["taskId"] if "taskId" in data else data["task"]["taskId"]
+                events.append((seq, kind, tid))
+            return seq
+
+        mgr.events.publish = record
+
+        ids: t.List[int] = []
+        deleted: t.Set[int] = set()
+        lock = threading.Lock()
+        counts: t.Dict[str, int] = defaultdict(int)
+
+        def execute() -> None:
+            tid = mgr.execute_script(sid, ExecuteParam({}), random.randint(0, 3))
+            with lock:
+                ids.append(tid)
+
+        def pick() -> t.Optional[int]:
+            with lock:
+                return random.choice(ids) if ids else None
+
+        def status() -> None:
+            if (tid := pick()) is not None:
+                mgr.get_script_status(tid)
+                mgr.get_task_snapshot()
+
+        def delete() -> None:
+            if (tid := pick()) is None:
+                return
+            try:
+                mgr.del_task(tid)
+            except ValueError:
+                return
+            with lock:
+                deleted.add(tid)
+
+        ops = [execute] * 4 + [status] * 4 + [delete] * 2
+        plan = [random.choice(ops) for _ in range(calls)]
+        for op in plan:
+            counts[op.__name__] += 1
+
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(op) for op in plan]:
+                future.result()
+        elapsed = time.perf_counter() - begin
+
+        deadline = time.time() + 30
+        while any(not task.finished for task in mgr.get_task().values()):
+            if time.time() > deadline:
+                raise AssertionError("tasks did not finish")
+            time.sleep(0.01)
+
+        remaining = mgr.get_task()
+        assert len(ids) == len(set(ids)), "duplicate task ids"
+        assert set(remaining) == set(ids) - deleted, "registry does not match"
+        assert all(task.status == ScriptStatus.FINISH for task in remaining.values())
+        assert mgr.scheduler.running == 0 and mgr.scheduler.depth == 0, "slots leaked"
+
+        by_task: t.Dict[int, t.List[str]] = defaultdict(list)
+        for _, kind, tid in sorted(events):
+            by_task[tid].append(kind)
+        for tid, kinds in by_task.items():
+            assert kinds[0] == "add", f"task {tid} events start with {kinds[0]}"
+            if "remove" in kinds:
+                assert kinds[-1] == "remove" and kinds.count("remove") == 1, (
+                    f"task {tid} has events after remove: {kinds}"
+                )
+
+        print(f"calls: {calls} ({dict(counts)}), threads: {workers}")
+        print(f"elapsed: {elapsed:.3f}s, {calls / elapsed:.0f} calls/s")
+        print(f"tasks: {len(ids)}, deleted: {len(deleted)}, events: {len(events)}")
+        print("ok")
+
+
+if __name__ == "__main__":
+    main()
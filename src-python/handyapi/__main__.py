@@ -1,11 +1,38 @@
-import uvicorn
-from .app import app
+import sys
+import time
 import logging
 from  .utiles.env import is_nuitka
 
 
+def profile_startup():
+    """启动耗时分析: 统计导入应用与初始化脚本管理器的耗时及热点函数"""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    from .app import app
+    imported = time.perf_counter()
+    from .adb.routes import init_manager
+    manager = init_manager()
+    manager.catalog.commands
+    profiler.disable()
+    ready = time.perf_counter()
+
+    print(f"import app:   {imported - started:.3f}s")
+    print(f"init manager: {ready - imported:.3f}s")
+    print(f"total:        {ready - started:.3f}s")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+
+
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.INFO)
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        sys.exit(0)
+    import uvicorn
+    from .app import app
     config = uvicorn.Config(app, port=8001, log_level="info", reload=True)
     server = uvicorn.Server(config)
     server.run()
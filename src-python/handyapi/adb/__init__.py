@@ -1,3 +1,3 @@
-from .routes import router
+from .routes import router, warm_up
 
-__all__ = ["router"]
+__all__ = ["router", "warm_up"]
@@ -1,7 +1,63 @@
 """ADB核心模块"""
 
+import importlib
+import typing as t
+
 from .scriptManager import ScriptManager
 from .scriptFactory import ScriptFactory
 from .baseScript import BaseScript
+from .scriptCatalog import ScriptCatalog
+from .packageCatalog import MergedCatalog, PackageEntry
+from .executionEngine import ExecutionEngine
+from .logArchive import LogArchive, LogArchiver
+from .logSearch import LogSearcher
+from .taskScheduler import TaskScheduler
+from .taskGroup import TaskGroup
+
+# 按需启用的后台组件在首次访问时才导入, 导入执行核心时不加载
+_LAZY = {
+    "CatalogWatcher": ".catalogWatcher",
+    "ForkServer": ".forkServer",
+    "ForkServerPool": ".forkServer",
+    "AdbClient": ".deviceRegistry",
+    "DeviceRegistry": ".deviceRegistry",
+    "ResultCache": ".resultCache",
+    "TaskHistory": ".taskHistory",
+}
+
+if t.TYPE_CHECKING:
+    from .catalogWatcher import CatalogWatcher
+    from .forkServer import ForkServer, ForkServerPool
+    from .deviceRegistry import AdbClient, DeviceRegistry
+    from .resultCache import ResultCache
+    from .taskHistory import TaskHistory
+
+
+def __getattr__(name: str) -> t.Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
+
 
-__all__ = ["ScriptManager", "ScriptFactory", "BaseScript"]
+__all__ = [
+    "ScriptManager",
+    "ScriptFactory",
+    "BaseScript",
+    "ScriptCatalog",
+    "MergedCatalog",
+    "PackageEntry",
+    "CatalogWatcher",
+    "ExecutionEngine",
+    "ForkServer",
+    "ForkServerPool",
+    "AdbClient",
+    "DeviceRegistry",
+    "LogArchive",
+    "LogArchiver",
+    "LogSearcher",
+    "ResultCache",
+    "TaskScheduler",
+    "TaskGroup",
+    "TaskHistory",
+]
@@ -1,10 +1,15 @@
 """ADB脚本基础类模块"""
 
+import asyncio
+import io
 import logging
 import os
+import shutil
 import time
 import subprocess
 import signal
+import sys
+import threading
 import typing as t
 from io import BufferedWriter
 from abc import abstractmethod
@@ -12,23 +17,72 @@ from pathlib import Path
 from abc import ABC
 
 from ..models.scriptModel import ScriptInfo, ExecuteParam, ScriptStatus
+from .executionEngine import ExecutionEngine, ProcessFactory
+from .ringBuffer import RingBuffer
+from .logArchive import LogArchive, compress_log
+from .metrics import EXECUTE_SECONDS, LOG_BYTES_WRITTEN, TASK_RUN_SECONDS, TASKS_TOTAL
+
+
+# 停止信号: Windows 下为 CTRL_BREAK_EVENT, 其他平台为 SIGINT
+STOP_SIGNAL: int = getattr(signal, "CTRL_BREAK_EVENT", signal.SIGINT)
+
+
+def _read_at(f: t.BinaryIO, pos: int, size: int) -> bytes:
+    """从 pos 处读取至多 size 字节"""
+    f.seek(pos, os.SEEK_SET)
+    return f.read(size)
+
+
+def console_flags(name: str) -> t.Dict[str, int]:
+    """Windows 下的控制台窗口创建标志(其他平台没有 creationflags, 返回空)"""
+    if sys.platform == "win32":
+        return {"creationflags": getattr(subprocess, name)}
+    return {}
+
+
+_taskIdLock = threading.Lock()
+_lastTaskId: int = 0
+
+
+def next_task_id() -> int:
+    """生成任务ID(微秒时间戳, 保证单调递增不重复)"""
+    global _lastTaskId
+    with _taskIdLock:
+        _lastTaskId = max(_lastTaskId + 1, time.time_ns() // 1000)
+        return _lastTaskId
 
 
 class BaseScript(ABC):
     """脚本基类"""
 
-    def __init__(self, script_info: ScriptInfo, logfile: str, exec:str|None=None):
-        self.taskid: int = time.time_ns() // 1000
+    def __init__(self, script_info: ScriptInfo, logfile: str, exec:str|None=None,
+                 engine: ExecutionEngine|None=None, ring_size: int = 0):
+        self.taskid: int = next_task_id()
         self.info: ScriptInfo = script_info
         self.status: ScriptStatus = ScriptStatus.PRE
         self.logfile: Path|None = Path(logfile)
         self.out: t.Optional[BufferedWriter] = None
-        self.process: t.Optional[subprocess.Popen] = None
+        self.process: t.Optional[subprocess.Popen|asyncio.subprocess.Process] = None
         self.createtime: float = time.time()
+        self.queuedtime: float | None = None
+        self.priority: int = 0
+        self.groupid: int | None = None
         self.starttime: float | None = None
         self.endtime: float | None = None
+        self.returncode: int | None = None
         self.cmdline: str = ""
         self.exec = exec
+        self.engine = engine
+        self.on_finish: t.Optional[t.Callable[["BaseScript"], None]] = None
+        self.ring: t.Optional[RingBuffer] = None
+        self.archive: t.Optional[Path] = None
+        self._archiveReader: t.Optional[LogArchive] = None
+        self._prepared: t.Optional[t.Tuple[ExecuteParam, t.List[str]]] = None
+        # 启动时追加的环境变量(如缓存的设备列表)
+        self.env: t.Dict[str, str] = {}
+        # 结果缓存键(可缓存的脚本), 以及是否直接使用了缓存的结果
+        self.cacheKey: t.Optional[str] = None
+        self.cached: bool = False
 
         if self.info.newconsole:
             self.logfile = None
@@ -36,89 +90,247 @@ class BaseScript(ABC):
         if self.logfile and self.logfile.exists():
             raise FileExistsError(f"{self.logfile.absolute()} is already exist")
 
+        # 捕获模式: 输出经管道进入内存环形缓冲区, 再由引擎线程写入日志文件。
+        # 缓冲区不小于文件写缓冲, 保证不在缓冲区中的内容都已落盘。
+        if ring_size > 0 and self.engine and self.logfile:
+            self.ring = RingBuffer(max(ring_size, io.DEFAULT_BUFFER_SIZE))
+
     def validate_parameters(self, parameters: ExecuteParam) -> None:
-        """验证执行参数"""
-        paramDict:dict= parameters.model_dump()
-        for param in self.info.parameters:
-            if param.name not in paramDict.keys() and param.required:
-                raise ValueError(f"Missing required parameter: {param.name}")
-
-            if not param.check_value(paramDict[param.name]):
-                raise ValueError(
-                    f"Invalid value for parameter '{param.name}': {paramDict[param.name]}"
-                )
+        """验证执行参数, 同时生成命令行(execute 使用同一参数时不再重复)"""
+        self._prepared = (parameters, self._get_cmdline(parameters))
 
     @abstractmethod
     def _get_cmdline(self, parameters: ExecuteParam) -> t.List[str]:
-        """获取命令行参数(抽象方法)"""
+        """校验参数并生成命令行(抽象方法)"""
         raise NotImplementedError
 
     def execute(self, parameters: ExecuteParam) -> None:
         """执行脚本"""
         logging.info(f"Running script: script information:{self.info}")
 
-        self.validate_parameters(parameters)
+        if self._prepared is None or self._prepared[0] is not parameters:
+            self.validate_parameters(parameters)
+        assert self._prepared is not None
+        cmdline = self._prepared[1]
         logging.info(
             f"Executing script '{self.info.name}' with parameters: {parameters}"
         )
 
-        if self.status != ScriptStatus.PRE:
+        if self.status not in (ScriptStatus.PRE, ScriptStatus.QUEUED):
             raise SyntaxError(f"script status exception,{self.status}")
         self.starttime = time.time()
         self.status = ScriptStatus.RUNNING
-        self.cmdline = str(self._get_cmdline(parameters))
+        self.cmdline = str(cmdline)
         logging.info(f"execute: Command line: {self.cmdline}")
 
+        started = time.perf_counter()
         try:
             env = os.environ.copy()
+            env.update(self.env)
             if self.info.newconsole:
-                self.process = subprocess.Popen(
-                    self._get_cmdline(parameters),
-                    creationflags=subprocess.CREATE_NEW_CONSOLE,
-                    env=env
-                )
+                self._spawn(cmdline, env=env, **console_flags("CREATE_NEW_CONSOLE"))
             else:
                 if self.logfile is not None:
                     env['HANDY_SCRIPT_LOG_FILE'] = str(self.logfile.absolute())
                     self.out = self.logfile.open(mode="wb")
 
-                self.process = subprocess.Popen(
-                    self._get_cmdline(parameters),
+                self._spawn(
+                    cmdline,
                     stdout=self.out,
                     stderr=self.out,
                     stdin=subprocess.DEVNULL,
-                    creationflags=subprocess.CREATE_NO_WINDOW,
-                    env=env
+                    env=env,
+                    **console_flags("CREATE_NO_WINDOW"),
                 )
         except Exception as e:
             logging.error(f"Failed to start script '{self.info.name}': {e}", stack_info=True)
-            self.status = ScriptStatus.FINISH
-            self.endtime = time.time()
+            self._finish(None)
             raise e
+        EXECUTE_SECONDS.labels("spawn").observe(time.perf_counter() - started)
+
+    def restore(self, returncode: int, logfile: Path) -> None:
+        """使用缓存的结果直接结束任务(不启动子进程)"""
+        if self.status != ScriptStatus.PRE:
+            raise SyntaxError(f"script status exception,{self.status}")
+        assert self._prepared is not None
+        logging.info(f"Script '{self.info.name}' served from result cache")
+        if self.logfile is not None:
+            shutil.copyfile(logfile, self.logfile)
+        self.cmdline = str(self._prepared[1])
+        self.starttime = self.endtime = time.time()
+        self.returncode = returncode
+        self.cached = True
+        self.status = ScriptStatus.FINISH
+        TASKS_TOTAL.labels(self.info.name, "cached").inc()
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束(正常结束或被取消)"""
+        return self.status in (ScriptStatus.FINISH, ScriptStatus.TERMINATED)
+
+    def enqueue(self, priority: int = 0) -> None:
+        """进入排队状态"""
+        if self.status != ScriptStatus.PRE:
+            raise SyntaxError(f"script status exception,{self.status}")
+        self.priority = priority
+        self.queuedtime = time.time()
+        self.status = ScriptStatus.QUEUED
+
+    def cancel(self) -> None:
+        """取消排队中的任务"""
+        if self.status != ScriptStatus.QUEUED:
+            raise ValueError(f"Cannot cancel script in {self.status} state")
+        logging.info(f"Script '{self.info.name}' cancelled before start")
+        self.endtime = time.time()
+        self.status = ScriptStatus.TERMINATED
+        TASKS_TOTAL.labels(self.info.name, "cancelled").inc()
+        if self.on_finish:
+            self.on_finish(self)
+
+    def fail(self) -> None:
+        """尚未启动(未排队或排队中)的任务启动失败, 直接以失败结束(没有退出码)"""
+        if self.status not in (ScriptStatus.PRE, ScriptStatus.QUEUED):
+            raise ValueError(f"Cannot fail script in {self.status} state")
+        logging.info(f"Script '{self.info.name}' failed before start")
+        self._finish(None)
+
+    def _spawn(
+        self, cmdline: t.List[str], factory: t.Optional[ProcessFactory] = None, **kwargs
+    ) -> None:
+        """启动子进程, 有执行引擎时由引擎在退出时回收(factory 替换引擎创建子进程的方式)"""
+        if self.engine is None:
+            self.process = subprocess.Popen(cmdline, **kwargs)
+        else:
+            on_output = None
+            if self.ring is not None and self.out is not None:
+                on_output = self._on_output
+            process = self.engine.spawn(cmdline, self._finish, on_output, factory, **kwargs)
+            # 进程可能在 spawn 返回前就已退出并被回收
+            if self.status == ScriptStatus.RUNNING:
+                self.process = process
+
+    def _on_output(self, data: bytes) -> None:
+        """捕获模式下的输出回调(在引擎线程中执行)"""
+        assert self.ring is not None
+        self.ring.append(data)
+        if self.out:
+            self.out.write(data)
+
+    def _finish(self, returncode: int | None) -> None:
+        """进程结束: 记录结束时间与退出码并关闭日志"""
+        logging.info(
+            f"Script '{self.info.name}' is finished code {returncode}"
+        )
+        if self.out:
+            self.out.flush()
+            self.out.close()
+            self.out = None
+        # 日志已完整落盘, 释放缓冲区
+        self.ring = None
+
+        self.returncode = returncode
+        self.endtime = time.time()
+        self.status = ScriptStatus.FINISH
+        self.process = None
+        self._record_metrics()
+        if self.on_finish:
+            self.on_finish(self)
+
+    def _record_metrics(self) -> None:
+        """记录结束任务的运行时间与日志大小"""
+        TASKS_TOTAL.labels(self.info.name, "ok" if self.returncode == 0 else "failed").inc()
+        if self.starttime is not None and self.endtime is not None:
+            TASK_RUN_SECONDS.labels(self.info.name).observe(self.endtime - self.starttime)
+        if self.logfile is not None:
+            try:
+                LOG_BYTES_WRITTEN.inc(self.logfile.stat().st_size)
+            except OSError:
+                pass
 
     def get_status(self) -> ScriptStatus:
         """获取脚本状态"""
-        if self.process and self.process.poll() is not None:
-            logging.info(
-                f"Script '{self.info.name}' is finished code {self.process.returncode}"
-            )
-            self.status = ScriptStatus.FINISH
-            self.endtime = time.time()
-            if self.out:
-                self.out.flush()
-                self.out.close()
-                self.out = None
-
-            self.process = None
+        process = self.process
+        if isinstance(process, subprocess.Popen) and process.poll() is not None:
+            self._finish(process.returncode)
         return self.status
 
+    def to_dict(self) -> dict:
+        """任务信息(用于任务列表与变更通知)"""
+        return {
+            "taskId": self.taskid,
+            "status": self.status.value,
+            "commandId": self.info.id,
+            "createdAt": self.starttime,
+            "queuedAt": self.queuedtime,
+            "waitTime": (
+                self.starttime - self.queuedtime
+                if self.queuedtime is not None and self.starttime is not None
+                else None
+            ),
+            "priority": self.priority,
+            "groupId": self.groupid,
+            "endedAt": self.endtime,
+            "exitCode": self.returncode,
+            "cmdline": self.cmdline,
+            "logfile": str(self.logfile) if self.logfile is not None else None,
+            # 日志已压缩归档时为归档文件(原日志文件已删除, 经 /logfile 下载解压后的内容)
+            "archive": str(self.archive) if self.archive is not None else None,
+            "cached": self.cached,
+        }
+
+    def get_log_file(self) -> t.Optional[Path]:
+        """已结束任务的完整日志文件(运行中或无日志时返回 None)"""
+        if self.get_status() != ScriptStatus.FINISH or self.logfile is None:
+            return None
+        if not self.logfile.exists():
+            return None
+        return self.logfile
+
+    def archive_log(self) -> t.Optional[Path]:
+        """压缩已结束任务的日志, 之后的读取从归档中按块解压"""
+        if self.endtime is None or self.logfile is None or self.archive is not None:
+            return self.archive
+        archive = compress_log(self.logfile)
+        self.archive = archive
+        try:
+            self.logfile.unlink()
+        except OSError:
+            # 日志仍被占用(如正在被读取), 下次再归档
+            self.archive = None
+            self._archiveReader = None
+            archive.unlink()
+            raise
+        logging.info(f"Archived log of task {self.taskid} to {archive}")
+        return archive
+
+    def get_log_archive(self) -> t.Optional[LogArchive]:
+        """已归档日志的读取器(归档已被清理时返回 None)"""
+        if self.archive is None:
+            return None
+        if not self.archive.exists():
+            self.archive = None
+            self._archiveReader = None
+            return None
+        if self._archiveReader is None:
+            self._archiveReader = LogArchive(self.archive)
+        return self._archiveReader
+
     def get_log(self, pos: int, max_size: int) -> bytes:
         """获取脚本日志"""
         try:
             if self.info.newconsole or self.logfile is None:
                 return b""
-            
-            
+
+            reader = self.get_log_archive()
+            if reader is not None:
+                return reader.read(pos, max_size)
+
+            ring = self.ring
+            if ring is not None:
+                data = ring.read(pos, max_size)
+                if data is not None:
+                    return data
+
             with self.logfile.open("rb") as f:
                 try:
                     f.flush()
@@ -130,14 +342,59 @@ class BaseScript(ABC):
         except FileNotFoundError:
             logging.error(f"Log file not found: {self.logfile.absolute() if  self.logfile else ''}")
             return b""
+        except ValueError as e:
+            logging.error(f"Invalid log archive {self.archive}: {e}")
+            return b""
+
+    async def follow_log(
+        self, pos: int = 0, chunk_size: int = 64 * 1024, interval: float = 0.1
+    ) -> t.AsyncIterator[bytes]:
+        """从 pos 开始持续读取日志(类似 tail -f), 任务结束且读完后停止"""
+        if self.info.newconsole or self.logfile is None:
+            return
+
+        # 文件读取与解压都在线程中执行, 不阻塞事件循环
+        reader = self.get_log_archive()
+        if reader is not None:
+            blocks = reader.iter_blocks(pos)
+            while (block := await asyncio.to_thread(next, blocks, None)) is not None:
+                yield block
+            return
+
+        while not self.logfile.exists():
+            if self.finished:
+                return
+            await asyncio.sleep(interval)
+
+        f = await asyncio.to_thread(self.logfile.open, "rb")
+        try:
+            while True:
+                # 先取状态再读, 保证任务结束前写入的内容都能读到
+                finished = self.finished
+                ring = self.ring
+                data = ring.read(pos, chunk_size) if ring is not None else None
+                if data is None:
+                    data = await asyncio.to_thread(_read_at, f, pos, chunk_size)
+                if data:
+                    pos += len(data)
+                    yield data
+                elif finished:
+                    return
+                else:
+                    await asyncio.sleep(interval)
+        finally:
+            f.close()
 
     def stop(self) -> None:
         """停止正在运行的脚本"""
         if self.status != ScriptStatus.RUNNING:
             raise ValueError(f"Cannot stop script in {self.status} state")
 
-        if self.process:
-            self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        process = self.process
+        if isinstance(process, subprocess.Popen):
+            process.send_signal(STOP_SIGNAL)
+        elif process and self.engine:
+            self.engine.send_signal(process, STOP_SIGNAL)
 
         logging.info(f"Script '{self.info.name}' stopped by user request")
 
@@ -146,9 +403,12 @@ class BaseScript(ABC):
         if self.status != ScriptStatus.RUNNING:
             raise ValueError(f"Cannot stop script in {self.status} state")
 
-        if self.process:
-            self.process.terminate()
-            self.process.wait()
+        process = self.process
+        if isinstance(process, subprocess.Popen):
+            process.terminate()
+            process.wait()
+        elif process and self.engine:
+            self.engine.terminate(process)
 
         logging.info(f"Script '{self.info.name}' force stopped by user request")
 
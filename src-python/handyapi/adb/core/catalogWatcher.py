@@ -0,0 +1,76 @@
+"""ADB脚本包文件监视模块"""
+
+import logging
+import threading
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .scriptManager import ScriptManager
+
+
+class CatalogWatcher:
+    """监视脚本包文件, 变化稳定后自动重新加载
+
+    定时检查所有脚本包文件的修改时间与大小; 检测到变化后等待 debounce 秒内不再变化
+    才重新加载, 避免编辑器分多次写入时加载到不完整的文件。
+    加载失败(如 JSON 不完整)时保留当前目录, 文件再次变化后重试。
+    """
+
+    def __init__(self, manager: "ScriptManager", interval: float = 1.0, debounce: float = 0.5):
+        self.manager = manager
+        self.interval = interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+        self._stamp = self._stat()
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="CatalogWatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self._stop.set()
+
+    def _stat(self) -> t.Tuple[t.Tuple[int, int], ...]:
+        stamps = []
+        for source in self.manager.sources:
+            try:
+                st = source.stat()
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                # 文件不存在(如正在被替换)也视为一种状态
+                stamps.append((0, 0))
+        return tuple(stamps)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"CatalogWatcher failed: {e}", exc_info=True)
+
+    def check(self) -> bool:
+        """检查一次, 文件有变化时等待其稳定后重新加载, 返回是否已重新加载"""
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return False
+
+        changed = time.monotonic()
+        while time.monotonic() - changed < self.debounce:
+            if self._stop.wait(self.debounce / 5):
+                return False
+            latest = self._stat()
+            if latest != stamp:
+                stamp, changed = latest, time.monotonic()
+
+        self._stamp = stamp
+        try:
+            self.manager.reload()
+        except Exception as e:
+            logging.warning(f"Failed to reload script packages: {e}")
+            return False
+        return True
@@ -0,0 +1,214 @@
+"""ADB设备注册表模块
+
+直接通过 adb server 的套接字协议(host:track-devices-l)跟踪设备连接变化,
+不需要反复执行 adb devices; 设备列表缓存在内存中, 变化时通知订阅者,
+并通过环境变量 HANDY_ADB_DEVICES 传给脚本。
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+import typing as t
+
+from ..models.deviceModel import AdbDevice
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = 5037
+DEVICES_ENV = "HANDY_ADB_DEVICES"
+
+ChangeCallback = t.Callable[[dict], None]
+
+
+class AdbError(Exception):
+    """adb server 返回 FAIL"""
+
+
+def parse_devices(text: str) -> t.List[AdbDevice]:
+    """解析 devices-l 的输出"""
+    devices = []
+    for line in text.splitlines():
+        device = AdbDevice.parse(line)
+        if device is not None:
+            devices.append(device)
+    return devices
+
+
+class AdbClient:
+    """adb server 客户端(只实现设备查询需要的 host 服务)
+
+    协议: 请求为 4 位十六进制长度 + 服务名, 响应以 OKAY 或 FAIL 开头,
+    FAIL 与设备列表均为 4 位十六进制长度 + 内容。
+    """
+
+    def __init__(self, host: str = ADB_HOST, port: int = ADB_PORT, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _open(self, service: str) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            request = service.encode("utf-8")
+            sock.sendall(b"%04x" % len(request) + request)
+            status = self._read(sock, 4)
+            if status == b"FAIL":
+                raise AdbError(self._read_block(sock).decode("utf-8", "replace"))
+            if status != b"OKAY":
+                raise AdbError(f"Unexpected adb response {status!r}")
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _read(sock: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("adb server closed the connection")
+            data += chunk
+        return data
+
+    @classmethod
+    def _read_block(cls, sock: socket.socket) -> bytes:
+        return cls._read(sock, int(cls._read(sock, 4), 16))
+
+    def devices(self) -> t.List[AdbDevice]:
+        """查询一次设备列表"""
+        with self._open("host:devices-l") as sock:
+            return parse_devices(self._read_block(sock).decode("utf-8", "replace"))
+
+    def track(self, stop: threading.Event) -> t.Iterator[t.List[AdbDevice]]:
+        """跟踪设备变化: 先返回当前列表, 之后每次变化返回新列表, stop 设置后结束"""
+        with self._open("host:track-devices-l") as sock:
+            buffer = b""
+            while not stop.is_set():
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    raise ConnectionError("adb server closed the connection")
+                buffer += chunk
+                while len(buffer) >= 4:
+                    size = int(buffer[:4], 16)
+                    if len(buffer) < 4 + size:
+                        break
+                    data, buffer = buffer[4:4 + size], buffer[4 + size:]
+                    yield parse_devices(data.decode("utf-8", "replace"))
+
+
+class DeviceRegistry:
+    """ADB设备注册表
+
+    后台线程保持一个 track-devices-l 连接, adb server 推送变化后更新缓存;
+    连接失败(如 adb server 未启动)时清空设备列表并每隔 interval 秒重试。
+    设备列表变化时以 {"version", "devices", "added", "removed", "changed"} 通知订阅者。
+    """
+
+    def __init__(self, client: t.Optional[AdbClient] = None, interval: float = 5.0):
+        self.client = client or AdbClient()
+        self.interval = interval
+        self.devices: t.Dict[str, AdbDevice] = {}
+        self.version: int = 0
+        self.error: t.Optional[str] = None
+        self.updated: t.Optional[float] = None
+        self._lock = threading.Lock()
+        self._notifyLock = threading.Lock()
+        self._subscribers: t.List[ChangeCallback] = []
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="DeviceRegistry", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self._stop.set()
+
+    def subscribe(self, callback: ChangeCallback) -> None:
+        """订阅设备列表变化(回调在后台线程中执行)"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for devices in self.client.track(self._stop):
+                    self._update(devices)
+            except (OSError, AdbError) as e:
+                if self.error is None:
+                    logging.warning(f"ADB device tracking failed: {e}")
+                self._update([], str(e))
+            except Exception as e:
+                logging.error(f"DeviceRegistry failed: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def refresh(self) -> t.List[AdbDevice]:
+        """立即查询一次设备列表并更新缓存"""
+        try:
+            devices = self.client.devices()
+        except (OSError, AdbError) as e:
+            self._update([], str(e))
+            raise
+        self._update(devices)
+        return devices
+
+    def _update(self, devices: t.List[AdbDevice], error: t.Optional[str] = None) -> None:
+        # 后台线程与 refresh 可能同时更新, 通知按版本顺序发出
+        with self._notifyLock:
+            self._apply(devices, error)
+
+    def _apply(self, devices: t.List[AdbDevice], error: t.Optional[str]) -> None:
+        current = {device.serial: device for device in devices}
+        with self._lock:
+            previous = self.devices
+            self.error = error
+            self.updated = time.time()
+            if current == previous:
+                return
+            self.devices = current
+            self.version += 1
+            change = {
+                "version": self.version,
+                "devices": [device.model_dump() for device in devices],
+                "added": sorted(current.keys() - previous.keys()),
+                "removed": sorted(previous.keys() - current.keys()),
+                "changed": sorted(
+                    serial for serial in current.keys() & previous.keys()
+                    if current[serial] != previous[serial]
+                ),
+            }
+            subscribers = list(self._subscribers)
+        logging.info(
+            f"ADB devices changed: +{change['added']} -{change['removed']} ~{change['changed']}"
+        )
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                logging.error(f"Device change callback failed: {e}", exc_info=True)
+
+    def snapshot(self) -> dict:
+        """当前设备列表"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "devices": [device.model_dump() for device in self.devices.values()],
+                "error": self.error,
+                "updatedAt": self.updated,
+            }
+
+    def environ(self) -> t.Dict[str, str]:
+        """传给脚本的环境变量; 尚未取得设备列表或 adb server 不可用时为空(脚本自行查询)"""
+        with self._lock:
+            if self.updated is None or self.error is not None:
+                return {}
+            devices = [device.model_dump(exclude_none=True) for device in self.devices.values()]
+        return {DEVICES_ENV: json.dumps(devices, separators=(",", ":"))}
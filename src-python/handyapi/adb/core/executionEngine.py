@@ -0,0 +1,137 @@
+"""ADB脚本执行引擎模块
+
+在独立线程中运行一个 asyncio 事件循环, 通过 asyncio.create_subprocess_exec
+启动子进程, 子进程退出后立即回收并回调, 不依赖调用方轮询。
+"""
+
+import asyncio
+import logging
+import threading
+import typing as t
+
+
+ExitCallback = t.Callable[[int], None]
+OutputCallback = t.Callable[[bytes], None]
+# 创建子进程的协程函数, 参数与返回值同 asyncio.create_subprocess_exec
+ProcessFactory = t.Callable[..., t.Awaitable[t.Any]]
+
+
+class ExecutionEngine:
+    """基于asyncio的子进程执行引擎"""
+
+    def __init__(self):
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._thread: t.Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._running: t.Set[asyncio.subprocess.Process] = set()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """引擎事件循环(首次使用时启动)"""
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(ready,), name="ExecutionEngine", daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            assert self._loop is not None
+            return self._loop
+
+    def _run(self, ready: threading.Event) -> None:
+        # Windows 下默认即为 ProactorEventLoop, 支持子进程
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        ready.set()
+        self._loop.run_forever()
+
+    def in_loop(self) -> bool:
+        """当前线程是否为引擎线程"""
+        return threading.current_thread() is self._thread
+
+    def call(self, coro: t.Coroutine) -> t.Any:
+        """在引擎循环中执行协程并同步等待结果"""
+        if self.in_loop():
+            raise RuntimeError("ExecutionEngine.call() cannot be used from the engine thread")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    @property
+    def running(self) -> int:
+        """正在运行的子进程数量"""
+        return len(self._running)
+
+    def spawn(
+        self,
+        cmdline: t.List[str],
+        on_exit: ExitCallback,
+        on_output: t.Optional[OutputCallback] = None,
+        factory: t.Optional[ProcessFactory] = None,
+        **kwargs,
+    ) -> asyncio.subprocess.Process:
+        """启动子进程, 子进程退出时以退出码调用 on_exit
+
+        指定 on_output 时 stdout/stderr 合并到管道, 输出块在引擎线程中依次回调,
+        on_exit 在输出读完之后才会调用。factory 用于替换默认的
+        asyncio.create_subprocess_exec(如 fork 服务器)。
+        """
+        if on_output is not None:
+            kwargs["stdout"] = asyncio.subprocess.PIPE
+            kwargs["stderr"] = asyncio.subprocess.STDOUT
+        return self.call(self._spawn(cmdline, on_exit, on_output, factory, **kwargs))
+
+    async def _spawn(
+        self,
+        cmdline: t.List[str],
+        on_exit: ExitCallback,
+        on_output: t.Optional[OutputCallback],
+        factory: t.Optional[ProcessFactory],
+        **kwargs,
+    ) -> asyncio.subprocess.Process:
+        process = await (factory or asyncio.create_subprocess_exec)(*cmdline, **kwargs)
+        self._running.add(process)
+        self.loop.create_task(self._reap(process, on_exit, on_output))
+        return process
+
+    async def _pump(self, stream: asyncio.StreamReader, on_output: OutputCallback) -> None:
+        while data := await stream.read(64 * 1024):
+            try:
+                on_output(data)
+            except Exception as e:
+                logging.error(f"ExecutionEngine output callback failed: {e}", exc_info=True)
+
+    async def _reap(
+        self,
+        process: asyncio.subprocess.Process,
+        on_exit: ExitCallback,
+        on_output: t.Optional[OutputCallback],
+    ) -> None:
+        try:
+            if on_output is not None and process.stdout is not None:
+                await self._pump(process.stdout, on_output)
+            returncode = await process.wait()
+        finally:
+            self._running.discard(process)
+        try:
+            on_exit(returncode)
+        except Exception as e:
+            logging.error(f"ExecutionEngine exit callback failed: {e}", exc_info=True)
+
+    def send_signal(self, process: asyncio.subprocess.Process, sig: int) -> None:
+        """向子进程发送信号"""
+        self.loop.call_soon_threadsafe(self._send_signal, process, sig)
+
+    @staticmethod
+    def _send_signal(process: asyncio.subprocess.Process, sig: int) -> None:
+        if process.returncode is None:
+            process.send_signal(sig)
+
+    def terminate(self, process: asyncio.subprocess.Process) -> int:
+        """终止子进程并等待其退出"""
+        return self.call(self._terminate(process))
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> int:
+        if process.returncode is None:
+            process.terminate()
+        return await process.wait()
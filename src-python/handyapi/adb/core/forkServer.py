@@ -0,0 +1,270 @@
+"""ADB python 脚本 fork 服务器模块
+
+每个 python 解释器对应一个预先启动的 zygote 进程(见 zygote.py), 预加载常用模块后
+为每个任务 fork 子进程并以 runpy 执行脚本, 省去解释器启动与导入的时间。
+
+子进程由 ForkedProcess 表示, 接口与 asyncio.subprocess.Process 相同,
+可直接交给 ExecutionEngine 回收、读取输出、发送信号与终止。
+仅支持 POSIX 平台; 不支持时 ForkServerPool.supported() 为 False, 调用方应使用普通的子进程。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import typing as t
+from concurrent.futures import Future
+from pathlib import Path
+
+ZYGOTE_SCRIPT = Path(__file__).with_name("zygote.py")
+
+DEFAULT_PRELOAD = ("argparse", "json", "logging", "pathlib", "re", "subprocess", "time")
+
+_LENGTH = struct.Struct(">I")
+
+
+class ForkedProcess:
+    """zygote 启动的子进程(接口同 asyncio.subprocess.Process)"""
+
+    def __init__(self, pid: int, stdout: t.Optional[asyncio.StreamReader] = None):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = None
+        self.returncode: t.Optional[int] = None
+        self._exited: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def _set_returncode(self, code: t.Optional[int]) -> None:
+        if not self._exited.done():
+            self.returncode = code
+            self._exited.set_result(code)
+
+    async def wait(self) -> t.Optional[int]:
+        """等待子进程退出"""
+        return await asyncio.shield(self._exited)
+
+    def send_signal(self, sig: int) -> None:
+        """向子进程发送信号"""
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """一个 python 解释器的 zygote 进程
+
+    控制消息由后台线程接收; 启动请求以 Future 等待 pid, 退出通知在子进程所属的
+    事件循环中设置退出码。zygote 意外退出时正在运行的子进程以退出码 None 结束,
+    下一次启动请求时重新启动 zygote。
+    """
+
+    def __init__(self, python: str, preload: t.Sequence[str] = DEFAULT_PRELOAD):
+        self.python = python
+        self.preload = tuple(preload)
+        self._lock = threading.Lock()
+        self._sock: t.Optional[socket.socket] = None
+        self._zygote: t.Optional[subprocess.Popen] = None
+        self._ids = itertools.count(1)
+        self._starting: t.Dict[int, Future] = {}
+        self._children: t.Dict[int, t.Tuple[asyncio.AbstractEventLoop, ForkedProcess]] = {}
+        # 启动回复与退出通知之间的退出通知(子进程很快退出时)
+        self._exited: t.Dict[int, int] = {}
+
+    def _ensure_started(self) -> socket.socket:
+        if self._sock is not None:
+            return self._sock
+        parent, child = socket.socketpair()
+        try:
+            self._zygote = subprocess.Popen(
+                [self.python, str(ZYGOTE_SCRIPT), str(child.fileno()), *self.preload],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                pass_fds=(child.fileno(),),
+                close_fds=True,
+            )
+        except BaseException:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        self._sock = parent
+        threading.Thread(
+            target=self._read, args=(parent,), name=f"ForkServer-{self._zygote.pid}", daemon=True
+        ).start()
+        logging.info(f"Fork server for {self.python} started, pid {self._zygote.pid}")
+        return parent
+
+    def _read(self, sock: socket.socket) -> None:
+        buffer = b""
+        try:
+            while data := sock.recv(65536):
+                buffer += data
+                while len(buffer) >= _LENGTH.size:
+                    (size,) = _LENGTH.unpack_from(buffer)
+                    if len(buffer) < _LENGTH.size + size:
+                        break
+                    message = json.loads(buffer[_LENGTH.size:_LENGTH.size + size])
+                    buffer = buffer[_LENGTH.size + size:]
+                    self._dispatch(message)
+        except OSError:
+            pass
+        finally:
+            self._closed(sock)
+
+    def _dispatch(self, message: dict) -> None:
+        kind = message.get("type")
+        with self._lock:
+            if kind == "started":
+                future = self._starting.pop(message["id"], None)
+                if future is not None:
+                    future.set_result(message["pid"])
+            elif kind == "error":
+                future = self._starting.pop(message["id"], None)
+                if future is not None:
+                    future.set_exception(OSError(message["message"]))
+            elif kind == "exit":
+                child = self._children.pop(message["pid"], None)
+                if child is None:
+                    self._exited[message["pid"]] = message["code"]
+                else:
+                    loop, process = child
+                    loop.call_soon_threadsafe(process._set_returncode, message["code"])
+
+    def _closed(self, sock: socket.socket) -> None:
+        """zygote 已退出: 结束所有等待中的请求与子进程"""
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+                logging.warning(f"Fork server for {self.python} exited")
+            sock.close()
+            starting, self._starting = self._starting, {}
+            children, self._children = self._children, {}
+            self._exited.clear()
+        for future in starting.values():
+            future.set_exception(OSError("Fork server exited"))
+        for loop, process in children.values():
+            loop.call_soon_threadsafe(process._set_returncode, None)
+
+    async def create_process(
+        self,
+        program: str,
+        *args: str,
+        stdout: t.Any = None,
+        stderr: t.Any = None,
+        env: t.Optional[t.Mapping[str, str]] = None,
+        cwd: t.Optional[str] = None,
+        **kwargs,
+    ) -> ForkedProcess:
+        """启动子进程执行 args[0] 指定的脚本(参数同 asyncio.create_subprocess_exec)
+
+        program 为解释器路径, 仅用于记录; stdin 总是 /dev/null,
+        stdout/stderr 支持文件对象、文件描述符、None、PIPE 与 STDOUT。
+        """
+        loop = asyncio.get_running_loop()
+        reader: t.Optional[asyncio.StreamReader] = None
+        owned: t.List[int] = []
+        try:
+            if stdout == asyncio.subprocess.PIPE:
+                read_fd, write_fd = os.pipe()
+                owned.append(write_fd)
+                reader = asyncio.StreamReader(loop=loop)
+                await loop.connect_read_pipe(
+                    lambda: asyncio.StreamReaderProtocol(reader, loop=loop),
+                    os.fdopen(read_fd, "rb", buffering=0),
+                )
+                out_fd = write_fd
+            else:
+                out_fd = self._fileno(stdout, 1)
+            err_fd = out_fd if stderr == asyncio.subprocess.STDOUT else self._fileno(stderr, 2)
+
+            request = {
+                "argv": list(args),
+                "env": dict(os.environ if env is None else env),
+                "cwd": cwd or os.getcwd(),
+                "nfds": 2,
+            }
+            future: Future = Future()
+            with self._lock:
+                sock = self._ensure_started()
+                request["id"] = next(self._ids)
+                self._starting[request["id"]] = future
+                data = json.dumps(request).encode("utf-8")
+                socket.send_fds(sock, [_LENGTH.pack(len(data)) + data], [out_fd, err_fd])
+            pid = await asyncio.wrap_future(future)
+        finally:
+            for fd in owned:
+                os.close(fd)
+
+        process = ForkedProcess(pid, reader)
+        with self._lock:
+            code = self._exited.pop(pid, None)
+            if code is None:
+                self._children[pid] = (loop, process)
+        if code is not None:
+            process._set_returncode(code)
+        return process
+
+    @staticmethod
+    def _fileno(stream: t.Any, default: int) -> int:
+        if stream is None:
+            return default
+        if stream == subprocess.DEVNULL:
+            raise ValueError("DEVNULL output is not supported by the fork server")
+        if isinstance(stream, int):
+            return stream
+        return stream.fileno()
+
+    def close(self) -> None:
+        """关闭控制套接字, zygote 随之退出(已启动的子进程不受影响)"""
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+
+
+class ForkServerPool:
+    """按解释器管理 fork 服务器(首次使用时启动)"""
+
+    def __init__(self, preload: t.Sequence[str] = DEFAULT_PRELOAD):
+        self.preload = tuple(preload)
+        self._servers: t.Dict[str, ForkServer] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supported() -> bool:
+        """当前平台是否支持 fork 服务器"""
+        return (
+            hasattr(os, "fork")
+            and hasattr(socket, "send_fds")
+            and sys.platform != "win32"
+            and ZYGOTE_SCRIPT.exists()
+        )
+
+    def get(self, python: str) -> ForkServer:
+        """获取解释器对应的 fork 服务器"""
+        with self._lock:
+            server = self._servers.get(python)
+            if server is None:
+                server = self._servers[python] = ForkServer(python, self.preload)
+            return server
+
+    def close(self) -> None:
+        """关闭所有 fork 服务器"""
+        with self._lock:
+            servers, self._servers = list(self._servers.values()), {}
+        for server in servers:
+            server.close()
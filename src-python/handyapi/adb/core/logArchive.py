@@ -0,0 +1,240 @@
+"""ADB任务日志归档模块
+
+归档格式(.hlz): 日志按固定大小切块, 每块独立 zlib 压缩, 文件末尾保存块偏移索引,
+因此可以只解压所需的块来读取任意 [pos, pos + size) 区间。
+
+    header : MAGIC(4) block_size(u32)
+    blocks : zlib(block0) zlib(block1) ...
+    index  : (raw_offset(u64) comp_offset(u64) comp_size(u32)) * count
+    footer : index_offset(u64) count(u32) raw_size(u64) MAGIC(4)
+"""
+
+import bisect
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import typing as t
+import zlib
+from pathlib import Path
+
+if t.TYPE_CHECKING:
+    from .scriptManager import ScriptManager
+
+MAGIC = b"HLZ1"
+ARCHIVE_SUFFIX = ".hlz"
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+_HEADER = struct.Struct("<4sI")
+_ENTRY = struct.Struct("<QQI")
+_FOOTER = struct.Struct("<QIQ4s")
+
+
+# 任务日志的文件名(见 ScriptManager.generate_log_file): 时间戳-脚本名[-序号].log
+TASK_LOG_PATTERN = re.compile(r"\d{8}-\d{6}-.+\.log")
+
+
+def is_task_log(path: Path) -> bool:
+    """是否为任务日志或其归档(日志目录中的其他文件不归档也不清理)"""
+    name = path.name.removesuffix(ARCHIVE_SUFFIX)
+    return TASK_LOG_PATTERN.fullmatch(name) is not None
+
+
+def archive_path(logfile: Path) -> Path:
+    """日志文件对应的归档文件路径"""
+    return logfile.with_name(logfile.name + ARCHIVE_SUFFIX)
+
+
+def compress_log(
+    src: Path, dst: t.Optional[Path] = None, block_size: int = DEFAULT_BLOCK_SIZE, level: int = 6
+) -> Path:
+    """压缩日志文件为可随机读取的归档文件(先写临时文件再原子替换)"""
+    dst = dst or archive_path(src)
+    tmp = dst.with_name(dst.name + ".tmp")
+    index: t.List[t.Tuple[int, int, int]] = []
+    raw_offset = 0
+    with src.open("rb") as fin, tmp.open("wb") as fout:
+        fout.write(_HEADER.pack(MAGIC, block_size))
+        while block := fin.read(block_size):
+            data = zlib.compress(block, level)
+            index.append((raw_offset, fout.tell(), len(data)))
+            fout.write(data)
+            raw_offset += len(block)
+        index_offset = fout.tell()
+        for entry in index:
+            fout.write(_ENTRY.pack(*entry))
+        fout.write(_FOOTER.pack(index_offset, len(index), raw_offset, MAGIC))
+    os.replace(tmp, dst)
+    # 保留原日志的修改时间, 便于按时间清理
+    st = src.stat()
+    os.utime(dst, (st.st_atime, st.st_mtime))
+    return dst
+
+
+class LogArchive:
+    """归档日志读取器"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            magic, self.block_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a log archive")
+            f.seek(-_FOOTER.size, os.SEEK_END)
+            index_offset, count, self.size, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is truncated")
+            f.seek(index_offset)
+            raw = f.read(count * _ENTRY.size)
+        self.index = [_ENTRY.unpack_from(raw, i * _ENTRY.size) for i in range(count)]
+        self._offsets = [entry[0] for entry in self.index]
+        self._cache: t.Tuple[int, bytes] = (-1, b"")
+        self._lock = threading.Lock()
+
+    def _block(self, f: t.BinaryIO, i: int) -> bytes:
+        with self._lock:
+            if self._cache[0] == i:
+                return self._cache[1]
+        _, comp_offset, comp_size = self.index[i]
+        f.seek(comp_offset)
+        data = zlib.decompress(f.read(comp_size))
+        with self._lock:
+            self._cache = (i, data)
+        return data
+
+    def read(self, pos: int, size: int = -1) -> bytes:
+        """读取原始日志 [pos, pos + size), size < 0 表示到末尾"""
+        end = self.size if size < 0 else min(self.size, pos + size)
+        if pos >= end:
+            return b""
+        chunks = []
+        i = bisect.bisect_right(self._offsets, pos) - 1
+        with self.path.open("rb") as f:
+            while pos < end:
+                block = self._block(f, i)
+                start = pos - self._offsets[i]
+                piece = block[start:start + end - pos]
+                chunks.append(piece)
+                pos += len(piece)
+                i += 1
+        return b"".join(chunks)
+
+    def iter_blocks(self, pos: int = 0) -> t.Iterator[bytes]:
+        """从 pos 开始按块依次返回解压后的内容"""
+        if pos >= self.size:
+            return
+        i = bisect.bisect_right(self._offsets, pos) - 1
+        with self.path.open("rb") as f:
+            for i in range(i, len(self.index)):
+                block = self._block(f, i)
+                yield block[max(0, pos - self._offsets[i]):]
+
+
+class LogArchiver:
+    """后台日志归档与清理
+
+    - 压缩已结束任务的日志(以及之前运行遗留的未压缩日志)
+    - 删除超过保留天数的日志
+    - 日志总大小超过配额时从最旧的开始删除
+
+    只处理按任务日志命名的文件, 日志目录中的其他文件不受影响。
+    """
+
+    def __init__(
+        self,
+        manager: "ScriptManager",
+        retention_days: float = 30,
+        quota_mb: float = 2048,
+        interval: float = 300,
+        compress: bool = True,
+    ):
+        self.manager = manager
+        self.retention = retention_days * 24 * 3600
+        self.quota = int(quota_mb * 1024 * 1024)
+        self.interval = interval
+        self.compress = compress
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="LogArchiver", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"LogArchiver failed: {e}", exc_info=True)
+
+    def _active_logs(self) -> t.Set[Path]:
+        """未结束任务正在写入的日志"""
+        return {
+            task.logfile
+            for task in self.manager.get_task().values()
+            if task.logfile is not None and task.endtime is None
+        }
+
+    def run_once(self) -> None:
+        """执行一次归档与清理"""
+        logdir = self.manager.logdir
+        if not logdir.exists():
+            return
+        active = self._active_logs()
+
+        if self.compress:
+            tasks = {task.logfile: task for task in self.manager.get_task().values()}
+            for logfile in logdir.glob("*.log"):
+                if logfile in active or not is_task_log(logfile):
+                    continue
+                try:
+                    task = tasks.get(logfile)
+                    if task is not None:
+                        task.archive_log()
+                        self.manager.task_changed(task)
+                    else:
+                        compress_log(logfile)
+                        logfile.unlink()
+                except OSError as e:
+                    logging.warning(f"Failed to archive {logfile}: {e}")
+
+        files = []
+        for path in list(logdir.glob("*.log")) + list(logdir.glob("*.log" + ARCHIVE_SUFFIX)):
+            if path in active or not is_task_log(path):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+
+        # 内存中的任务的日志或归档被清理后, 清除任务的归档路径并通知前端
+        owners = {}
+        for task in self.manager.get_task().values():
+            for path in (task.logfile, task.archive):
+                if path is not None:
+                    owners[path] = task
+        total = sum(size for _, size, _ in files)
+        expire = time.time() - self.retention
+        for mtime, size, path in files:
+            if mtime >= expire and total <= self.quota:
+                break
+            try:
+                path.unlink()
+                total -= size
+                logging.info(f"Removed old log {path}")
+                task = owners.get(path)
+                if task is not None:
+                    task.get_log_archive()
+                    self.manager.task_changed(task)
+            except OSError as e:
+                logging.warning(f"Failed to remove {path}: {e}")
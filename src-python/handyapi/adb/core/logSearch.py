@@ -0,0 +1,221 @@
+"""ADB任务日志搜索模块"""
+
+import bisect
+import re
+import threading
+import typing as t
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from ..models.scriptModel import IdType
+from .logArchive import LogArchive
+
+CHUNK_SIZE = 1024 * 1024
+MAX_LINE_TEXT = 512
+
+
+class LineIndex:
+    """日志行偏移索引, 随日志增长增量建立"""
+
+    def __init__(self, ident: t.Optional[int] = None):
+        # 归档日志以修改时间为标识(归档后不再变化), 未归档的日志只会增长
+        self.ident = ident
+        self.starts = array("Q", [0])
+        self.scanned: int = 0
+        self.lock = threading.Lock()
+
+    def feed(self, pos: int, chunk: bytes) -> None:
+        """索引 pos 处的数据块(只处理尚未索引的部分)"""
+        skip = self.scanned - pos
+        if skip < 0 or skip >= len(chunk):
+            return
+        i = chunk.find(b"\n", skip)
+        while i >= 0:
+            self.starts.append(pos + i + 1)
+            i = chunk.find(b"\n", i + 1)
+        self.scanned = pos + len(chunk)
+
+    def line_of(self, offset: int) -> int:
+        """偏移所在的行号(从1开始)"""
+        return bisect.bisect_right(self.starts, offset)
+
+
+class ScanState:
+    """单个日志在某个搜索条件下的扫描进度, 日志增长后从 done 处继续扫描"""
+
+    __slots__ = ("ident", "done", "matches")
+
+    def __init__(self, ident: t.Optional[int]):
+        self.ident = ident
+        # 已扫描的完整行的末尾偏移, 及其中的匹配
+        self.done: int = 0
+        self.matches: t.List[dict] = []
+
+
+class LogSource:
+    """参与搜索的日志"""
+
+    def __init__(self, taskid: IdType, path: Path, archived: bool):
+        self.taskid = taskid
+        self.path = path
+        self.archived = archived
+
+    def stat(self) -> t.Tuple[t.Optional[int], int]:
+        """(标识, 原始日志大小)"""
+        if self.archived:
+            return self.path.stat().st_mtime_ns, LogArchive(self.path).size
+        return None, self.path.stat().st_size
+
+    def iter_chunks(self, start: int, limit: int) -> t.Iterator[t.Tuple[int, bytes]]:
+        """按顺序返回 [start, limit) 范围内的 (偏移, 数据块)"""
+        pos = start
+        if self.archived:
+            for block in LogArchive(self.path).iter_blocks(start):
+                if pos >= limit:
+                    return
+                block = block[:limit - pos]
+                yield pos, block
+                pos += len(block)
+            return
+        with self.path.open("rb") as f:
+            f.seek(start)
+            while pos < limit and (chunk := f.read(min(CHUNK_SIZE, limit - pos))):
+                yield pos, chunk
+                pos += len(chunk)
+
+
+class LogSearcher:
+    """跨任务日志搜索
+
+    - 多个日志在线程池中并行扫描, 结果按日志完成顺序返回
+    - 每个日志维护行偏移索引, 日志增长时只索引新增部分, 新的搜索条件不再重新索引
+    - 每个日志记录各搜索条件的扫描进度, 相同条件再次搜索时只扫描新增部分,
+      已有足够匹配时不再读取日志
+    """
+
+    def __init__(self, workers: int = 4, cache_size: int = 256):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LogSearch")
+        self.cache_size = cache_size
+        self._indexes: t.Dict[Path, LineIndex] = {}
+        self._states: OrderedDict[tuple, ScanState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index_for(self, path: Path, ident: t.Optional[int], size: int) -> LineIndex:
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None or index.ident != ident or index.scanned > size:
+                index = self._indexes[path] = LineIndex(ident)
+            return index
+
+    def _state_for(self, key: tuple, ident: t.Optional[int], size: int) -> ScanState:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.ident != ident or state.done > size:
+                state = self._states[key] = ScanState(ident)
+            self._states.move_to_end(key)
+            while len(self._states) > self.cache_size:
+                self._states.popitem(last=False)
+            return state
+
+    def scan(self, source: LogSource, pattern: re.Pattern, limit: int) -> t.List[dict]:
+        """扫描单个日志, 每个匹配行返回一条结果"""
+        try:
+            ident, size = source.stat()
+        except (FileNotFoundError, ValueError):
+            return []
+        index = self._index_for(source.path, ident, size)
+        carry = b""
+        with index.lock:
+            state = self._state_for((source.path, pattern.pattern, pattern.flags, limit), ident, size)
+            carry_pos = state.done
+            try:
+                if index.scanned < state.done:
+                    # 索引已被重建, 先补齐进度之前的部分
+                    for pos, chunk in source.iter_chunks(index.scanned, state.done):
+                        index.feed(pos, chunk)
+                chunks = source.iter_chunks(state.done, size) if len(state.matches) < limit else ()
+                for pos, chunk in chunks:
+                    index.feed(pos, chunk)
+                    buf = carry + chunk
+                    cut = buf.rfind(b"\n") + 1
+                    if cut == 0:
+                        carry = buf
+                        continue
+                    self._match(source, index, pattern, buf[:cut], carry_pos, state.matches, limit)
+                    carry, carry_pos = buf[cut:], carry_pos + cut
+                    state.done = carry_pos
+                    if len(state.matches) >= limit:
+                        break
+            except (FileNotFoundError, ValueError):
+                # 日志在搜索期间被归档或删除
+                return list(state.matches)
+            matches = list(state.matches)
+            if carry and len(matches) < limit:
+                # 末尾不完整的行(日志仍在写入)不计入进度, 下次从行首重新扫描
+                self._match(source, index, pattern, carry, carry_pos, matches, limit)
+        return matches
+
+    @staticmethod
+    def _match(
+        source: LogSource,
+        index: LineIndex,
+        pattern: re.Pattern,
+        text: bytes,
+        base: int,
+        matches: t.List[dict],
+        limit: int,
+    ) -> None:
+        last_line = -1
+        for m in pattern.finditer(text):
+            start = text.rfind(b"\n", 0, m.start()) + 1
+            if start == last_line:
+                continue
+            last_line = start
+            end = text.find(b"\n", m.start())
+            line = text[start:end if end >= 0 else len(text)].rstrip(b"\r")
+            offset = base + m.start()
+            matches.append({
+                "taskId": source.taskid,
+                "line": index.line_of(offset),
+                "offset": offset,
+                "text": line[:MAX_LINE_TEXT].decode("utf-8", errors="replace"),
+            })
+            if len(matches) >= limit:
+                return
+
+    def search(
+        self,
+        sources: t.List[LogSource],
+        pattern: re.Pattern,
+        limit: int = 1000,
+    ) -> t.Iterator[dict]:
+        """并行搜索多个日志, 最多返回 limit 条匹配"""
+        with self._lock:
+            alive = {source.path for source in sources}
+            for path in list(self._indexes):
+                if path not in alive:
+                    del self._indexes[path]
+
+        futures = [self.pool.submit(self.scan, source, pattern, limit) for source in sources]
+        count = 0
+        try:
+            for future in as_completed(futures):
+                for match in future.result():
+                    yield match
+                    count += 1
+                    if count >= limit:
+                        return
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def compile_pattern(query: str, regex: bool = False, ignore_case: bool = False) -> re.Pattern:
+    """编译搜索条件(按 UTF-8 字节匹配)"""
+    flags = re.IGNORECASE if ignore_case else 0
+    source = query.encode("utf-8")
+    if not regex:
+        source = re.escape(source)
+    return re.compile(source, flags | re.MULTILINE)
@@ -0,0 +1,274 @@
+"""ADB脚本执行指标模块
+
+不依赖 prometheus_client 的最小实现: Counter、Gauge、Histogram 与 Registry,
+Registry.render() 生成 Prometheus 文本格式(0.0.4), 由 /metrics 返回。
+
+记录指标只是加锁后更新几个数值; 带标签的指标按标签值缓存子指标,
+热点路径可预先取得子指标再反复使用。
+"""
+
+import bisect
+import math
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认桶(秒): 覆盖毫秒级的接口延迟到数分钟的脚本运行
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: t.Sequence[str], values: t.Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类: 按标签值管理子指标"""
+
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str] = (),
+        registry: t.Optional["Registry"] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: t.Dict[t.Tuple[str, ...], t.Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self) -> t.Any:
+        raise NotImplementedError
+
+    def labels(self, *values: t.Any) -> t.Any:
+        """取得标签值对应的子指标"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> t.Iterator[str]:
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(self.name, self.labelnames, key)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, names: t.Sequence[str], values: t.Sequence[str]) -> t.Iterator[str]:
+        yield f"{name}{_format_labels(names, values)} {_format_value(self.value)}"
+
+
+class Counter(_Metric):
+    """只增不减的计数器(名称应以 _total 结尾)"""
+
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function: t.Optional[t.Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: t.Optional[t.Callable[[], float]]) -> None:
+        """输出时调用 function 取值(如队列长度)"""
+        self.function = function
+
+    def samples(self, name: str, names: t.Sequence[str], values: t.Sequence[str]) -> t.Iterator[str]:
+        function = self.function
+        value = self.value
+        if function is not None:
+            try:
+                value = float(function())
+            except Exception:
+                value = math.nan
+        yield f"{name}{_format_labels(names, values)} {_format_value(value) if value == value else 'NaN'}"
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._children[()].dec(amount)
+
+    def set_function(self, function: t.Optional[t.Callable[[], float]]) -> None:
+        self._children[()].set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: t.Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> t.Iterator[None]:
+        """记录 with 块的耗时(秒)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name: str, names: t.Sequence[str], values: t.Sequence[str]) -> t.Iterator[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            yield f"{name}_bucket{_format_labels(names, values, le)} {cumulative}"
+        yield f"{name}_sum{_format_labels(names, values)} {_format_value(total)}"
+        yield f"{name}_count{_format_labels(names, values)} {cumulative}"
+
+
+class Histogram(_Metric):
+    """按桶统计的分布(如耗时)"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str] = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+        registry: t.Optional["Registry"] = None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def time(self) -> t.ContextManager[None]:
+        return self._children[()].time()
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: t.Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+# 执行流水线的指标
+EXECUTE_SECONDS = Histogram(
+    "handy_execute_seconds",
+    "Time spent in each stage of executing a script (lookup, validate, submit, spawn)",
+    ["stage"],
+)
+TASKS_TOTAL = Counter(
+    "handy_tasks_total",
+    "Finished tasks by script and result (ok, failed, cancelled, cached)",
+    ["script", "result"],
+)
+TASK_RUN_SECONDS = Histogram(
+    "handy_task_run_seconds", "Task run duration from start to exit", ["script"]
+)
+QUEUE_DEPTH = Gauge("handy_task_queue_depth", "Tasks waiting for an execution slot")
+RUNNING_TASKS = Gauge("handy_tasks_running", "Tasks holding an execution slot")
+LOG_BYTES_WRITTEN = Counter("handy_log_bytes_written_total", "Log bytes written by finished tasks")
+LOG_BYTES_READ = Counter(
+    "handy_log_bytes_read_total", "Log bytes sent to clients", ["endpoint"]
+)
+WEBSOCKET_CLIENTS = Gauge("handy_websocket_clients", "Connected WebSocket clients", ["endpoint"])
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "handy_websocket_send_seconds", "Time to send one WebSocket message", ["endpoint"]
+)
+CATALOG_RELOAD_SECONDS = Histogram(
+    "handy_catalog_reload_seconds", "Time to reload the script catalog"
+)
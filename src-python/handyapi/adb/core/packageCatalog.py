@@ -0,0 +1,355 @@
+"""ADB多脚本包目录模块
+
+每个脚本包对应一个 PackageEntry; 配置了多个脚本包时, 每个包作为一个顶层分组
+(命名空间)合并到 MergedCatalog 中, 并可延迟加载: 启动时只读取包信息,
+脚本树在首次展开或执行时才校验并建立索引。
+"""
+
+import functools
+import json
+import logging
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ..models.scriptModel import IdType, ScriptInfo, GroupInfo, ScriptPackage
+from ..utils.httpCache import CachedBody
+from .scriptCatalog import ScriptCatalog, assign_ids, derive_id
+
+MAX_LOAD_WORKERS = 8
+
+
+def read_header(path: Path) -> ScriptPackage:
+    """只读取并校验脚本包信息(不校验脚本树)"""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} is not a script package")
+    return ScriptPackage.model_validate({**data, "scripts": []}, context={"source": path})
+
+
+class PackageEntry:
+    """一个已配置的脚本包(加载后不再修改, 加载或重新加载时生成新对象)"""
+
+    def __init__(
+        self,
+        path: Path,
+        group: GroupInfo,
+        header: t.Optional[ScriptPackage] = None,
+        catalog: t.Optional[ScriptCatalog] = None,
+        error: t.Optional[str] = None,
+    ):
+        self.path = path
+        self.group = group
+        self.header = header
+        self.catalog = catalog
+        self.error = error
+
+    @property
+    def loaded(self) -> bool:
+        """脚本树是否已加载"""
+        return self.catalog is not None
+
+    @property
+    def python(self) -> t.Optional[str]:
+        """包内 python 脚本使用的解释器"""
+        package = self.catalog.package if self.catalog else self.header
+        return package.python if package else None
+
+    @functools.cached_property
+    def script_ids(self) -> t.FrozenSet[IdType]:
+        """包内所有脚本的 id
+
+        未加载的包只解析 JSON 并按加载时的规则生成 id, 不校验脚本树,
+        用于按 id 找到需要加载的包。
+        """
+        if self.catalog is not None:
+            return frozenset(self.catalog.scripts)
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            items = assign_ids(data["scripts"], data.get("id"))
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logging.warning(f"Failed to read script ids of {self.path}: {e}")
+            return frozenset()
+
+        ids: t.Set[IdType] = set()
+
+        def collect(items: t.List[t.Any]) -> None:
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                if isinstance(item.get("children"), list):
+                    collect(item["children"])
+                elif "id" in item:
+                    ids.add(item["id"])
+
+        collect(items)
+        return frozenset(ids)
+
+    @classmethod
+    def open(
+        cls, path: Path, lazy: bool, previous: t.Optional["PackageEntry"] = None
+    ) -> "PackageEntry":
+        """打开脚本包, lazy 为真且之前未加载过时只读取包信息
+
+        命名空间分组的 id 由脚本包 id 生成, 与包内条目一样重新加载后保持不变。
+        """
+        if lazy and not (previous and previous.loaded):
+            header = read_header(path)
+            catalog = None
+        else:
+            catalog = ScriptCatalog.load(path, previous.catalog if previous else None)
+            header = catalog.package
+        group = GroupInfo(
+            id=derive_id(header.id),
+            name=header.name,
+            type="scriptgroup",
+            label=header.label,
+            description=header.description,
+            children=catalog.package.scripts.root if catalog else [],
+        )
+        return cls(path, group, header, catalog)
+
+    @classmethod
+    def failed(
+        cls, path: Path, error: Exception, previous: t.Optional["PackageEntry"] = None
+    ) -> "PackageEntry":
+        """无法读取的脚本包: 保留之前的内容, 下次加载时重试
+
+        能读取包信息时分组 id 与加载成功后一致(由脚本包 id 生成), 否则由路径生成。
+        """
+        logging.error(f"Failed to load script package {path}: {error}")
+        if previous is not None:
+            return cls(path, previous.group, previous.header, previous.catalog, str(error))
+        try:
+            header: t.Optional[ScriptPackage] = read_header(path)
+        except Exception:
+            header = None
+        if header is not None:
+            group = GroupInfo(
+                id=derive_id(header.id),
+                name=header.name,
+                type="scriptgroup",
+                label=header.label,
+                description=header.description,
+            )
+        else:
+            group = GroupInfo(
+                id=derive_id(str(path)), name=path.stem, type="scriptgroup", label=path.stem, description=""
+            )
+        return cls(path, group, header, error=str(error))
+
+    def info(self) -> dict:
+        """包信息"""
+        return {
+            "id": self.group.id,
+            "name": self.group.name,
+            "label": self.group.label,
+            "path": str(self.path),
+            "loaded": self.loaded,
+            "error": self.error,
+        }
+
+
+def open_packages(
+    paths: t.Sequence[Path],
+    lazy: bool,
+    previous: t.Sequence[PackageEntry] = (),
+    strict: t.Sequence[Path] = (),
+) -> t.List[PackageEntry]:
+    """并行打开多个脚本包
+
+    previous 中同一路径的包作为增量加载的基础; strict 中的包打开失败时抛出异常,
+    其余包失败时记录错误并保留之前的内容。
+    """
+    old = {entry.path: entry for entry in previous}
+
+    def open_one(path: Path) -> PackageEntry:
+        try:
+            return PackageEntry.open(path, lazy and path not in strict, old.get(path))
+        except Exception as e:
+            if path in strict:
+                raise
+            return PackageEntry.failed(path, e, old.get(path))
+
+    if len(paths) == 1:
+        return [open_one(paths[0])]
+    with ThreadPoolExecutor(max_workers=min(len(paths), MAX_LOAD_WORKERS)) as pool:
+        return list(pool.map(open_one, paths))
+
+
+class MergedCatalog:
+    """多个脚本包合并后的目录, 接口与 ScriptCatalog 相同
+
+    只有一个脚本包时不增加命名空间分组, 与单独的 ScriptCatalog 结果一致。
+    """
+
+    def __init__(self, entries: t.Sequence[PackageEntry], version: int = 1):
+        self.entries: t.Tuple[PackageEntry, ...] = tuple(entries)
+        self.version: int = version
+        self.namespaced: bool = len(self.entries) > 1
+        self.scripts: t.Dict[IdType, ScriptInfo] = {}
+        self.groups: t.Dict[IdType, GroupInfo] = {}
+        self.paths: t.Dict[IdType, t.Tuple[IdType, ...]] = {}
+        self.owners: t.Dict[IdType, PackageEntry] = {}
+        # 不同脚本包之间重复的 id(先加载的包优先)
+        self.conflicts: t.Dict[IdType, Path] = {}
+
+        for entry in self.entries:
+            prefix: t.Tuple[IdType, ...] = ()
+            if self.namespaced:
+                prefix = (entry.group.id,)
+                self._add(entry, entry.group.id, (), group=entry.group)
+            if entry.catalog is None:
+                continue
+            catalog = entry.catalog
+            for item, path in catalog.paths.items():
+                self._add(
+                    entry,
+                    item,
+                    prefix + path,
+                    script=catalog.scripts.get(item),
+                    group=catalog.groups.get(item),
+                )
+        if self.conflicts:
+            logging.error(
+                "Duplicate ids across script packages: "
+                + ", ".join(f"{i} ({path})" for i, path in self.conflicts.items())
+            )
+
+    def _add(
+        self,
+        entry: PackageEntry,
+        item: IdType,
+        path: t.Tuple[IdType, ...],
+        script: t.Optional[ScriptInfo] = None,
+        group: t.Optional[GroupInfo] = None,
+    ) -> None:
+        if item in self.paths:
+            self.conflicts[item] = entry.path
+            return
+        self.paths[item] = path
+        if script is not None:
+            self.scripts[item] = script
+            self.owners[item] = entry
+        if group is not None:
+            self.groups[item] = group
+
+    @property
+    def package(self) -> t.Optional[ScriptPackage]:
+        """主脚本包(第一个)"""
+        entry = self.entries[0]
+        return entry.catalog.package if entry.catalog else None
+
+    @property
+    def pending(self) -> t.List[PackageEntry]:
+        """尚未加载脚本树的包"""
+        return [entry for entry in self.entries if not entry.loaded]
+
+    def entry(self, gid: IdType) -> t.Optional[PackageEntry]:
+        """按命名空间分组 id 查找脚本包"""
+        for entry in self.entries:
+            if entry.group.id == gid:
+                return entry
+        return None
+
+    def replace(self, entries: t.Sequence[PackageEntry]) -> "MergedCatalog":
+        """替换部分脚本包, 生成新目录"""
+        updated = {entry.path: entry for entry in entries}
+        return MergedCatalog(
+            [updated.get(entry.path, entry) for entry in self.entries], self.version + 1
+        )
+
+    @functools.cached_property
+    def commands(self) -> CachedBody:
+        """命令树的 JSON 响应体(每个目录版本只生成一次)
+
+        各包的脚本树直接拼接其已缓存的响应体; 未加载的包只输出分组信息并标记 lazy。
+        """
+        if not self.namespaced:
+            catalog = self.entries[0].catalog
+            return catalog.commands if catalog else CachedBody(b"[]")
+        parts = []
+        for entry in self.entries:
+            head = {
+                "id": entry.group.id,
+                "name": entry.group.name,
+                "type": "scriptgroup",
+                "label": entry.group.label,
+                "description": entry.group.description,
+            }
+            if entry.catalog is None:
+                head["lazy"] = True
+            body = json.dumps(head, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if entry.catalog is not None:
+                body = body[:-1] + b',"children":' + entry.catalog.commands.body + b"}"
+            parts.append(body)
+        return CachedBody(b"[" + b",".join(parts) + b"]")
+
+    @functools.cached_property
+    def placements(self) -> t.Dict[IdType, t.Tuple[t.Optional[IdType], t.Optional[IdType]]]:
+        """各脚本/分组在命令树中的位置: (父分组 id, 前一个兄弟节点 id), 按命令树先序排列"""
+        placements: t.Dict[IdType, t.Tuple[t.Optional[IdType], t.Optional[IdType]]] = {}
+
+        def walk(parent: t.Optional[IdType], children: t.Iterable[t.Union[GroupInfo, ScriptInfo]]) -> None:
+            after = None
+            for child in children:
+                if child.id in placements:
+                    # 与之前的包重复的 id 被忽略
+                    continue
+                placements[child.id] = (parent, after)
+                after = child.id
+                if isinstance(child, GroupInfo):
+                    walk(child.id, child.children)
+
+        if self.namespaced:
+            walk(None, [entry.group for entry in self.entries])
+        elif self.entries[0].catalog is not None:
+            walk(None, self.entries[0].catalog.package.scripts.root)
+        return placements
+
+    def _node(self, item: IdType) -> t.Union[GroupInfo, ScriptInfo, None]:
+        return self.scripts.get(item) or self.groups.get(item)
+
+    def diff(self, old: "MergedCatalog") -> dict:
+        """与旧目录相比的变化
+
+        added/removed 为新增与移除的脚本/分组 id; changed 为新增及内容或位置有变化的
+        节点(id -> 父分组、前一个兄弟节点、先序序号及不含 children 的节点信息),
+        客户端据此增量更新命令树, 无需重新获取整棵树。
+        """
+        new_ids = self.scripts.keys() | self.groups.keys()
+        old_ids = old.scripts.keys() | old.groups.keys()
+        changed = {}
+        for order, (item, placement) in enumerate(self.placements.items()):
+            node, previous = self._node(item), old._node(item)
+            if node is None:
+                continue
+            if previous is node and old.placements.get(item) == placement:
+                # 未重新加载的包直接复用节点
+                continue
+            fields = node.model_dump(mode="json", exclude={"children"}, exclude_none=True)
+            if (
+                previous is not None
+                and old.placements.get(item) == placement
+                and previous.model_dump(mode="json", exclude={"children"}, exclude_none=True) == fields
+            ):
+                continue
+            parent, after = placement
+            changed[item] = {"parent": parent, "after": after, "order": order, "item": fields}
+        return {
+            "version": self.version,
+            "added": sorted(new_ids - old_ids),
+            "removed": sorted(old_ids - new_ids),
+            "changed": changed,
+        }
+
+    def find_script(self, sid: IdType) -> t.Optional[ScriptInfo]:
+        """查找脚本信息"""
+        return self.scripts.get(sid)
+
+    def get_group_path(self, sid: IdType) -> t.Optional[t.List[GroupInfo]]:
+        """获取脚本/分组所在的分组路径(由外到内)"""
+        path = self.paths.get(sid)
+        if path is None:
+            return None
+        return [self.groups[gid] for gid in path]
@@ -0,0 +1,147 @@
+"""ADB脚本结果缓存模块
+
+标记为 cacheable 的脚本(只读查询)成功执行后, 退出码与日志按
+(脚本 id, 脚本文件内容哈希, 规范化后的命令行参数) 缓存; 有效期内再次以相同参数
+执行时直接生成已结束的任务, 不启动子进程。
+"""
+
+import hashlib
+import json
+import logging
+import re
+import shutil
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+from ..models.scriptModel import IdType
+
+# 缓存文件所在的子目录(缓存只管理该目录中自己生成的文件)
+CACHE_SUBDIR = "handy-result-cache"
+_KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class CacheEntry:
+    """一条缓存结果"""
+
+    def __init__(self, key: str, path: Path, returncode: int, size: int, expires: float):
+        self.key = key
+        self.path = path
+        self.returncode = returncode
+        self.size = size
+        self.expires = expires
+
+
+class ResultCache:
+    """脚本结果缓存, 日志总大小超过上限时按最近最少使用淘汰
+
+    索引只在内存中, 启动时删除上次遗留的缓存日志。缓存文件放在配置目录下
+    专用的 handy-result-cache 子目录中, 只删除其中由缓存生成的文件, 不删除配置的目录。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory / CACHE_SUBDIR
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._hashes: t.Dict[Path, t.Tuple[t.Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._remove_stale()
+
+    def _remove_stale(self) -> None:
+        """删除上次运行遗留的缓存文件(文件名为缓存键)"""
+        for path in self.directory.iterdir():
+            if path.suffix in (".log", ".tmp") and _KEY_PATTERN.fullmatch(path.stem):
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logging.warning(f"Failed to remove stale cached result {path}: {e}")
+
+    def file_hash(self, path: Path) -> str:
+        """脚本文件内容哈希(按修改时间与大小缓存)"""
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+        with self._lock:
+            self._hashes[path] = (stamp, digest)
+        return digest
+
+    def key(self, sid: IdType, script: Path, cmdline: t.Sequence[str]) -> str:
+        """缓存键: 脚本 id、脚本文件内容与命令行(参数校验并规范化后生成)"""
+        data = json.dumps([sid, self.file_hash(script), list(cmdline)], ensure_ascii=False)
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> t.Optional[CacheEntry]:
+        """查找未过期的缓存结果"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.time():
+                self._remove(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, logfile: Path, returncode: int, ttl: float) -> None:
+        """保存一次执行结果(日志超过缓存上限时不缓存)"""
+        size = logfile.stat().st_size
+        if size > self.max_bytes:
+            return
+        path = self.directory / f"{key}.log"
+        tmp = path.with_suffix(".tmp")
+        shutil.copyfile(logfile, tmp)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._remove(old)
+            tmp.replace(path)
+            self._entries[key] = CacheEntry(key, path, returncode, size, time.time() + ttl)
+            self.size += size
+            self._shrink()
+
+    def resize(self, max_bytes: int) -> None:
+        """调整大小上限, 超出部分立即淘汰"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._shrink()
+
+    def _shrink(self) -> None:
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries.values())))
+
+    def _remove(self, entry: CacheEntry) -> None:
+        del self._entries[entry.key]
+        self.size -= entry.size
+        try:
+            entry.path.unlink()
+        except OSError as e:
+            logging.warning(f"Failed to remove cached result {entry.path}: {e}")
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._remove(entry)
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "maxSize": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
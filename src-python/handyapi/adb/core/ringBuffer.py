@@ -0,0 +1,62 @@
+"""ADB任务输出环形缓冲区模块"""
+
+import threading
+import typing as t
+
+
+class RingBuffer:
+    """固定容量的字节环形缓冲区, 保留最近写入的 capacity 字节
+
+    位置以任务输出的绝对字节偏移表示, 与日志文件中的偏移一致。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._total: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """累计写入的字节数"""
+        return self._total
+
+    @property
+    def start(self) -> int:
+        """缓冲区中最早字节的绝对偏移"""
+        return max(0, self._total - self.capacity)
+
+    def append(self, data: bytes) -> None:
+        """写入数据"""
+        with self._lock:
+            if len(data) >= self.capacity:
+                tail = data[-self.capacity:]
+                self._total += len(data)
+                # 旋转使绝对偏移 p 的字节位于下标 p % capacity
+                shift = self._total % self.capacity
+                self._buf[:] = tail[self.capacity - shift:] + tail[:self.capacity - shift]
+                return
+
+            offset = self._total % self.capacity
+            first = min(len(data), self.capacity - offset)
+            self._buf[offset:offset + first] = data[:first]
+            if first < len(data):
+                self._buf[:len(data) - first] = data[first:]
+            self._total += len(data)
+
+    def read(self, pos: int, size: int = -1) -> t.Optional[bytes]:
+        """读取 [pos, pos + size) 的数据, pos 已不在缓冲区中时返回 None"""
+        with self._lock:
+            if pos < self.start:
+                return None
+            end = self._total if size < 0 else min(self._total, pos + size)
+            if pos >= end:
+                return b""
+
+            begin = pos % self.capacity
+            length = end - pos
+            if begin + length <= self.capacity:
+                return bytes(self._buf[begin:begin + length])
+            return bytes(self._buf[begin:]) + bytes(self._buf[:length - (self.capacity - begin)])
@@ -0,0 +1,212 @@
+"""ADB脚本目录索引模块"""
+
+import contextlib
+import functools
+import gc
+import hashlib
+import json
+import logging
+import threading
+import typing as t
+from pathlib import Path
+
+from ..models.scriptModel import IdType, ScriptInfo, GroupInfo, ScriptPackage
+from ..utils.httpCache import CachedBody
+
+Item = t.Union[ScriptInfo, GroupInfo]
+
+ID_MASK = (1 << 53) - 1
+
+
+def derive_id(*parts: t.Any) -> IdType:
+    """由脚本包 id 与名称路径生成稳定的 id(53 位, JavaScript 中可精确表示)"""
+    key = json.dumps(parts, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") & ID_MASK
+    return value or 1
+
+
+def assign_ids(items: t.List[t.Any], package_id: t.Any) -> t.List[t.Any]:
+    """为未显式指定 id 的条目生成稳定的 id(返回副本, 不修改原数据)
+
+    id 由脚本包 id 与分组/脚本名称路径决定, 重新加载或重启后保持不变。
+    显式指定的 id 重复时抛出 ValueError; 生成的 id 与已有 id 冲突(如同一分组下
+    有同名条目)时按出现顺序追加序号重新生成。
+    """
+    taken: t.Set[IdType] = set()
+
+    def collect(items: t.List[t.Any]) -> None:
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if "id" in item:
+                if item["id"] in taken:
+                    raise ValueError(f"Duplicate id {item['id']} in script package {package_id}")
+                taken.add(item["id"])
+            if isinstance(item.get("children"), list):
+                collect(item["children"])
+
+    def assign(items: t.List[t.Any], names: t.Tuple[t.Any, ...]) -> t.List[t.Any]:
+        result = []
+        for item in items:
+            if not isinstance(item, dict):
+                result.append(item)
+                continue
+            path = names + (item.get("name"),)
+            if "id" not in item:
+                sid, n = derive_id(package_id, *path), 0
+                while sid in taken:
+                    n += 1
+                    sid = derive_id(package_id, *path, n)
+                taken.add(sid)
+                item = {"id": sid, **item}
+            if isinstance(item.get("children"), list):
+                item = {**item, "children": assign(item["children"], path)}
+            result.append(item)
+        return result
+
+    collect(items)
+    return assign(items, ())
+
+
+_gcLock = threading.Lock()
+_gcPaused = 0
+_gcEnabled = True
+
+
+@contextlib.contextmanager
+def paused_gc() -> t.Iterator[None]:
+    """暂停循环垃圾回收(可嵌套, 可多线程同时使用, 最后一个退出时恢复)
+
+    校验脚本包时一次创建大量模型对象, 期间反复触发的分代回收会遍历全部新对象,
+    占加载耗时的很大一部分; 这些对象加载后长期存在, 暂停回收没有内存代价。
+    """
+    global _gcPaused, _gcEnabled
+    with _gcLock:
+        if _gcPaused == 0:
+            _gcEnabled = gc.isenabled()
+            gc.disable()
+        _gcPaused += 1
+    try:
+        yield
+    finally:
+        with _gcLock:
+            _gcPaused -= 1
+            if _gcPaused == 0 and _gcEnabled:
+                gc.enable()
+
+
+def _item_key(raw: t.Any) -> str:
+    """条目原始 JSON 的规范化文本, 内容相同的条目键相同"""
+    return json.dumps(raw, sort_keys=True, ensure_ascii=False)
+
+
+class ScriptCatalog:
+    """脚本目录, 加载时建立 id -> 脚本/分组路径 索引
+
+    目录建立后不再修改, 重新加载时生成新目录整体替换(写时复制),
+    读取方持有旧目录引用期间不受影响。
+    """
+
+    def __init__(self, package: ScriptPackage, raw: t.Sequence[t.Any] = (), version: int = 1):
+        self.package: ScriptPackage = package
+        # 顶层条目的原始 JSON, 与 package.scripts.root 一一对应, 用于增量重新加载
+        self.raw: t.Tuple[t.Any, ...] = tuple(raw)
+        self.version: int = version
+        self.scripts: t.Dict[IdType, ScriptInfo] = {}
+        self.groups: t.Dict[IdType, GroupInfo] = {}
+        self.paths: t.Dict[IdType, t.Tuple[IdType, ...]] = {}
+
+        self._build_index(package.scripts.root, ())
+
+    def _build_index(
+        self,
+        items: t.List[t.Union[ScriptInfo, GroupInfo]],
+        path: t.Tuple[IdType, ...],
+    ) -> None:
+        """建立索引(按分组深度遍历一次)"""
+        for item in items:
+            if item.id in self.paths:
+                raise ValueError(f"Duplicate id {item.id}: {item.name}")
+            self.paths[item.id] = path
+            if isinstance(item, ScriptInfo):
+                self.scripts[item.id] = item
+            elif isinstance(item, GroupInfo):
+                self.groups[item.id] = item
+                self._build_index(item.children, path + (item.id,))
+
+    @classmethod
+    def load(
+        cls, source: Path, previous: t.Optional["ScriptCatalog"] = None
+    ) -> "ScriptCatalog":
+        """加载脚本包
+
+        未显式指定 id 的条目由 assign_ids 生成稳定的 id。给定 previous 时先与其
+        比较原始 JSON, 内容未变化的条目(任意层级)直接复用已校验的模型,
+        只有新增或修改的条目需要重新校验; 首次加载没有可复用的条目, 直接校验。
+        只在首次加载时暂停循环垃圾回收: 运行中的重新加载(如监视触发)只校验少量条目,
+        不值得让其他线程在此期间也停止回收。
+        """
+        with paused_gc() if previous is None else contextlib.nullcontext():
+            data = json.loads(source.read_text(encoding="utf-8"))
+            context = {"source": source}
+            if not isinstance(data, dict) or not isinstance(data.get("scripts"), list):
+                # 结构不正确, 交给模型校验给出完整的错误信息
+                return cls(ScriptPackage.model_validate(data, context=context))
+
+            raw = assign_ids(data["scripts"], data.get("id"))
+            reusable: t.Dict[str, t.List[Item]] = {}
+            if previous is not None and len(previous.raw) == len(previous.package.scripts.root):
+                cls._collect(previous.raw, previous.package.scripts.root, reusable)
+            items = cls._merge(raw, reusable) if reusable else raw
+            package = ScriptPackage.model_validate({**data, "scripts": items}, context=context)
+        if previous is None:
+            return cls(package, raw)
+        catalog = cls(package, raw, previous.version + 1)
+        reused = sum(
+            1 for sid, item in (catalog.scripts | catalog.groups).items()
+            if (previous.scripts.get(sid) or previous.groups.get(sid)) is item
+        )
+        logging.info(f"Catalog reloaded, {reused}/{len(catalog.paths)} items reused")
+        return catalog
+
+    @classmethod
+    def _collect(
+        cls, raw: t.Sequence[t.Any], items: t.Sequence[Item], reusable: t.Dict[str, t.List[Item]]
+    ) -> None:
+        """按原始 JSON 收集可复用的条目"""
+        for data, item in zip(raw, items):
+            reusable.setdefault(_item_key(data), []).append(item)
+            if isinstance(item, GroupInfo) and isinstance(data, dict):
+                cls._collect(data.get("children", []), item.children, reusable)
+
+    @classmethod
+    def _merge(
+        cls, raw: t.List[t.Any], reusable: t.Dict[str, t.List[Item]]
+    ) -> t.List[t.Any]:
+        """未变化的条目替换为已有模型, 修改过的分组只展开其子条目继续比较"""
+        items: t.List[t.Any] = []
+        for data in raw:
+            candidates = reusable.get(_item_key(data))
+            if candidates:
+                items.append(candidates.pop())
+            elif isinstance(data, dict) and isinstance(data.get("children"), list):
+                items.append({**data, "children": cls._merge(data["children"], reusable)})
+            else:
+                items.append(data)
+        return items
+
+    @functools.cached_property
+    def commands(self) -> CachedBody:
+        """命令树的 JSON 响应体(每个目录版本只序列化一次)"""
+        return CachedBody(self.package.scripts.model_dump_json(exclude_none=True).encode("utf-8"))
+
+    def find_script(self, sid: IdType) -> t.Optional[ScriptInfo]:
+        """查找脚本信息"""
+        return self.scripts.get(sid)
+
+    def get_group_path(self, sid: IdType) -> t.Optional[t.List[GroupInfo]]:
+        """获取脚本/分组所在的分组路径(由外到内)"""
+        path = self.paths.get(sid)
+        if path is None:
+            return None
+        return [self.groups[gid] for gid in path]
@@ -1,10 +1,13 @@
 """ADB脚本工厂模块"""
 
 import typing as t
-from ..utils.validator import validate_parameters
 from .baseScript import BaseScript
+from .executionEngine import ExecutionEngine, ProcessFactory
 from ..models.scriptModel import ScriptInfo, ExecuteParam
 
+if t.TYPE_CHECKING:
+    from .forkServer import ForkServerPool
+
 
 class ScriptFactory:
     """脚本工厂类"""
@@ -31,13 +34,30 @@ class ScriptFactory:
         return decorate
 
     @classmethod
-    def create_script(cls, script_info: ScriptInfo, logfile: str) -> BaseScript:
-        """创建脚本实例"""
+    def create_script(
+        cls,
+        script_info: ScriptInfo,
+        logfile: str,
+        engine: t.Optional[ExecutionEngine] = None,
+        ring_size: int = 0,
+        python: t.Optional[str] = None,
+        forkservers: t.Optional["ForkServerPool"] = None,
+    ) -> BaseScript:
+        """创建脚本实例
+
+        python 为脚本所在包指定的解释器, forkservers 为 fork 服务器(均仅用于 python 脚本)。
+        """
         if script_info.type == "scriptgroup":
             raise ValueError("Script groups cannot be instantiated directly")
 
         if script_class := cls._registry.get(script_info.type):
-            return script_class(script_info, logfile, cls._exe_path.get(script_info.type))
+            executable = cls._exe_path.get(script_info.type)
+            if python and script_info.type == "python":
+                executable = python
+            script = script_class(script_info, logfile, executable, engine, ring_size)
+            if isinstance(script, PythonScript):
+                script.forkservers = forkservers
+            return script
 
         raise ValueError(f"Unsupported script type: {script_info.type}")
 
@@ -47,8 +67,7 @@ class WinPowerShellScript(BaseScript):
     """Windows PowerShell脚本实现类"""
 
     def _get_cmdline(self, parameters: ExecuteParam):
-        validate_parameters(parameters.model_dump(), self.info)
-        cmdline = [
+        return [
             "powershell",
             "-NoLogo",
             "-NonInteractive",
@@ -56,38 +75,15 @@ class WinPowerShellScript(BaseScript):
             "remoteSigned",
             "-File",
             self.info.path,
+            *self.info.plan.build(parameters.root, expand_lists=True),
         ]
 
-        for param in self.info.parameters:
-            name = param.name
-            value = parameters.root[name]
-            if name.startswith("-"):
-                if isinstance(value, bool):
-                    if value:
-                        cmdline.append(name)
-                elif isinstance(value, str):
-                    if value.strip() != '':
-                        cmdline.append(name)
-
-            if isinstance(value, str) and len(
-                value.strip()
-            ):
-                cmdline.append(value.strip())
-
-            if isinstance(value, list):
-                for v in value:
-                    if v.strip():
-                        cmdline.append(v.strip())
-
-        return cmdline
-
 @ScriptFactory.register_script_type("powershell")
 class PowerShellScript(BaseScript):
     """PowerShell脚本实现类"""
 
     def _get_cmdline(self, parameters: ExecuteParam):
-        validate_parameters(parameters.model_dump(), self.info)
-        cmdline = [
+        return [
             "pwsh",
             "-NoLogo",
             "-NonInteractive",
@@ -95,53 +91,29 @@ class PowerShellScript(BaseScript):
             "remoteSigned",
             "-File",
             self.info.path,
+            *self.info.plan.build(parameters.root),
         ]
 
-        for param in self.info.parameters:
-            name = param.name
-            value = parameters.root[name]
-
-            if name.startswith("-"):
-                if isinstance(value, bool):
-                    if value:
-                        cmdline.append(name)
-                elif isinstance(value, str):
-                    if value.strip() != '':
-                        cmdline.append(name)
-
-            if isinstance(value, str) and len(
-                value.strip()
-            ):
-                cmdline.append(value.strip())
-
-        return cmdline
-
 @ScriptFactory.register_script_type("python")
 class PythonScript(BaseScript):
-    """Python脚本实现类"""
+    """Python脚本实现类
+
+    配置了 fork 服务器时, 由预先启动的解释器 fork 子进程执行脚本(新控制台窗口
+    与无执行引擎时仍启动新解释器)。
+    """
+
+    forkservers: t.Optional["ForkServerPool"] = None
 
     def _get_cmdline(self, parameters: ExecuteParam):
-        validate_parameters(parameters.model_dump(), self.info)
-        cmdline = [
+        return [
             self.exec if self.exec else "python",
             self.info.path,
+            *self.info.plan.build(parameters.root),
         ]
 
-        for param in self.info.parameters:
-            name = param.name
-            value = parameters.root[name]
-
-            if name.startswith("-"):
-                if isinstance(value, bool):
-                    if value:
-                        cmdline.append(name)
-                elif isinstance(value, str):
-                    if value.strip() != '':
-                        cmdline.append(name)
-
-            if isinstance(value, str) and len(
-                value.strip()
-            ):
-                cmdline.append(value.strip())
-
-        return cmdline
\ No newline at end of file
+    def _spawn(
+        self, cmdline: t.List[str], factory: t.Optional[ProcessFactory] = None, **kwargs
+    ) -> None:
+        if self.forkservers is not None and self.engine is not None and not self.info.newconsole:
+            factory = self.forkservers.get(cmdline[0]).create_process
+        super()._spawn(cmdline, factory, **kwargs)
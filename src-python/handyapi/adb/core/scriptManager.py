@@ -1,8 +1,12 @@
 """ADB脚本管理器模块"""
 
+import itertools
 import logging
+import re
+import threading
 import time
 import typing as t
+from collections import Counter
 from pathlib import Path
 
 from ..models.scriptModel import (
@@ -15,103 +19,521 @@ from ..models.scriptModel import (
 )
 from .scriptFactory import ScriptFactory
 from .baseScript import BaseScript
+from .packageCatalog import MergedCatalog, PackageEntry, open_packages
+from .executionEngine import ExecutionEngine
+from .logArchive import LogArchive
+from .logSearch import LogSearcher, LogSource
+from .metrics import CATALOG_RELOAD_SECONDS, EXECUTE_SECONDS
+from .taskEvents import TaskEventBus, TaskSnapshot
+from .taskScheduler import TaskScheduler
+from .taskGroup import TaskGroup
+from .taskRecord import TaskRecord
+
+if t.TYPE_CHECKING:
+    from .forkServer import ForkServerPool
+    from .resultCache import ResultCache
+    from .taskHistory import TaskHistory
 
 
 class ScriptManager:
     """脚本管理器类"""
 
-    def __init__(self, source: str, logDir: str):
+    def __init__(
+        self,
+        source: str | t.Sequence[str],
+        logDir: str,
+        ringBufferSize: int = 0,
+        scheduler: t.Optional[TaskScheduler] = None,
+        history: t.Optional["TaskHistory"] = None,
+        maxTasks: int = 0,
+        lazyPackages: bool = False,
+        forkServers: t.Optional["ForkServerPool"] = None,
+        resultCache: t.Optional["ResultCache"] = None,
+    ):
         if isinstance(source, str):
-            self.source = Path(source)
+            self.sources: t.List[Path] = [Path(source)]
+        elif isinstance(source, (list, tuple)) and source and all(
+            isinstance(s, (str, Path)) for s in source
+        ):
+            self.sources = list({Path(s).absolute(): None for s in source})
         else:
             raise TypeError("Source must be a string or a list of strings.")
+        # 第一个脚本包为主脚本包, 总是立即加载
+        self.source: Path = self.sources[0]
+        self.lazyPackages: bool = lazyPackages
 
-        self.scriptPackage = ScriptPackage.model_validate_json(
-            self.source.read_text(encoding="utf-8"), context={"source": self.source}
-        )
+        self.catalog: MergedCatalog = self._load_catalog()
+        self._reloadLock = threading.Lock()
 
-        self.task: t.Dict[IdType, BaseScript] = {}
+        # 任务注册表: 读写都在 _taskLock 内完成, 持锁期间不做任何耗时操作;
+        # 需要与事件顺序保持一致的增删操作先取 events.lock 再取 _taskLock
+        # 未结束的任务为脚本实例, 已结束的任务替换为精简记录
+        self.task: t.Dict[IdType, BaseScript | TaskRecord] = {}
+        self._taskLock = threading.Lock()
+        self.groups: t.Dict[IdType, TaskGroup] = {}
+        self._groupSeq = itertools.count(1)
+        self._logLock = threading.Lock()
+        self._logStamp: str = ""
+        self._logNames: Counter = Counter()
         self.logdir: Path = Path(logDir)
+        self.logdir.mkdir(parents=True, exist_ok=True)
+        self.ringBufferSize: int = ringBufferSize
         self.lastupdate: float = time.time()
+        self.engine: ExecutionEngine = ExecutionEngine()
+        # python 脚本的 fork 服务器(为 None 时每个任务启动新解释器)
+        self.forkServers: t.Optional["ForkServerPool"] = forkServers
+        # 任务启动时调用, 返回追加给脚本的环境变量
+        self.envProviders: t.List[t.Callable[[], t.Mapping[str, str]]] = []
+        # 可缓存脚本的结果缓存(为 None 时不缓存)
+        self.resultCache: t.Optional["ResultCache"] = resultCache
+        self.scheduler: TaskScheduler = scheduler or TaskScheduler()
+        self.history: t.Optional["TaskHistory"] = history
+        self.maxTasks: int = maxTasks
+        self.events: TaskEventBus = TaskEventBus()
+        self.searcher: LogSearcher = LogSearcher()
+        self._snapshot: t.Optional[TaskSnapshot] = None
+        self._snapshotTag: str = format(time.time_ns(), "x")
+
+    @property
+    def scriptPackage(self) -> ScriptPackage:
+        """主脚本包"""
+        package = self.catalog.package
+        assert package is not None
+        return package
+
+    def _load_catalog(self, previous: t.Optional[MergedCatalog] = None) -> MergedCatalog:
+        """并行加载所有脚本包并建立合并索引(主脚本包加载失败时抛出异常)"""
+        entries = open_packages(
+            self.sources,
+            self.lazyPackages,
+            previous.entries if previous else (),
+            strict=self.sources[:1],
+        )
+        return MergedCatalog(entries, previous.version + 1 if previous else 1)
+
+    def _load_packages(self, entries: t.Sequence[PackageEntry]) -> None:
+        """加载延迟加载的脚本包, 生成新目录整体替换"""
+        with self._reloadLock:
+            previous = self.catalog
+            wanted = {entry.path for entry in entries}
+            paths = [entry.path for entry in previous.pending if entry.path in wanted]
+            if not paths:
+                return
+            catalog = previous.replace(open_packages(paths, False, previous.entries))
+            catalog.commands
+            self.catalog = catalog
+        self.events.publish("catalog", catalog.diff(previous))
 
-        ScriptFactory.set_executable_path("python", self.scriptPackage.python)
+    def load_package(self, gid: IdType) -> PackageEntry:
+        """加载并返回脚本包(按命名空间分组 id)"""
+        entry = self.catalog.entry(gid)
+        if entry is None:
+            raise ValueError(f"Package '{gid}' not found.")
+        if not entry.loaded:
+            self._load_packages([entry])
+            entry = self.catalog.entry(gid)
+        if entry is None or entry.catalog is None:
+            raise ValueError(f"Failed to load package '{gid}': {entry.error if entry else ''}")
+        return entry
+
+    def get_packages(self) -> t.List[dict]:
+        """所有脚本包的信息(conflicts 为与之前的包重复而被忽略的 id 数量)"""
+        catalog = self.catalog
+        conflicts = Counter(catalog.conflicts.values())
+        return [
+            {**entry.info(), "conflicts": conflicts[entry.path]} for entry in catalog.entries
+        ]
 
     def find_script_info(self, sid: IdType) -> t.Optional[ScriptInfo]:
-        """查找脚本信息"""
-
-        def find_in_group(group: t.List[t.Union[ScriptInfo, GroupInfo]], sid: IdType):
-            for item in group:
-                if isinstance(item, ScriptInfo) and item.id == sid:
-                    return item
-                elif isinstance(item, GroupInfo):
-                    found_script = find_in_group(item.children, sid)
-                    if found_script:
-                        return found_script
-            return None
+        """查找脚本信息(未找到时只加载包含该 id 的未加载脚本包, 未知 id 不触发加载)"""
+        info = self.catalog.find_script(sid)
+        if info is None:
+            entries = [entry for entry in self.catalog.pending if sid in entry.script_ids]
+            if entries:
+                self._load_packages(entries)
+                info = self.catalog.find_script(sid)
+        return info
 
-        for ssid, item in self.scriptPackage.scripts.iter():
-            if isinstance(item, ScriptInfo) and ssid == sid:
-                return item
-            elif isinstance(item, GroupInfo):
-                found_script = find_in_group(item.children, sid)
-                if found_script:
-                    return found_script
-        return None
+    def _create_task(self, sid: IdType, scriptinfo: ScriptInfo) -> BaseScript:
+        """创建任务实例(python 脚本使用所在包指定的解释器)"""
+        owner = self.catalog.owners.get(sid)
+        return ScriptFactory.create_script(
+            scriptinfo,
+            str(self.generate_log_file(sid, scriptinfo.name)),
+            self.engine,
+            self.ringBufferSize,
+            owner.python if owner else None,
+            self.forkServers,
+        )
+
+    def get_group_path(self, sid: IdType) -> t.Optional[t.List[GroupInfo]]:
+        """获取脚本所在分组路径"""
+        return self.catalog.get_group_path(sid)
 
     def generate_log_file(self, script_id: int, script_name: str) -> Path:
-        """获取日志文件路径"""
+        """获取日志文件路径(同一秒内同名脚本追加序号)"""
         timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime())
+        with self._logLock:
+            if timestamp != self._logStamp:
+                self._logStamp = timestamp
+                self._logNames.clear()
+            n = self._logNames[script_name]
+            self._logNames[script_name] += 1
+        if n:
+            return self.logdir / f"{timestamp}-{script_name}-{n}.log"
         return self.logdir / f"{timestamp}-{script_name}.log"
 
-    def execute_script(self, sid: IdType, parameters: ExecuteParam) -> IdType:
-        """执行脚本"""
+    def execute_script(self, sid: IdType, parameters: ExecuteParam, priority: int = 0) -> IdType:
+        """执行脚本(经调度器, 无空闲执行槽时排队)"""
 
+        started = time.perf_counter()
         scriptinfo = self.find_script_info(sid)
+        looked_up = time.perf_counter()
+        EXECUTE_SECONDS.labels("lookup").observe(looked_up - started)
 
         if scriptinfo:
-            logPath = self.generate_log_file(sid, scriptinfo.name)
-            task = ScriptFactory.create_script(scriptinfo, str(logPath))
-            self.task[task.taskid] = task
-            task.execute(parameters)
+            task = self._create_task(sid, scriptinfo)
+            # 排队前校验参数, 错误直接返回给调用方
+            task.validate_parameters(parameters)
+            validated = time.perf_counter()
+            EXECUTE_SECONDS.labels("validate").observe(validated - looked_up)
+            task.on_finish = self._on_task_finish
+            self._submit(task, parameters, priority)
+            EXECUTE_SECONDS.labels("submit").observe(time.perf_counter() - validated)
             return task.taskid
         else:
             raise ValueError(f"Script '{sid}' not found.")
 
+    def execute_batch(
+        self, sid: IdType, parameters: t.List[ExecuteParam], priority: int = 0
+    ) -> TaskGroup:
+        """批量执行同一脚本
+
+        脚本只查找一次, 所有参数先全部校验, 任一组不合法则一个也不启动;
+        之后所有任务经调度器提交, 超出并发限制的部分排队依次启动。
+        单个任务启动失败(如找不到解释器)时该任务以失败结束, 其余任务照常提交。
+        """
+        started = time.perf_counter()
+        scriptinfo = self.find_script_info(sid)
+        EXECUTE_SECONDS.labels("lookup").observe(time.perf_counter() - started)
+        if not scriptinfo:
+            raise ValueError(f"Script '{sid}' not found.")
+
+        tasks = []
+        validate = EXECUTE_SECONDS.labels("validate")
+        for i, params in enumerate(parameters):
+            with validate.time():
+                task = self._create_task(sid, scriptinfo)
+                try:
+                    task.validate_parameters(params)
+                except ValueError as e:
+                    raise ValueError(f"Parameter set {i}: {e}") from e
+            tasks.append(task)
+
+        group = TaskGroup(next(self._groupSeq), sid, [task.taskid for task in tasks])
+        with self._taskLock:
+            self.groups[group.gid] = group
+        submit = EXECUTE_SECONDS.labels("submit")
+        for task, params in zip(tasks, parameters):
+            task.groupid = group.gid
+            task.on_finish = self._on_task_finish
+            with submit.time():
+                try:
+                    self._submit(task, params, priority)
+                except Exception as e:
+                    # 任务已由 _start_task 以失败结束
+                    logging.error(f"Failed to start task {task.taskid} of group {group.gid}: {e}")
+        return group
+
+    def get_group_summary(self, gid: IdType) -> dict:
+        """获取任务组汇总状态"""
+        with self._taskLock:
+            group = self.groups.get(gid)
+        if group is None:
+            raise ValueError(f"Task group '{gid}' not found.")
+        return group.summary(self._lookup_task)
+
+    def _submit(self, task: BaseScript, parameters: ExecuteParam, priority: int) -> None:
+        """登记已校验参数的任务并交给调度器; 有缓存结果时直接以该结果结束"""
+        if self._restore_cached(task):
+            self._register(task)
+            self._compact(task)
+            self._evict()
+            return
+        self._register(task)
+        if not self.scheduler.submit(task, parameters, self._start_task, priority):
+            self._notify("update", task)
+
+    def _cache_key(self, task: BaseScript, env: t.Mapping[str, str]) -> t.Optional[str]:
+        """可缓存脚本的缓存键(设备列表等环境变量会影响查询结果, 一并计入)"""
+        cache = self.resultCache
+        if cache is None or not task.info.cacheable or task.logfile is None:
+            return None
+        assert task._prepared is not None
+        try:
+            return cache.key(
+                task.info.id, Path(task.info.path), [*task._prepared[1], *sorted(env.items())]
+            )
+        except OSError as e:
+            logging.warning(f"Failed to hash script {task.info.path}: {e}")
+            return None
+
+    def _task_env(self) -> t.Dict[str, str]:
+        """任务启动时追加的环境变量"""
+        env: t.Dict[str, str] = {}
+        for provider in self.envProviders:
+            env.update(provider())
+        return env
+
+    def _restore_cached(self, task: BaseScript) -> bool:
+        """查找可缓存脚本的结果缓存, 命中时直接结束任务
+
+        命中的任务立即结束, 按提交时的环境变量查找; 未命中的任务在启动时
+        按实际使用的环境变量重新生成缓存键(见 _start_task)。
+        """
+        cache = self.resultCache
+        if cache is None or not task.info.cacheable:
+            return False
+        key = self._cache_key(task, self._task_env())
+        if key is None:
+            return False
+        entry = cache.get(key)
+        if entry is None:
+            return False
+        try:
+            task.restore(entry.returncode, entry.path)
+        except OSError as e:
+            # 缓存的日志刚被淘汰, 照常执行
+            logging.warning(f"Failed to restore cached result of task {task.taskid}: {e}")
+            return False
+        task.cacheKey = key
+        return True
+
+    def _start_task(self, task: BaseScript, parameters: ExecuteParam) -> None:
+        """启动任务(由调度器调用)"""
+        try:
+            task.env.update(self._task_env())
+            # 结果按任务实际运行时的环境变量缓存
+            task.cacheKey = self._cache_key(task, task.env)
+            task.execute(parameters)
+        except Exception:
+            if not task.finished:
+                # 启动前即失败(如环境变量提供者出错), 任务直接以失败结束
+                task.fail()
+            raise
+        finally:
+            self._notify("update", task)
+
+    def _register(self, task: BaseScript) -> None:
+        """加入任务注册表并发布 add 事件"""
+        with self.events.lock:
+            with self._taskLock:
+                self.task[task.taskid] = task
+            self._notify("add", task)
+
+    def _unregister(self, task: BaseScript | TaskRecord) -> bool:
+        """移出任务注册表并发布 remove 事件, 任务已被其他线程移除时返回 False"""
+        with self.events.lock:
+            with self._taskLock:
+                if self.task.get(task.taskid) is not task:
+                    return False
+                del self.task[task.taskid]
+                self.lastupdate = time.time()
+            self._notify("remove", task)
+        return True
+
+    def _notify(self, kind: str, task: BaseScript | TaskRecord) -> None:
+        """发布任务变更事件(在通知锁内序列化, 保证事件与状态顺序一致)"""
+        with self.events.lock:
+            if kind == "remove":
+                self.events.publish(kind, {"taskId": task.taskid})
+            else:
+                if kind == "update":
+                    # 已被其他线程删除的任务不再发布变更
+                    with self._taskLock:
+                        if self.task.get(task.taskid) is not task:
+                            return
+                data = task.to_dict()
+                self.events.publish(kind, {"task": data})
+                if self.history:
+                    self.history.save(data)
+
+    def task_changed(self, task: BaseScript | TaskRecord) -> None:
+        """任务信息在管理器之外发生变化(如日志被归档或清理)时发布 update 事件"""
+        self._notify("update", task)
+
+    def _on_task_finish(self, task: BaseScript) -> None:
+        """任务结束回调"""
+        self.scheduler.release(task)
+        self._notify("update", task)
+        self._store_result(task)
+        self._compact(task)
+        self._evict()
+
+    def _compact(self, task: BaseScript) -> None:
+        """已结束的任务在注册表中替换为精简记录, 不再持有参数、环境变量等"""
+        record = TaskRecord(task.to_dict())
+        with self._taskLock:
+            if self.task.get(task.taskid) is task:
+                self.task[task.taskid] = record
+
+    def _store_result(self, task: BaseScript) -> None:
+        """缓存可缓存脚本成功执行的结果"""
+        cache = self.resultCache
+        if cache is None or task.cacheKey is None or task.cached or task.returncode != 0:
+            return
+        assert task.logfile is not None
+        try:
+            cache.put(task.cacheKey, task.logfile, task.returncode, task.info.cacheTtl)
+        except OSError as e:
+            logging.warning(f"Failed to cache result of task {task.taskid}: {e}")
+
+    def _evict(self) -> None:
+        """已结束任务超过内存上限时, 从最早的开始移出内存(仍保留在历史存储中)"""
+        if not self.history or self.maxTasks <= 0:
+            return
+        with self._taskLock:
+            finished = [task for task in self.task.values() if task.finished]
+        for task in finished[:len(finished) - self.maxTasks]:
+            self._unregister(task)
+
+    def _lookup_task(self, tid: IdType) -> t.Optional[BaseScript | TaskRecord]:
+        """查找任务(内存中或历史存储中)"""
+        with self._taskLock:
+            task = self.task.get(tid)
+        if task is None and self.history:
+            return self.history.get(tid)
+        return task
+
+    def _get_task(self, tid: IdType) -> BaseScript | TaskRecord:
+        task = self._lookup_task(tid)
+        if task is None:
+            raise ValueError(f"Task '{tid}' not found.")
+        return task
+
+    def query_tasks(
+        self,
+        status: t.Optional[t.List[int]] = None,
+        commandId: t.Optional[IdType] = None,
+        since: t.Optional[float] = None,
+        until: t.Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> dict:
+        """分页查询任务(包括已移出内存的历史任务)"""
+        if not self.history:
+            raise ValueError("Task history is not enabled.")
+        total, tasks = self.history.query(status, commandId, since, until, offset, limit)
+        return {"total": total, "offset": offset, "limit": limit, "tasks": tasks}
+
     def get_script_status(self, sid: IdType) -> ScriptStatus:
         """获取脚本状态"""
-        task = self.task.get(sid)
+        task = self._lookup_task(sid)
         if not task:
             return ScriptStatus.PRE
         return task.get_status()
 
     def get_script_log(self, tid: IdType, pos: int = 0, size: int = 0) -> bytes:
         """获取脚本日志"""
-        task = self.task.get(tid)
-        logging.debug("get log %s %s", task, self.task)
-        if task is None:
-            raise ValueError(f"Task '{tid}' not found.")
+        task = self._get_task(tid)
+        logging.debug("get log %s", task)
         return task.get_log(pos, size)
 
-    def get_task(self) -> t.Dict[IdType, BaseScript]:
-        """获取所有任务"""
-        return self.task
+    @property
+    def version(self) -> int:
+        """任务列表版本(每次任务变更递增)"""
+        return self.events.seq
+
+    def _build_task_list(self) -> dict:
+        """生成任务列表"""
+        tasks = []
+        with self._taskLock:
+            lastUpdate = self.lastupdate
+            current = list(self.task.values())
+        for task in current:
+            task.get_status()
+            tasks.append(task.to_dict())
+            lastUpdate = max(lastUpdate, task.starttime or 0, task.endtime or 0)
+        return {"lastUpdate": lastUpdate, "queueDepth": self.scheduler.depth, "tasks": tasks}
+
+    def get_task_snapshot(self) -> TaskSnapshot:
+        """获取任务列表快照, 仅在版本变化时重新生成"""
+        with self.events.lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self.version:
+                snapshot = TaskSnapshot(
+                    self.version, self._build_task_list(), self._snapshotTag
+                )
+                self._snapshot = snapshot
+            return snapshot
+
+    def get_script_log_file(self, tid: IdType) -> t.Optional[Path]:
+        """获取已结束任务的日志文件"""
+        return self._get_task(tid).get_log_file()
+
+    def get_script_log_archive(self, tid: IdType) -> t.Optional[LogArchive]:
+        """获取已归档任务日志的读取器"""
+        return self._get_task(tid).get_log_archive()
+
+    def get_log_sources(self) -> t.List[LogSource]:
+        """所有任务的日志(运行中与已归档)"""
+        with self._taskLock:
+            tasks: t.List[BaseScript | TaskRecord] = list(self.task.values())
+        if self.history:
+            tasks.extend(self.history.iter_logs(exclude={task.taskid for task in tasks}))
+        sources = []
+        for task in tasks:
+            if task.archive is not None:
+                sources.append(LogSource(task.taskid, task.archive, True))
+            elif task.logfile is not None:
+                sources.append(LogSource(task.taskid, task.logfile, False))
+        return sources
+
+    def search_logs(self, pattern: re.Pattern, limit: int = 1000) -> t.Iterator[dict]:
+        """在所有任务日志中搜索"""
+        return self.searcher.search(self.get_log_sources(), pattern, limit)
+
+    def follow_script_log(self, tid: IdType, pos: int = 0) -> t.AsyncIterator[bytes]:
+        """持续读取脚本日志"""
+        return self._get_task(tid).follow_log(pos)
+
+    def get_task(self) -> t.Dict[IdType, BaseScript | TaskRecord]:
+        """获取所有任务(注册表副本)"""
+        with self._taskLock:
+            return dict(self.task)
 
     def del_task(self, tid: IdType) -> bool:
         """delete task"""
-        if tid in self.task:
-            if self.task[tid].get_status() == ScriptStatus.RUNNING:
+        with self._taskLock:
+            task = self.task.get(tid)
+        if task is not None:
+            status = task.get_status()
+            if status == ScriptStatus.PRE:
+                raise ValueError("Cannot delete task that is starting.")
+            if status == ScriptStatus.RUNNING:
+                raise ValueError("Cannot delete running task.")
+            # 取消失败说明调度器已开始启动该任务
+            if status == ScriptStatus.QUEUED and not self.scheduler.cancel(task):
                 raise ValueError("Cannot delete running task.")
-            del self.task[tid]
-            self.lastupdate = time.time()
+            if not self._unregister(task):
+                raise ValueError(f"Task '{tid}' not found.")
+            if self.history:
+                self.history.delete(tid)
+            return True
+        if self.history and self.history.get(tid):
+            self.history.delete(tid)
             return True
         raise ValueError(f"Task '{tid}' not found.")
 
     def stop_task(self, tid: IdType, force: bool = False) -> bool:
-        """停止正在运行的任务"""
-        if tid not in self.task:
+        """停止正在运行的任务(排队中的任务直接取消)"""
+        with self._taskLock:
+            task = self.task.get(tid)
+        if task is None:
             raise ValueError(f"Task '{tid}' not found.")
 
-        task = self.task[tid]
+        if task.get_status() == ScriptStatus.QUEUED and self.scheduler.cancel(task):
+            return True
         if task.get_status() != ScriptStatus.RUNNING:
             raise ValueError(f"Cannot stop task in {task.get_status()} state")
 
@@ -121,11 +543,20 @@ class ScriptManager:
             task.stop()
         return True
 
-    def reload(self):
-        """重新加载脚本"""
-        self.scriptPackage = ScriptPackage.model_validate_json(
-            self.source.read_text(encoding="utf-8"), context={"source": self.source}
-        )
-        self.task.clear()
-        self.lastupdate = time.time()
+    def reload(self) -> dict:
+        """重新加载脚本
+
+        各脚本包并行重新加载, 只重新校验有变化的条目(未加载的包只重新读取包信息),
+        新目录建立完成后整体替换, 已有任务(包括运行中的)不受影响。
+        发布 catalog 事件通知客户端目录已变化, 返回目录的变化(见 MergedCatalog.diff)。
+        """
+        with self._reloadLock, CATALOG_RELOAD_SECONDS.time():
+            previous = self.catalog
+            catalog = self._load_catalog(previous)
+            # 替换前生成响应体, 之后的请求直接使用
+            catalog.commands
+            self.catalog = catalog
+        diff = catalog.diff(previous)
+        self.events.publish("catalog", diff)
         logging.info("ScriptManager reloaded successfully.")
+        return diff
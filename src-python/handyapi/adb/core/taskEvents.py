@@ -0,0 +1,87 @@
+"""ADB任务变更通知模块"""
+
+import asyncio
+import json
+import threading
+import typing as t
+
+
+class TaskSnapshot:
+    """某一版本的任务列表快照(序列化结果随版本缓存)"""
+
+    def __init__(self, version: int, data: dict, tag: str):
+        self.version = version
+        self.data = data
+        self.body: bytes = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.etag: str = f'"{tag}-{version}"'
+
+
+class TaskSubscription:
+    """单个订阅者的事件队列(绑定到订阅时所在的事件循环)"""
+
+    def __init__(self, bus: "TaskEventBus", maxsize: int):
+        self.bus = bus
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.overflow: bool = False
+
+    def push(self, event: dict) -> None:
+        """投递事件(可在任意线程调用)"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 消费过慢, 丢弃积压事件, 由订阅者重新同步全量快照
+            self.overflow = True
+
+    async def get(self) -> dict:
+        """等待下一个事件"""
+        return await self.queue.get()
+
+    def drain(self) -> None:
+        """清空积压事件"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflow = False
+
+    def close(self) -> None:
+        """取消订阅"""
+        self.bus.unsubscribe(self)
+
+
+class TaskEventBus:
+    """任务变更通知通道, 每个事件带单调递增的序号"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.seq: int = 0
+        self.lock = threading.RLock()
+        self.maxsize = maxsize
+        self._subscribers: t.Set[TaskSubscription] = set()
+
+    def publish(self, kind: str, data: t.Optional[dict] = None) -> int:
+        """发布事件, 返回事件序号"""
+        with self.lock:
+            self.seq += 1
+            event = {"type": kind, "seq": self.seq, **(data or {})}
+            for sub in self._subscribers:
+                sub.push(event)
+            return self.seq
+
+    def subscribe(self) -> TaskSubscription:
+        """订阅事件(需在事件循环中调用)"""
+        sub = TaskSubscription(self, self.maxsize)
+        with self.lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: TaskSubscription) -> None:
+        """取消订阅"""
+        with self.lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscribers(self) -> int:
+        """订阅者数量"""
+        return len(self._subscribers)
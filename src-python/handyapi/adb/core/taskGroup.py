@@ -0,0 +1,47 @@
+"""ADB任务组模块"""
+
+import time
+import typing as t
+from collections import Counter
+
+from ..models.scriptModel import IdType, ScriptStatus
+
+if t.TYPE_CHECKING:
+    from .baseScript import BaseScript
+    from .taskRecord import TaskRecord
+
+
+class TaskGroup:
+    """批量执行产生的任务组"""
+
+    def __init__(self, gid: IdType, sid: IdType, taskids: t.List[IdType]):
+        self.gid = gid
+        self.sid = sid
+        self.taskids = taskids
+        self.createtime: float = time.time()
+
+    def summary(self, lookup: t.Callable[[IdType], t.Optional["BaseScript | TaskRecord"]]) -> dict:
+        """任务组汇总状态"""
+        counts: Counter = Counter()
+        failed = 0
+        for tid in self.taskids:
+            task = lookup(tid)
+            if task is None:
+                counts["DELETED"] += 1
+                continue
+            counts[task.get_status().name] += 1
+            # 被取消、退出码非 0 或未能启动(没有退出码)均计为失败
+            if task.finished and task.returncode != 0:
+                failed += 1
+
+        pending = counts["PRE"] + counts["QUEUED"] + counts["RUNNING"]
+        return {
+            "groupId": self.gid,
+            "commandId": self.sid,
+            "createdAt": self.createtime,
+            "status": ScriptStatus.RUNNING.name if pending else ScriptStatus.FINISH.name,
+            "total": len(self.taskids),
+            "failed": failed,
+            "counts": dict(counts),
+            "taskIds": self.taskids,
+        }
@@ -0,0 +1,235 @@
+"""ADB任务历史存储模块"""
+
+import json
+import logging
+import sqlite3
+import threading
+import typing as t
+from pathlib import Path
+
+from ..models.scriptModel import IdType, ScriptStatus
+from .taskRecord import TaskRecord
+
+_COLUMNS = (
+    "taskId",
+    "commandId",
+    "groupId",
+    "status",
+    "priority",
+    "queuedAt",
+    "createdAt",
+    "endedAt",
+    "waitTime",
+    "exitCode",
+    "cmdline",
+    "logfile",
+    "cached",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    taskId INTEGER PRIMARY KEY,
+    commandId INTEGER,
+    groupId INTEGER,
+    status INTEGER,
+    priority INTEGER,
+    queuedAt REAL,
+    createdAt REAL,
+    endedAt REAL,
+    waitTime REAL,
+    exitCode INTEGER,
+    cmdline TEXT,
+    logfile TEXT,
+    cached INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_command ON tasks (commandId);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS tasks_created ON tasks (createdAt);
+"""
+
+
+class TaskHistory:
+    """任务历史(SQLite)
+
+    任务变更以写后方式批量写入; 查询不等待写入, 尚未写入(或正在写入)的记录
+    直接从内存中取得并与数据库的结果合并。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # 等待写入与正在写入的记录(None 表示删除)
+        self._pending: t.Dict[IdType, t.Optional[dict]] = {}
+        self._inflight: t.Dict[IdType, t.Optional[dict]] = {}
+        self._cond = threading.Condition()
+        self._writing = False
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+            if "cached" not in columns:
+                self._conn.execute("ALTER TABLE tasks ADD COLUMN cached INTEGER")
+            # 旧版本把没有日志的任务保存为字符串 'None'
+            self._conn.execute("UPDATE tasks SET logfile = NULL WHERE logfile = 'None'")
+            # 上次运行时未结束的任务已随进程退出
+            self._conn.execute(
+                "UPDATE tasks SET status = ? WHERE status IN (?, ?, ?)",
+                (
+                    ScriptStatus.TERMINATED.value,
+                    ScriptStatus.PRE.value,
+                    ScriptStatus.QUEUED.value,
+                    ScriptStatus.RUNNING.value,
+                ),
+            )
+        threading.Thread(target=self._writer, name="TaskHistory", daemon=True).start()
+
+    def save(self, record: dict) -> None:
+        """保存任务记录"""
+        with self._cond:
+            self._pending[record["taskId"]] = record
+            self._cond.notify()
+
+    def delete(self, taskid: IdType) -> None:
+        """删除任务记录"""
+        with self._cond:
+            self._pending[taskid] = None
+            self._cond.notify()
+
+    def _writer(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+                self._writing = True
+            try:
+                self._write(pending)
+            except sqlite3.Error as e:
+                logging.error(f"Failed to write task history: {e}")
+            except Exception:
+                # 写入线程退出后 flush() 会一直等待, 任何异常都只记录并丢弃这一批
+                logging.exception("Unexpected error while writing task history")
+            finally:
+                with self._cond:
+                    self._inflight = {}
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, pending: t.Dict[IdType, t.Optional[dict]]) -> None:
+        rows = [
+            tuple(record.get(c) for c in _COLUMNS)
+            for record in pending.values()
+            if record is not None
+        ]
+        deleted = [(tid,) for tid, record in pending.items() if record is None]
+        with self._lock, self._conn:
+            if rows:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    rows,
+                )
+            if deleted:
+                self._conn.executemany("DELETE FROM tasks WHERE taskId = ?", deleted)
+
+    def flush(self) -> None:
+        """等待积压的写入完成"""
+        with self._cond:
+            while self._pending or self._writing:
+                self._cond.wait()
+
+    def _unwritten(self) -> t.Dict[IdType, t.Optional[dict]]:
+        """尚未写入数据库的记录(None 表示已删除)"""
+        with self._cond:
+            return {**self._inflight, **self._pending}
+
+    def get(self, taskid: IdType) -> t.Optional[TaskRecord]:
+        """查询单个任务"""
+        unwritten = self._unwritten()
+        if taskid in unwritten:
+            record = unwritten[taskid]
+            return TaskRecord(record) if record is not None else None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM tasks WHERE taskId = ?", (taskid,)
+            ).fetchone()
+        return TaskRecord(dict(row)) if row else None
+
+    def query(
+        self,
+        status: t.Optional[t.List[int]] = None,
+        commandId: t.Optional[IdType] = None,
+        since: t.Optional[float] = None,
+        until: t.Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> t.Tuple[int, t.List[dict]]:
+        """分页查询任务(按任务 id 倒序), 返回 (总数, 当前页)"""
+        unwritten = self._unwritten()
+        # 数据库中的查询结果排除尚未写入的记录, 后者按相同条件在内存中筛选后合并
+        where, args = ["taskId NOT IN (SELECT value FROM json_each(?))"], [json.dumps(list(unwritten))]
+        if status:
+            where.append(f"status IN ({', '.join('?' * len(status))})")
+            args.extend(status)
+        if commandId is not None:
+            where.append("commandId = ?")
+            args.append(commandId)
+        if since is not None:
+            where.append("COALESCE(createdAt, queuedAt) >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("COALESCE(createdAt, queuedAt) < ?")
+            args.append(until)
+        clause = f"WHERE {' AND '.join(where)}"
+
+        def matches(record: dict) -> bool:
+            created = record.get("createdAt")
+            if created is None:
+                created = record.get("queuedAt")
+            return (
+                (not status or record["status"] in status)
+                and (commandId is None or record.get("commandId") == commandId)
+                and (since is None or (created is not None and created >= since))
+                and (until is None or (created is not None and created < until))
+            )
+
+        extra = [
+            {c: record.get(c) for c in _COLUMNS}
+            for record in unwritten.values()
+            if record is not None and matches(record)
+        ]
+        # 有未写入的记录时从头取到当前页末尾再合并(未写入的记录通常只有写入间隔内的少量)
+        start, count = (0, offset + limit) if extra else (offset, limit)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM tasks {clause}", args).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM tasks {clause} "
+                "ORDER BY taskId DESC LIMIT ? OFFSET ?",
+                args + [count, start],
+            ).fetchall()
+        tasks = [dict(row) for row in rows]
+        if extra:
+            tasks = sorted(tasks + extra, key=lambda task: task["taskId"], reverse=True)
+            tasks = tasks[offset:offset + limit]
+        for task in tasks:
+            task["cached"] = bool(task["cached"])
+        return total + len(extra), tasks
+
+    def iter_logs(self, exclude: t.Container[IdType] = ()) -> t.Iterator[TaskRecord]:
+        """所有有日志的历史任务"""
+        unwritten = self._unwritten()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM tasks WHERE logfile IS NOT NULL"
+            ).fetchall()
+        for row in rows:
+            if row["taskId"] not in exclude and row["taskId"] not in unwritten:
+                yield TaskRecord(dict(row))
+        for taskid, record in unwritten.items():
+            if record is not None and record["logfile"] is not None and taskid not in exclude:
+                yield TaskRecord(record)
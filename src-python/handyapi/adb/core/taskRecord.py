@@ -0,0 +1,115 @@
+"""ADB已结束任务记录模块"""
+
+import asyncio
+import logging
+import os
+import typing as t
+from pathlib import Path
+
+from ..models.scriptModel import IdType, ScriptStatus
+from .logArchive import LogArchive, archive_path, compress_log
+
+
+class TaskRecord:
+    """已结束任务的精简记录, 提供与 BaseScript 相同的只读接口
+
+    任务结束后在内存中以此替换脚本实例(不再持有参数、环境变量、执行引擎等),
+    移出内存的任务从历史存储中读取时也使用此类。
+    """
+
+    __slots__ = ("data", "taskid", "status", "returncode", "logfile", "archive")
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.taskid: IdType = data["taskId"]
+        self.status = ScriptStatus(data["status"])
+        self.returncode: t.Optional[int] = data["exitCode"]
+        self.logfile: t.Optional[Path] = Path(data["logfile"]) if data["logfile"] is not None else None
+        self.archive: t.Optional[Path] = None
+        if "archive" in data:
+            # 由脚本实例生成的记录, 归档状态已知
+            self.archive = Path(data["archive"]) if data["archive"] is not None else None
+        elif self.logfile is not None and not self.logfile.exists():
+            archive = archive_path(self.logfile)
+            if archive.exists():
+                self.archive = archive
+
+    @property
+    def finished(self) -> bool:
+        """记录的任务均已结束"""
+        return True
+
+    @property
+    def starttime(self) -> t.Optional[float]:
+        return self.data.get("createdAt")
+
+    @property
+    def endtime(self) -> t.Optional[float]:
+        return self.data.get("endedAt")
+
+    @property
+    def cached(self) -> bool:
+        """结果是否来自结果缓存"""
+        return bool(self.data.get("cached"))
+
+    def get_status(self) -> ScriptStatus:
+        """获取任务状态"""
+        return self.status
+
+    def to_dict(self) -> dict:
+        """任务信息"""
+        return {
+            **self.data,
+            "archive": str(self.archive) if self.archive is not None else None,
+            "cached": self.cached,
+        }
+
+    def archive_log(self) -> t.Optional[Path]:
+        """压缩任务日志, 之后的读取从归档中按块解压"""
+        if self.logfile is None or self.archive is not None:
+            return self.archive
+        archive = compress_log(self.logfile)
+        try:
+            self.logfile.unlink()
+        except OSError:
+            # 日志仍被占用(如正在被读取), 下次再归档
+            archive.unlink()
+            raise
+        self.archive = archive
+        logging.info(f"Archived log of task {self.taskid} to {archive}")
+        return archive
+
+    def get_log_file(self) -> t.Optional[Path]:
+        """未归档的日志文件"""
+        if self.logfile is not None and self.archive is None and self.logfile.exists():
+            return self.logfile
+        return None
+
+    def get_log_archive(self) -> t.Optional[LogArchive]:
+        """已归档日志的读取器(归档已被清理时返回 None)"""
+        if self.archive is None:
+            return None
+        if not self.archive.exists():
+            self.archive = None
+            return None
+        return LogArchive(self.archive)
+
+    def get_log(self, pos: int, max_size: int) -> bytes:
+        """获取任务日志"""
+        try:
+            if (archive := self.get_log_archive()) is not None:
+                return archive.read(pos, max_size)
+            if self.logfile is None:
+                return b""
+            with self.logfile.open("rb") as f:
+                f.seek(pos, os.SEEK_SET)
+                return f.read(max_size)
+        except (FileNotFoundError, ValueError) as e:
+            logging.error(f"Failed to read log of task {self.taskid}: {e}")
+            return b""
+
+    async def follow_log(self, pos: int = 0, chunk_size: int = 64 * 1024) -> t.AsyncIterator[bytes]:
+        """读取 pos 之后的全部日志(任务已结束, 读完即停止)"""
+        while data := await asyncio.to_thread(self.get_log, pos, chunk_size):
+            pos += len(data)
+            yield data
@@ -0,0 +1,188 @@
+"""ADB任务调度模块"""
+
+import bisect
+import itertools
+import logging
+import threading
+import typing as t
+from collections import Counter
+
+from ..models.scriptModel import ExecuteParam
+from .baseScript import BaseScript
+
+StartCallback = t.Callable[[BaseScript, ExecuteParam], None]
+
+
+class QueuedTask:
+    """等待调度的任务"""
+
+    def __init__(
+        self,
+        task: BaseScript,
+        parameters: ExecuteParam,
+        start: StartCallback,
+        priority: int,
+        resources: t.Tuple[str, ...],
+        seq: int,
+    ):
+        self.task = task
+        self.parameters = parameters
+        self.start = start
+        self.priority = priority
+        self.resources = resources
+        self.key = (-priority, seq)
+
+    def __lt__(self, other: "QueuedTask") -> bool:
+        return self.key < other.key
+
+
+class TaskScheduler:
+    """任务调度器
+
+    - 全局最大并发数(0 表示不限制)
+    - 优先级高的任务先启动, 同优先级先进先出
+    - 资源槽: 参数名在 resource_params 中的参数值(如设备序列号)视为资源,
+      同一资源同时最多运行 resource_slots 个任务
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        resource_params: t.Iterable[str] = (),
+        resource_slots: int = 1,
+    ):
+        self.max_concurrency = max_concurrency
+        self.resource_params = tuple(resource_params)
+        self.resource_slots = resource_slots
+        self._queue: t.List[QueuedTask] = []
+        self._running: t.Dict[int, t.Tuple[str, ...]] = {}
+        self._resources: Counter = Counter()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: t.Optional[threading.Thread] = None
+
+    @property
+    def depth(self) -> int:
+        """排队中的任务数量"""
+        return len(self._queue)
+
+    @property
+    def running(self) -> int:
+        """已占用执行槽的任务数量"""
+        return len(self._running)
+
+    def get_resources(self, parameters: ExecuteParam) -> t.Tuple[str, ...]:
+        """参数中占用的资源"""
+        resources = []
+        for name in self.resource_params:
+            value = parameters.root.get(name)
+            values = value if isinstance(value, list) else [value]
+            for v in values:
+                if isinstance(v, str) and v.strip():
+                    resources.append(f"{name}={v.strip()}")
+        return tuple(resources)
+
+    def _available(self, resources: t.Tuple[str, ...]) -> bool:
+        if self.max_concurrency > 0 and len(self._running) >= self.max_concurrency:
+            return False
+        return all(self._resources[r] < self.resource_slots for r in resources)
+
+    def _acquire(self, entry: QueuedTask) -> None:
+        self._running[entry.task.taskid] = entry.resources
+        self._resources.update(entry.resources)
+
+    def submit(
+        self, task: BaseScript, parameters: ExecuteParam, start: StartCallback, priority: int = 0
+    ) -> bool:
+        """提交任务
+
+        有空闲执行槽且没有更高优先级的任务在排队时, 在调用线程中直接启动并返回 True;
+        否则任务进入 QUEUED 状态排队, 由调度线程在执行槽释放后启动, 返回 False。
+        """
+        entry = QueuedTask(
+            task, parameters, start, priority, self.get_resources(parameters), next(self._seq)
+        )
+        with self._cond:
+            ahead = any(not (entry < queued) for queued in self._queue)
+            if not ahead and self._available(entry.resources):
+                self._acquire(entry)
+                immediate = True
+            else:
+                task.enqueue(priority)
+                bisect.insort(self._queue, entry)
+                self._ensure_thread()
+                self._cond.notify()
+                immediate = False
+
+        if immediate:
+            try:
+                start(task, parameters)
+            except Exception:
+                self.release(task)
+                raise
+        return immediate
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name="TaskScheduler", daemon=True)
+            self._thread.start()
+
+    def _next(self) -> t.Optional[QueuedTask]:
+        """取出优先级最高的可运行任务"""
+        for i, entry in enumerate(self._queue):
+            if self._available(entry.resources):
+                del self._queue[i]
+                self._acquire(entry)
+                return entry
+            if self.max_concurrency > 0 and len(self._running) >= self.max_concurrency:
+                break
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while (entry := self._next()) is None:
+                    self._cond.wait()
+            self._run(entry)
+
+    def _run(self, entry: QueuedTask) -> None:
+        try:
+            entry.start(entry.task, entry.parameters)
+        except Exception as e:
+            logging.error(f"Failed to start task {entry.task.taskid}: {e}")
+            # 启动失败时任务已结束, 确保执行槽被释放
+            self.release(entry.task)
+
+    def release(self, task: BaseScript) -> None:
+        """任务结束, 释放执行槽"""
+        with self._cond:
+            resources = self._running.pop(task.taskid, None)
+            if resources is None:
+                return
+            self._resources.subtract(resources)
+            self._cond.notify()
+
+    def cancel(self, task: BaseScript) -> bool:
+        """取消排队中的任务"""
+        with self._cond:
+            for i, entry in enumerate(self._queue):
+                if entry.task is task:
+                    del self._queue[i]
+                    break
+            else:
+                return False
+        task.cancel()
+        return True
+
+    def configure(
+        self,
+        max_concurrency: int,
+        resource_params: t.Iterable[str],
+        resource_slots: int,
+    ) -> None:
+        """调整调度参数"""
+        with self._cond:
+            self.max_concurrency = max_concurrency
+            self.resource_params = tuple(resource_params)
+            self.resource_slots = resource_slots
+            self._cond.notify_all()
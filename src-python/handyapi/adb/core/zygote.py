@@ -0,0 +1,190 @@
+"""python 脚本 fork 服务器(zygote)进程
+
+由 ForkServer 以脚本包指定的解释器按文件路径启动(只依赖标准库):
+
+    python zygote.py <控制套接字 fd> [预加载模块...]
+
+启动时预先导入常用模块, 之后每个任务 fork 一个子进程, 在子进程中以 runpy 执行脚本,
+省去解释器启动与重复导入的时间。
+
+控制协议(双向均为 4 字节大端长度 + JSON):
+- 请求 {"id", "argv", "env", "cwd", "nfds"}: 同一消息经 SCM_RIGHTS 附带
+  nfds 个文件描述符(依次为 stdout、stderr)
+- 回复 {"type": "started", "id", "pid"} 或 {"type": "error", "id", "message"}
+- 子进程退出时 {"type": "exit", "pid", "code"}, code 与 Popen.returncode 相同
+  (被信号终止时为负的信号值)
+
+控制套接字关闭(服务端退出)时 zygote 随之退出, 已启动的子进程不受影响。
+"""
+
+import importlib
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import struct
+import sys
+import traceback
+
+_LENGTH = struct.Struct(">I")
+MAX_FDS = 2
+
+
+def send(sock: socket.socket, message: dict) -> None:
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def print_script_exc(exc: BaseException) -> None:
+    """与独立解释器一致地打印异常: 去掉 zygote 与 runpy 自身的调用帧"""
+    tb = exc.__traceback__
+    internal = (os.path.abspath(__file__), runpy.__file__, "<frozen runpy>")
+    while tb is not None and tb.tb_next is not None and tb.tb_frame.f_code.co_filename in internal:
+        tb = tb.tb_next
+    traceback.print_exception(type(exc), exc, tb)
+
+
+def run_child(request: dict, fds: list) -> None:
+    """子进程: 重定向标准输入输出后执行脚本, 不返回"""
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(fds[0] if fds else devnull, 1)
+        os.dup2(fds[1] if len(fds) > 1 else devnull, 2)
+        for fd in {devnull, *fds}:
+            if fd > 2:
+                os.close(fd)
+
+        os.environ.clear()
+        os.environ.update(request["env"])
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        argv = request["argv"]
+        sys.argv = list(argv)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+        try:
+            runpy.run_path(argv[0], run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except KeyboardInterrupt as e:
+            # 与独立解释器一致: 打印堆栈后以 SIGINT 结束
+            print_script_exc(e)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGINT)
+        except BaseException as e:
+            print_script_exc(e)
+            code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code & 0xFF)
+
+
+def main() -> None:
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    # 脚本目录(本模块所在目录)不应出现在脚本的模块搜索路径中
+    del sys.path[0]
+    for name in sys.argv[2:]:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"zygote: failed to preload {name}: {e}", file=sys.stderr)
+
+    # 子进程退出经唤醒管道通知主循环回收
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    # 终端中断由服务端处理, zygote 只在控制套接字关闭时退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wake_r, selectors.EVENT_READ)
+    buffer = b""
+    pending_fds: list = []
+
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is wake_r:
+                while True:
+                    try:
+                        if not os.read(wake_r, 512):
+                            break
+                    except BlockingIOError:
+                        break
+                reap(sock)
+                continue
+
+            data, fds, _, _ = socket.recv_fds(sock, 65536, MAX_FDS * 16)
+            if not data:
+                return
+            buffer += data
+            pending_fds.extend(fds)
+            while len(buffer) >= _LENGTH.size:
+                (size,) = _LENGTH.unpack_from(buffer)
+                if len(buffer) < _LENGTH.size + size:
+                    break
+                request = json.loads(buffer[_LENGTH.size:_LENGTH.size + size])
+                buffer = buffer[_LENGTH.size + size:]
+                nfds = request.get("nfds", 0)
+                fds, pending_fds = pending_fds[:nfds], pending_fds[nfds:]
+                spawn(sock, request, fds, (wake_r, wake_w))
+        # 信号可能在 select 返回后到达, 每轮都检查一次
+        reap(sock)
+
+
+def spawn(sock: socket.socket, request: dict, fds: list, private: tuple) -> None:
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        pid = os.fork()
+    except OSError as e:
+        send(sock, {"type": "error", "id": request["id"], "message": str(e)})
+        for fd in fds:
+            os.close(fd)
+        return
+    if pid == 0:
+        signal.set_wakeup_fd(-1)
+        sock.close()
+        for fd in private:
+            os.close(fd)
+        run_child(request, fds)
+    for fd in fds:
+        os.close(fd)
+    send(sock, {"type": "started", "id": request["id"], "pid": pid})
+
+
+def reap(sock: socket.socket) -> None:
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        send(sock, {"type": "exit", "pid": pid, "code": os.waitstatus_to_exitcode(status)})
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,10 @@ from .scriptModel import (
     GroupInfo,
     RootGroup,
     ExecuteParam,
+    BatchExecuteParam,
     ScriptStatus,
 )
+from .deviceModel import AdbDevice
 
 __all__ = [
     "GlobalId",
@@ -15,5 +17,7 @@ __all__ = [
     "GroupInfo",
     "RootGroup",
     "ExecuteParam",
+    "BatchExecuteParam",
     "ScriptStatus",
+    "AdbDevice",
 ]
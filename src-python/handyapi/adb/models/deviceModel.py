@@ -0,0 +1,44 @@
+"""ADB设备数据模型模块"""
+
+import typing as t
+
+from pydantic import BaseModel
+
+
+class AdbDevice(BaseModel):
+    """ADB设备信息模型(adb devices -l 的一行)"""
+
+    serial: str
+    # device / offline / unauthorized / recovery / sideload / bootloader ...
+    state: str
+    model: t.Optional[str] = None
+    product: t.Optional[str] = None
+    device: t.Optional[str] = None
+    usb: t.Optional[str] = None
+    transportId: t.Optional[int] = None
+
+    @classmethod
+    def parse(cls, line: str) -> t.Optional["AdbDevice"]:
+        """解析一行设备信息: <serial> <state> [key:value ...]"""
+        fields = line.split()
+        if len(fields) < 2:
+            return None
+        state = fields[1]
+        if fields[1:3] == ["no", "permissions"]:
+            # "no permissions (...); see [url]" 中带空格
+            state = "no permissions"
+        extra: t.Dict[str, str] = {}
+        for field in fields[2:]:
+            key, sep, value = field.partition(":")
+            if sep:
+                extra[key] = value
+        transport = extra.get("transport_id")
+        return cls(
+            serial=fields[0],
+            state=state,
+            model=extra.get("model"),
+            product=extra.get("product"),
+            device=extra.get("device"),
+            usb=extra.get("usb"),
+            transportId=int(transport) if transport and transport.isdigit() else None,
+        )
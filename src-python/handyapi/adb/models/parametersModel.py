@@ -1,7 +1,8 @@
 """ADB脚本参数类型定义模块"""
 
+import typing as t
 from typing import Literal as L, List, Annotated
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class InputParameter(BaseModel):
@@ -19,6 +20,10 @@ class InputParameter(BaseModel):
             return False
         return True
 
+    def checker(self) -> t.Callable[[t.Any], bool]:
+        """编译后的校验函数"""
+        return lambda value: isinstance(value, str)
+
 
 class SelectOption(BaseModel):
     """选择项配置"""
@@ -38,13 +43,31 @@ class SelectParameter(BaseModel):
     description: str
     required: bool = True
     options : Annotated[List[SelectOption], Field()] = Field(default_factory=list)
+    _values: t.FrozenSet[str] = PrivateAttr(default=frozenset())
+
+    def model_post_init(self, context: t.Any) -> None:
+        # 选项值集合在加载时建立一次
+        self._values = frozenset(opt.value for opt in self.options)
 
     def check_value(self, option: str | List[str]) -> bool:
 
         if self.multiple and isinstance(option, list):
-            return all(opt in [opt.value for opt in self.options] for opt in option)
+            return all(isinstance(opt, str) and opt in self._values for opt in option)
+
+        return isinstance(option, str) and option in self._values
 
-        return option in [opt.value for opt in self.options]
+    def checker(self) -> t.Callable[[t.Any], bool]:
+        """编译后的校验函数(直接持有选项值集合)"""
+        values = self._values
+        if not self.multiple:
+            return lambda option: isinstance(option, str) and option in values
+
+        def check(option: t.Any) -> bool:
+            if isinstance(option, list):
+                return all(isinstance(opt, str) and opt in values for opt in option)
+            return isinstance(option, str) and option in values
+
+        return check
 
 
 class SwitchParameter(BaseModel):
@@ -59,3 +82,60 @@ class SwitchParameter(BaseModel):
 
     def check_value(self, value: bool) -> bool:
         return isinstance(value, bool)
+
+    def checker(self) -> t.Callable[[t.Any], bool]:
+        """编译后的校验函数"""
+        return lambda value: isinstance(value, bool)
+
+
+Parameter = InputParameter | SelectParameter | SwitchParameter
+
+
+class ParameterPlan:
+    """编译后的参数计划
+
+    加载脚本时按参数列表生成一次, 保存每个参数的校验函数及其在命令行中的形式:
+    名称以 "-" 开头的参数为具名参数, 值非空(开关为真)时先输出参数名。
+    build() 逐个参数校验并生成命令行参数, 只遍历一次。
+    """
+
+    def __init__(self, parameters: t.Sequence[Parameter]):
+        self.steps: t.Tuple[t.Tuple[str, bool, t.Callable[[t.Any], bool]], ...] = tuple(
+            (param.name, param.name.startswith("-"), param.checker()) for param in parameters
+        )
+
+    def validate(self, values: t.Mapping[str, t.Any]) -> None:
+        """只校验参数"""
+        for name, _, check in self.steps:
+            self._check(name, check, values)
+
+    @staticmethod
+    def _check(name: str, check: t.Callable[[t.Any], bool], values: t.Mapping[str, t.Any]) -> t.Any:
+        if name not in values:
+            raise ValueError(f"Missing required parameter: {name}")
+        value = values[name]
+        if not check(value):
+            raise ValueError(f"Invalid value for parameter '{name}': {value}")
+        return value
+
+    def build(self, values: t.Mapping[str, t.Any], expand_lists: bool = False) -> t.List[str]:
+        """校验参数并生成命令行参数
+
+        字符串值去除首尾空白后非空才输出; 开关只作为具名参数输出参数名;
+        expand_lists 为真时多选值逐项输出。
+        """
+        args: t.List[str] = []
+        for name, named, check in self.steps:
+            value = self._check(name, check, values)
+            if isinstance(value, str):
+                value = value.strip()
+                if value:
+                    if named:
+                        args.append(name)
+                    args.append(value)
+            elif isinstance(value, bool):
+                if value and named:
+                    args.append(name)
+            elif expand_lists and isinstance(value, list):
+                args.extend(v.strip() for v in value if v.strip())
+        return args
@@ -1,5 +1,7 @@
 """ADB脚本数据模型模块"""
 
+import functools
+import threading
 import typing as t
 from pathlib import Path
 from enum import Enum, auto
@@ -7,19 +9,21 @@ from enum import Enum, auto
 from pydantic import BaseModel, RootModel, Field, AfterValidator
 from typing_extensions import Annotated
 
-from .parametersModel import InputParameter, SelectParameter, SwitchParameter
+from .parametersModel import InputParameter, SelectParameter, SwitchParameter, ParameterPlan
 
 
 class GlobalId:
-    """全局ID生成器"""
+    """全局ID生成器(线程安全)"""
 
     _next_id: t.ClassVar[int] = 1
+    _lock: t.ClassVar[threading.Lock] = threading.Lock()
 
     @classmethod
     def get_next_id(cls) -> int:
-        current_id = cls._next_id
-        cls._next_id += 1
-        return current_id
+        with cls._lock:
+            current_id = cls._next_id
+            cls._next_id += 1
+            return current_id
 
 
 def validate_path(value: str|None, info: t.Any) -> str|None:
@@ -48,6 +52,9 @@ class ScriptInfo(BaseModel):
     type: t.Literal["winpowershell", "powershell", "python"]
     path: Annotated[str, AfterValidator(validate_path)]
     newconsole: bool = False
+    # 只读查询类脚本可缓存结果: 脚本文件与参数相同时在 cacheTtl 秒内直接返回上次结果
+    cacheable: bool = False
+    cacheTtl: float = Field(default=60, gt=0)
     label: str
     description: str
     parameters: t.List[
@@ -57,6 +64,15 @@ class ScriptInfo(BaseModel):
         ]
     ]
 
+    def model_post_init(self, context: t.Any) -> None:
+        # 加载时编译参数计划
+        self.plan
+
+    @functools.cached_property
+    def plan(self) -> ParameterPlan:
+        """编译后的参数计划"""
+        return ParameterPlan(self.parameters)
+
 
 class GroupInfo(BaseModel):
     """脚本组信息模型"""
@@ -103,6 +119,32 @@ class ExecuteParam(RootModel):
     root: t.Dict[str, str | bool | t.List[str]]
 
 
+class BatchExecuteParam(BaseModel):
+    """批量执行参数模型
+
+    params 中的每组参数各执行一次; 另外 template 与 serials 组合,
+    每个设备序列号以 serialParam 为参数名填入模板执行一次。
+    """
+
+    params: t.List[ExecuteParam] = Field(default_factory=list)
+    template: t.Optional[ExecuteParam] = None
+    serials: t.List[str] = Field(default_factory=list)
+    serialParam: str = "serial"
+    priority: int = 0
+
+    def expand(self) -> t.List[ExecuteParam]:
+        """展开为逐个任务的执行参数"""
+        expanded = list(self.params)
+        if self.serials:
+            if self.template is None:
+                raise ValueError("template is required when serials are given")
+            for serial in self.serials:
+                expanded.append(ExecuteParam({**self.template.root, self.serialParam: serial}))
+        if not expanded:
+            raise ValueError("No parameter sets to execute")
+        return expanded
+
+
 class ScriptStatus(Enum):
     """脚本状态枚举"""
 
@@ -110,6 +152,7 @@ class ScriptStatus(Enum):
     RUNNING = auto()
     FINISH = auto()
     TERMINATED = auto()
+    QUEUED = auto()
 
 class ManagerInfo(BaseModel):
 
@@ -5,64 +5,191 @@ Provides endpoints for managing and executing ADB commands through a RESTful API
 Includes WebSocket support for real-time task updates.
 """
 
+import functools
+import json
 import logging
 import asyncio
+import re
+import threading
+import time
 import traceback
+from urllib.parse import quote
 
-from typing import Annotated, Optional
-from fastapi import APIRouter, Path, Response, Query, WebSocketDisconnect, status, WebSocket, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from pathlib import Path as PathLib
+from typing import TYPE_CHECKING, Annotated, List, Optional
+from fastapi import APIRouter, Path, Request, Response, Query, WebSocketDisconnect, status, WebSocket, Depends, HTTPException
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.websockets import WebSocketState
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from ..settings import get_script_manager_settings
+from ..settings import get_script_manager_settings, settingsStore
+from ..settings.models.smSettingsModel import ScriptManagerSettings
 from .core.scriptManager import ScriptManager
-from .models.scriptModel import ExecuteParam, ScriptPackage, ManagerInfo
+from .core.logArchive import LogArchiver, ARCHIVE_SUFFIX
+from .core.logSearch import compile_pattern
+from .core.taskScheduler import TaskScheduler
+from .core.metrics import (
+    LOG_BYTES_READ, QUEUE_DEPTH, RUNNING_TASKS, WEBSOCKET_CLIENTS, WEBSOCKET_SEND_SECONDS,
+)
+from .models.scriptModel import ExecuteParam, BatchExecuteParam, ScriptPackage, ManagerInfo, ScriptStatus
+from .utils.httpCache import CachedBody, cached_body_response, cached_response
+from .utils.fileResponse import file_slice_response
+
+if TYPE_CHECKING:
+    from .core.catalogWatcher import CatalogWatcher
+    from .core.deviceRegistry import DeviceRegistry
+    from .core.resultCache import ResultCache
 
 smSettings = get_script_manager_settings()
 manager: Optional[ScriptManager] = None
-
-async def dependency_manager():
-    global manager
-    logging.info(f"dependency_manager called")
-    if not manager:
+archiver: Optional[LogArchiver] = None
+watcher: Optional["CatalogWatcher"] = None
+devices: Optional["DeviceRegistry"] = None
+
+_initLock = threading.Lock()
+
+def init_manager() -> ScriptManager:
+    """创建脚本管理器及其后台组件(只创建一次, 可在任意线程调用)"""
+    global manager, archiver, watcher, devices
+    with _initLock:
+        if manager is not None:
+            return manager
+        started = time.perf_counter()
+        # 在这里读取当前设置: 管理器创建前修改的设置也会生效
+        settings = get_script_manager_settings()
+        # 按需启用的组件在这里才导入, 不拖慢服务启动
+        from .core.catalogWatcher import CatalogWatcher
+        from .core.deviceRegistry import AdbClient, DeviceRegistry
+        from .core.forkServer import ForkServerPool
+        from .core.taskHistory import TaskHistory
+        forkServers = None
+        if settings.pythonForkServer:
+            if ForkServerPool.supported():
+                forkServers = ForkServerPool(settings.forkServerPreload)
+            else:
+                logging.warning("Fork server is not supported on this platform")
+        mgr = ScriptManager(
+            [settings.scriptPath, *map(str, settings.scriptPackages)],
+            settings.logPath,
+            settings.ringBufferSize if settings.captureOutput else 0,
+            TaskScheduler(
+                settings.maxConcurrency,
+                settings.resourceParams,
+                settings.resourceSlots,
+            ),
+            TaskHistory(PathLib(settings.historyPath)),
+            settings.maxTasksInMemory,
+            settings.lazyLoadPackages,
+            forkServers,
+            create_result_cache(settings),
+        )
+        archiver = LogArchiver(
+            mgr,
+            retention_days=settings.logRetentionDays,
+            quota_mb=settings.logQuotaMB,
+            interval=settings.archiveInterval,
+            compress=settings.archiveLogs,
+        )
+        archiver.start()
+        if settings.watchScripts:
+            watcher = CatalogWatcher(mgr, settings.watchInterval, settings.watchDebounce)
+            watcher.start()
+        if settings.adbDevices:
+            devices = DeviceRegistry(
+                AdbClient(settings.adbHost, settings.adbPort), settings.adbRetryInterval
+            )
+            devices.subscribe(lambda change: mgr.events.publish("devices", change))
+            mgr.envProviders.append(devices.environ)
+            devices.start()
+        QUEUE_DEPTH.set_function(lambda: mgr.scheduler.depth)
+        RUNNING_TASKS.set_function(lambda: mgr.scheduler.running)
+        manager = mgr
+        # 初始化期间修改的设置只被 apply_settings 记录下来, 这里补上
+        current = get_script_manager_settings()
+        if current != settings:
+            apply_settings(settings, current)
+        logging.info(f"ScriptManager initialized in {time.perf_counter() - started:.3f}s")
+        return manager
+
+def create_result_cache(settings: ScriptManagerSettings) -> Optional["ResultCache"]:
+    """按设置创建结果缓存(大小上限为 0 时不缓存)"""
+    if settings.resultCacheMB <= 0:
+        return None
+    from .core.resultCache import ResultCache
+    return ResultCache(PathLib(settings.resultCachePath), int(settings.resultCacheMB * 1024 * 1024))
+
+def warm_up() -> None:
+    """在后台线程中预先初始化脚本管理器, 首个请求不必等待脚本包加载"""
+    def run():
         try:
-            manager = ScriptManager(smSettings.scriptPath, smSettings.logPath)
+            init_manager()
         except Exception as e:
-            logging.error(f"Failed to initialize ScriptManager: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-    return manager
+            # 首个请求时会重试并返回错误
+            logging.warning(f"ScriptManager warm up failed: {e}")
 
-router = APIRouter(prefix="/adb", tags=["ADB"], dependencies=[Depends(dependency_manager)])
+    if manager is None and smSettings.warmUp:
+        threading.Thread(target=run, name="ScriptManagerWarmUp", daemon=True).start()
 
-def generate_task_list(mgr:ScriptManager) -> dict:
-    """Generate standardized task list structure"""
-    task = {
-        "lastUpdate": 0,
-        "tasks": [
-            {
-                "taskId": t.taskid,
-                "status": t.get_status().value if hasattr(t.get_status(), 'value') else t.get_status(),
-                "commandId": t.info.id,
-                "createdAt": t.starttime,
-                "cmdline": t.cmdline,
-                "logfile": str(t.logfile),
-            }
-            for _, t in mgr.task.items()
-        ],
-    }
-
-    for _, t in mgr.task.items():
-        if t.starttime and task["lastUpdate"] < t.starttime:
-            task["lastUpdate"] = t.starttime
-        if t.endtime and task["lastUpdate"] < t.endtime:
-            task["lastUpdate"] = t.endtime
+async def dependency_manager():
+    if manager is not None:
+        return manager
+    try:
+        return await run_in_threadpool(init_manager)
+    except Exception as e:
+        logging.error(f"Failed to initialize ScriptManager: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 修改后需要重启才能生效的设置
+RESTART_FIELDS = ("scriptPath", "logPath", "scriptPackages", "lazyLoadPackages",
+                  "captureOutput", "ringBufferSize", "historyPath", "resultCachePath",
+                  "pythonForkServer", "forkServerPreload", "adbDevices", "adbHost", "adbPort")
+
+def apply_settings(old: ScriptManagerSettings, new: ScriptManagerSettings) -> None:
+    """脚本管理器设置变化时调整运行中的组件"""
+    global smSettings, watcher
+    smSettings = new
+    if manager is None:
+        return
+    manager.scheduler.configure(new.maxConcurrency, new.resourceParams, new.resourceSlots)
+    manager.maxTasks = new.maxTasksInMemory
+    if archiver is not None:
+        archiver.retention = new.logRetentionDays * 24 * 3600
+        archiver.quota = int(new.logQuotaMB * 1024 * 1024)
+        archiver.interval = new.archiveInterval
+        archiver.compress = new.archiveLogs
+    if watcher is not None and not new.watchScripts:
+        watcher.stop()
+        watcher = None
+    elif watcher is not None:
+        watcher.interval, watcher.debounce = new.watchInterval, new.watchDebounce
+    elif new.watchScripts:
+        from .core.catalogWatcher import CatalogWatcher
+        watcher = CatalogWatcher(manager, new.watchInterval, new.watchDebounce)
+        watcher.start()
+    if devices is not None:
+        devices.interval = new.adbRetryInterval
+    if new.resultCacheMB <= 0:
+        if manager.resultCache is not None:
+            manager.resultCache.clear()
+        manager.resultCache = None
+    elif manager.resultCache is None:
+        manager.resultCache = create_result_cache(new)
+    else:
+        manager.resultCache.resize(int(new.resultCacheMB * 1024 * 1024))
+    changed = [name for name in RESTART_FIELDS if getattr(old, name) != getattr(new, name)]
+    if changed:
+        logging.warning(f"Settings {', '.join(changed)} take effect after restart")
+
+# 导入时即订阅, 管理器创建前的设置修改也会记录下来
+settingsStore.subscribe(apply_settings, "scriptManager")
 
-    if task["lastUpdate"] < mgr.lastupdate:
-        task["lastUpdate"] = mgr.lastupdate
+router = APIRouter(prefix="/adb", tags=["ADB"], dependencies=[Depends(dependency_manager)])
 
-    logging.debug(f"Generated task list: {task}")
-    return task
+def generate_task_snapshot(mgr: ScriptManager) -> dict:
+    """Generate full task snapshot tagged with the current event sequence"""
+    snapshot = mgr.get_task_snapshot()
+    return {"type": "snapshot", "seq": snapshot.version, **snapshot.data}
 
 def handle_error_response(e: Exception, status_code: int = 400) -> JSONResponse:
     """Standard error response handler"""
@@ -72,43 +199,85 @@ def handle_error_response(e: Exception, status_code: int = 400) -> JSONResponse:
         status_code=status_code,
     )
 
+@functools.cache
+def commands_schema() -> CachedBody:
+    """命令Schema响应体(进程内只生成一次)"""
+    return CachedBody.from_json(ScriptPackage.model_json_schema())
+
 @router.get("/commands",summary="获取命令列表")
-def get_commands(mgr: ScriptManager = Depends(dependency_manager)):
+def get_commands(request: Request, mgr: ScriptManager = Depends(dependency_manager)):
     """
     获取所有可用的命令列表
 
+    响应体每个目录版本只序列化一次, 带 ETag, 客户端缓存有效时返回 304;
+    客户端支持时返回 gzip 压缩版本。
+
     Returns:
         dict: 包含所有命令的分组结构
     """
     try:
-        return mgr.scriptPackage.scripts.model_dump(mode="json", exclude_none=True)
+        return cached_body_response(request, mgr.catalog.commands)
     except Exception as e:
         return handle_error_response(e)
 
 @router.get("/commands/schema", summary="获取命令Schema")
-def get_commands_schema():
+def get_commands_schema(request: Request):
     """
-    获取所有命令的Schema定义
+    获取所有命令的Schema定义(进程内只生成一次, 带 ETag)
 
     Returns:
         dict: 包含所有命令的Schema信息
     """
     try:
-        return ScriptPackage.model_json_schema()
+        return cached_body_response(request, commands_schema())
+    except Exception as e:
+        return handle_error_response(e)
+
+@router.get("/commands/packages", summary="获取脚本包列表")
+def get_packages(mgr: ScriptManager = Depends(dependency_manager)):
+    """
+    获取所有已配置的脚本包
+
+    Returns:
+        list: 脚本包信息(命名空间分组ID、名称、路径、是否已加载、加载错误)
+    """
+    try:
+        return mgr.get_packages()
+    except Exception as e:
+        return handle_error_response(e)
+
+@router.get("/commands/packages/{gid}", summary="获取脚本包命令树")
+def get_package_commands(
+    request: Request,
+    gid: Annotated[int, Path(title="脚本包分组ID")],
+    mgr: ScriptManager = Depends(dependency_manager),
+):
+    """
+    获取单个脚本包的命令树, 延迟加载的脚本包在此时加载
+
+    Returns:
+        list: 该脚本包顶层的分组与命令
+    """
+    try:
+        entry = mgr.load_package(gid)
+        assert entry.catalog is not None
+        return cached_body_response(request, entry.catalog.commands)
+    except ValueError as e:
+        return handle_error_response(e, status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return handle_error_response(e)
 
 @router.post("/commands/reload", summary="重新加载命令")
 def reload_commands(mgr: ScriptManager = Depends(dependency_manager)):
     """
-    重新加载命令列表
+    重新加载命令列表(只重新校验有变化的条目, 保留所有任务)
 
     Returns:
-        dict: 包含重新加载状态的响应
+        dict: 包含重新加载状态的响应, data 为目录版本及新增/移除的命令与分组ID
     """
     try:
-        mgr.reload()
-        return {"status": "ok", "code": 0, "message": "Commands reloaded successfully"}
+        diff = mgr.reload()
+        return {"status": "ok", "code": 0, "message": "Commands reloaded successfully", "data": diff}
     except Exception as e:
         return handle_error_response(e)
 
@@ -116,26 +285,88 @@ def reload_commands(mgr: ScriptManager = Depends(dependency_manager)):
 def exe_command(
     sid: Annotated[int, Path(title="命令ID", ge=1)],
     params: ExecuteParam,
+    priority: int = Query(default=0, title="优先级(越大越先执行)"),
     mgr: ScriptManager = Depends(dependency_manager)
 ):
     """
-    执行指定的ADB命令
+    执行指定的ADB命令, 超出并发限制时排队(QUEUED)
     
     Args:
         sid: 命令ID (必须大于0)
         params: 执行参数
+        priority: 排队优先级
         
     Returns:
         dict: 包含任务ID的成功响应或错误信息
     """
     logging.info(f"Executing command {sid} with params: {params}")
     try:
-        tid = mgr.execute_script(sid, params)
+        tid = mgr.execute_script(sid, params, priority)
         return {"status": "ok", "code": 0, "data": {"taskId": tid}}
     except Exception as e:
         raise HTTPException(status_code=500, detail= ''.join(traceback.format_exception(e)))
 
 
+@router.get("/commands/{sid}/path", summary="获取命令所在分组路径")
+def get_command_path(sid: Annotated[int, Path(title="命令ID", ge=1)], mgr: ScriptManager = Depends(dependency_manager)):
+    """
+    获取命令所在的分组路径(由外到内)
+
+    Returns:
+        dict: 分组id与名称列表
+    """
+    groups = mgr.get_group_path(sid)
+    if groups is None:
+        return JSONResponse(
+            content={"code": 404, "message": f"Script '{sid}' not found."},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    return {
+        "id": sid,
+        "path": [{"id": g.id, "name": g.name, "label": g.label} for g in groups],
+    }
+
+
+@router.post("/commands/{sid}/batch", summary="批量执行指定命令")
+def batch_execute(
+    sid: Annotated[int, Path(title="命令ID", ge=1)],
+    batch: BatchExecuteParam,
+    mgr: ScriptManager = Depends(dependency_manager)
+):
+    """
+    以多组参数(或一个模板加多个设备序列号)批量执行同一命令
+
+    参数全部校验通过后才会启动, 任务经调度器依次启动
+
+    Returns:
+        dict: 任务组ID与各任务ID
+    """
+    logging.info(f"Batch executing command {sid}")
+    try:
+        group = mgr.execute_batch(sid, batch.expand(), batch.priority)
+        return {"status": "ok", "code": 0, "data": {"groupId": group.gid, "taskIds": group.taskids}}
+    except ValueError as e:
+        return handle_error_response(e)
+
+
+@router.get("/commands/groups/{gid}", summary="获取任务组状态")
+def get_group(gid: Annotated[int, Path(title="任务组ID")], mgr: ScriptManager = Depends(dependency_manager)):
+    """
+    获取批量执行任务组的汇总状态
+
+    Returns:
+        dict: 各状态任务数量、失败数量及任务ID列表
+    """
+    try:
+        return mgr.get_group_summary(gid)
+    except ValueError as e:
+        logging.error(f"exception: {e}")
+        return JSONResponse(
+            content={"code": 404, "message": str(e)},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+
 @router.get("/commands/{sid}/status", summary="获取指定命令状态")
 def get_status(sid: Annotated[int, Path(title="The ID of the command to get")], mgr: ScriptManager = Depends(dependency_manager)):
     """get command status"""
@@ -150,9 +381,21 @@ def get_log(
     size: int = Query(default=-1, title="The size of the log to get"),
     mgr: ScriptManager = Depends(dependency_manager)
 ):
-    """get command log"""
+    """
+    get command log
+
+    已结束任务的日志直接由文件发送(不读入内存), 运行中任务按 pos/size 读取
+    """
     try:
+        logfile = mgr.get_script_log_file(tid)
+        if logfile is not None:
+            st = logfile.stat()
+            end = st.st_size if size < 0 else min(pos + size, st.st_size)
+            LOG_BYTES_READ.labels("log").inc(max(end - pos, 0))
+            return file_slice_response(logfile, pos, size, stat_result=st)
+
         log = mgr.get_script_log(tid, pos, size)
+        LOG_BYTES_READ.labels("log").inc(len(log))
         # logging.debug(f"response log: {log.decode('gb2312', errors='ignore')}")
         return Response(content=log, media_type="application/octet-stream")
     except ValueError as e:
@@ -160,15 +403,157 @@ def get_log(
         return Response(content=str(e), status_code=400)
 
 
+@router.get("/commands/tasks/{tid}/logfile", summary="下载已结束任务的日志文件")
+def get_log_file(
+    tid: Annotated[int, Path(title="The ID of the task")],
+    mgr: ScriptManager = Depends(dependency_manager)
+):
+    """
+    下载已结束任务的完整日志
+
+    支持 Range / If-Range / ETag / Last-Modified(已归档日志除外), 运行中的任务返回 409,
+    日志(或归档)已被清理时返回 404
+    """
+    try:
+        logfile = mgr.get_script_log_file(tid)
+        if logfile is not None:
+            LOG_BYTES_READ.labels("logfile").inc(logfile.stat().st_size)
+            return FileResponse(logfile, media_type="text/plain", filename=logfile.name)
+        archive = mgr.get_script_log_archive(tid)
+    except (ValueError, FileNotFoundError) as e:
+        logging.error(f"exception: {e}")
+        return JSONResponse(
+            content={"code": 404, "message": str(e)},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    if archive is not None:
+        # 已归档日志按块解压后流式发送
+        name = archive.path.name.removesuffix(ARCHIVE_SUFFIX)
+        LOG_BYTES_READ.labels("logfile").inc(archive.size)
+        return StreamingResponse(
+            archive.iter_blocks(),
+            media_type="text/plain",
+            headers={
+                "Content-Length": str(archive.size),
+                "Content-Disposition": f"attachment; filename*=utf-8''{quote(name)}",
+            },
+        )
+    if mgr.get_script_status(tid) == ScriptStatus.FINISH:
+        return JSONResponse(
+            content={"code": 404, "message": f"Log of task '{tid}' has been removed."},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    return JSONResponse(
+        content={"code": 409, "message": f"Task '{tid}' has no finished log."},
+        status_code=status.HTTP_409_CONFLICT,
+    )
+
+
+@router.get("/logs/search", summary="搜索任务日志")
+def search_logs(
+    q: str = Query(min_length=1, title="搜索内容"),
+    regex: bool = Query(default=False, title="按正则表达式搜索"),
+    ignoreCase: bool = Query(default=False, title="忽略大小写"),
+    limit: int = Query(default=1000, ge=1, le=100000, title="最多返回的匹配数"),
+    mgr: ScriptManager = Depends(dependency_manager)
+):
+    """
+    在所有任务日志(包括已归档日志)中搜索
+
+    Returns:
+        NDJSON流, 每行一个匹配: {"taskId", "line", "offset", "text"}
+    """
+    try:
+        pattern = compile_pattern(q, regex, ignoreCase)
+    except re.error as e:
+        return handle_error_response(e)
+
+    def generate():
+        for match in mgr.search_logs(pattern, limit):
+            yield json.dumps(match, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.websocket("/commands/tasks/{tid}/log/follow")
+async def follow_log(
+    websocket: WebSocket,
+    tid: int,
+    pos: int = Query(default=0, ge=0, title="The position of the log to start from"),
+    mgr: ScriptManager = Depends(dependency_manager)
+):
+    """
+    WebSocket实时跟随任务日志
+
+    Behavior:
+        - 从 pos 处开始, 日志有新内容时立即以二进制消息推送
+        - 任务结束且日志读完后正常关闭连接, 断线后可从已收到的字节数续传
+    """
+    await websocket.accept()
+    clients = WEBSOCKET_CLIENTS.labels("log")
+    sendTime = WEBSOCKET_SEND_SECONDS.labels("log")
+    bytesRead = LOG_BYTES_READ.labels("follow")
+
+    async def send():
+        async for data in mgr.follow_script_log(tid, pos):
+            with sendTime.time():
+                await websocket.send_bytes(data)
+            bytesRead.inc(len(data))
+
+    clients.inc()
+    sender = asyncio.create_task(send())
+    # 客户端不会发送消息, 接收只用于及时发现断开
+    receiver = asyncio.create_task(websocket.receive_text())
+    try:
+        done, pending = await asyncio.wait(
+            {sender, receiver}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        clients.dec()
+    for task in pending:
+        task.cancel()
+
+    if sender not in done:
+        logging.info(f"log follower of task {tid} disconnected")
+        return
+    try:
+        sender.result()
+        await websocket.close()
+    except (ValueError, FileNotFoundError) as e:
+        logging.error(f"exception: {e}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+    except WebSocketDisconnect:
+        logging.info(f"log follower of task {tid} disconnected")
+
+
 @router.get("/commands/tasks", summary="获取任务列表")
-def get_tasks(mgr: ScriptManager = Depends(dependency_manager)):
+def get_tasks(
+    request: Request,
+    status_: Optional[List[int]] = Query(default=None, alias="status", title="按状态过滤(可多个)"),
+    commandId: Optional[int] = Query(default=None, title="按脚本ID过滤"),
+    since: Optional[float] = Query(default=None, title="创建时间下限(时间戳)"),
+    until: Optional[float] = Query(default=None, title="创建时间上限(时间戳)"),
+    offset: Optional[int] = Query(default=None, ge=0, title="分页偏移"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000, title="分页大小"),
+    mgr: ScriptManager = Depends(dependency_manager)
+):
     """
     获取当前所有任务的状态列表
+
+    - 不带查询参数时返回内存中的任务(运行中与最近结束), 支持 If-None-Match, 未变化时返回 304
+    - 带任一过滤/分页参数时从任务历史中分页查询, 返回 total/offset/limit/tasks
     
     Returns:
         dict: 包含所有任务信息和最后更新时间
     """
-    return generate_task_list(mgr)
+    if any(v is not None for v in (status_, commandId, since, until, offset, limit)):
+        try:
+            return mgr.query_tasks(status_, commandId, since, until, offset or 0, limit or 100)
+        except ValueError as e:
+            return handle_error_response(e)
+
+    snapshot = mgr.get_task_snapshot()
+    return cached_response(request, snapshot.body, snapshot.etag)
 
 
 @router.delete("/commands/tasks/{tid}/delete", summary="删除任务")
@@ -211,38 +596,93 @@ async def websocket_tasks(websocket: WebSocket, mgr: ScriptManager = Depends(dep
         websocket: WebSocket连接对象
         
     Behavior:
-        - 每秒推送一次任务列表更新
+        - 连接建立后推送一次全量快照(type=snapshot)
+        - 任务创建/结束/删除时立即推送增量(type=add/update/remove, 带序号seq)
+        - 脚本目录重新加载时推送 type=catalog(带目录版本、新增/移除的ID及变化节点的增量)
+        - ADB设备列表变化时推送 type=devices(带设备列表及新增/移除/变化的序列号)
+        - 积压过多时重新推送全量快照
+        - 客户端发送 "resync" 可随时请求全量快照
         - 自动处理连接断开和错误
     """
     await websocket.accept()
     logging.info("WebSocket connection established")
-    
+    clients = WEBSOCKET_CLIENTS.labels("tasks")
+    sendTime = WEBSOCKET_SEND_SECONDS.labels("tasks")
 
-    while True:
-        try:
-            # Send ping to check connection
-            await websocket.send_text("ping")
-            pong = await asyncio.wait_for(websocket.receive_text(), timeout=1)
-            if pong != "pong":
-                raise ConnectionError("Invalid pong response")
-                break     
-                
-            # Send task updates
-            await websocket.send_json(generate_task_list(mgr))
-            await asyncio.sleep(1)
-        except WebSocketDisconnect:
-            logging.info("WebSocket disconnected")
-            break
-        except Exception as e:
-            logging.info(f"WebSocket error: {''.join(traceback.format_exception(e))}")
-            if websocket.application_state == WebSocketState.CONNECTED:
-                await websocket.close()
-            break
+    sub = mgr.events.subscribe()
+    clients.inc()
+
+    async def receive():
+        while True:
+            message = await websocket.receive_text()
+            if message == "resync":
+                sub.push({"type": "resync"})
+
+    receiver = asyncio.create_task(receive())
+    try:
+        snapshot = generate_task_snapshot(mgr)
+        seq = snapshot["seq"]
+        with sendTime.time():
+            await websocket.send_json(snapshot)
+
+        while True:
+            getter = asyncio.create_task(sub.get())
+            done, _ = await asyncio.wait(
+                {getter, receiver}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver in done:
+                getter.cancel()
+                receiver.result()
+                break
+
+            event = getter.result()
+            if sub.overflow or event["type"] == "resync":
+                sub.drain()
+                snapshot = generate_task_snapshot(mgr)
+                seq = snapshot["seq"]
+                with sendTime.time():
+                    await websocket.send_json(snapshot)
+            elif event["seq"] > seq:
+                seq = event["seq"]
+                with sendTime.time():
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        logging.info("WebSocket disconnected")
+    except Exception as e:
+        logging.info(f"WebSocket error: {''.join(traceback.format_exception(e))}")
+        if websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close()
+    finally:
+        clients.dec()
+        receiver.cancel()
+        sub.close()
 
     if websocket.application_state != WebSocketState.CONNECTED:
         logging.info("WebSocket connection closed")
 
 
+@router.get("/devices", summary="获取ADB设备列表")
+def get_devices(
+    refresh: bool = Query(default=False, title="立即向 adb server 重新查询"),
+):
+    """
+    获取缓存的ADB设备列表(后台跟踪 adb server 推送的变化)
+
+    设备变化时经 /adb/ws 推送 type=devices 事件。
+
+    Returns:
+        dict: version、devices(serial/state/model...)、error(adb server 不可用时)、updatedAt
+    """
+    if devices is None:
+        return handle_error_response(ValueError("ADB device tracking is disabled"), 404)
+    if refresh:
+        try:
+            devices.refresh()
+        except Exception as e:
+            return handle_error_response(e, 503)
+    return devices.snapshot()
+
+
 @router.get('/info', summary='获取脚本管理器信息', response_model=ManagerInfo)
 async def get_info(mgr: ScriptManager = Depends(dependency_manager)):
 
@@ -1,5 +1,17 @@
 """ADB工具模块"""
 
 from .validator import validate_path, validate_parameters
+from .httpCache import CachedBody, accepts_gzip, cached_body_response, cached_response, etag_matches
+from .fileResponse import FileSliceResponse, file_slice_response
 
-__all__ = ["validate_path", "validate_parameters"]
+__all__ = [
+    "validate_path",
+    "validate_parameters",
+    "CachedBody",
+    "accepts_gzip",
+    "cached_body_response",
+    "cached_response",
+    "etag_matches",
+    "FileSliceResponse",
+    "file_slice_response",
+]
@@ -0,0 +1,47 @@
+"""文件响应工具模块"""
+
+import os
+import typing as t
+from pathlib import Path
+
+from fastapi import Response
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+
+class FileSliceResponse(FileResponse):
+    """以 Range 请求的方式返回文件中的一段
+
+    复用 FileResponse 的 Range/ETag/Last-Modified 处理及分块(或 pathsend 零拷贝)发送,
+    用于兼容 pos/size 形式的接口。
+    """
+
+    def __init__(self, path: Path, start: int, end: int, **kwargs):
+        super().__init__(path, **kwargs)
+        self.range = f"bytes={start}-{end}".encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = [(k, v) for k, v in scope["headers"] if k not in (b"range", b"if-range")]
+        headers.append((b"range", self.range))
+        await super().__call__({**scope, "headers": headers}, receive, send)
+
+
+def file_slice_response(
+    path: Path,
+    pos: int = 0,
+    size: int = -1,
+    media_type: str = "application/octet-stream",
+    stat_result: t.Optional[os.stat_result] = None,
+) -> Response:
+    """返回文件 [pos, pos + size) 的内容, size < 0 表示到文件末尾"""
+    stat_result = stat_result or os.stat(path)
+    file_size = stat_result.st_size
+    if pos >= file_size or size == 0:
+        return Response(content=b"", media_type=media_type)
+
+    end = file_size if size < 0 else min(pos + size, file_size)
+    if pos == 0 and end == file_size:
+        return FileResponse(path, media_type=media_type, stat_result=stat_result)
+    return FileSliceResponse(
+        path, pos, end - 1, media_type=media_type, stat_result=stat_result
+    )
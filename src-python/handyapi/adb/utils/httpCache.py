@@ -0,0 +1,86 @@
+"""HTTP缓存工具模块"""
+
+import gzip
+import hashlib
+import json
+import typing as t
+
+from fastapi import Request, Response
+
+GZIP_MIN_SIZE = 1024
+
+
+class CachedBody:
+    """预先序列化的响应体
+
+    ETag 由内容哈希生成(强校验), 超过 GZIP_MIN_SIZE 的响应体同时保存 gzip 压缩版本,
+    压缩版本使用单独的 ETag。
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.etag: str = f'"{digest}"'
+        self.gzipped: t.Optional[bytes] = None
+        self.gzipEtag: t.Optional[str] = None
+        if len(body) >= GZIP_MIN_SIZE:
+            self.gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+            self.gzipEtag = f'"{digest}-gz"'
+
+    @classmethod
+    def from_json(cls, data: t.Any) -> "CachedBody":
+        """序列化为紧凑 JSON"""
+        return cls(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def accepts_gzip(request: Request) -> bool:
+    """客户端是否接受 gzip 编码"""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """请求的 If-None-Match 是否与 etag 匹配"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    media_type: str = "application/json",
+) -> Response:
+    """返回带 ETag 的响应, 客户端缓存仍有效时返回 304"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def cached_body_response(request: Request, cached: CachedBody) -> Response:
+    """返回预先序列化的响应体, 客户端接受时使用 gzip 版本, 缓存仍有效时返回 304"""
+    if cached.gzipped is not None and cached.gzipEtag is not None and accepts_gzip(request):
+        headers = {
+            "ETag": cached.gzipEtag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request, cached.gzipEtag):
+            return Response(status_code=304, headers=headers)
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cached.gzipped, media_type=cached.media_type, headers=headers)
+
+    response = cached_response(request, cached.body, cached.etag, cached.media_type)
+    if cached.gzipped is not None:
+        response.headers["Vary"] = "Accept-Encoding"
+    return response
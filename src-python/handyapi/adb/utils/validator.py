@@ -12,11 +12,4 @@ def validate_path(value: str, source: Path) -> str:
 
 def validate_parameters(parameters: dict, script_info) -> None:
     """验证执行参数"""
-    for param in script_info.parameters:
-        if param.name not in parameters.keys():
-            raise ValueError(f"Missing required parameter: {param.name}")
-
-        if not param.check_value(parameters[param.name]):
-            raise ValueError(
-                f"Invalid value for parameter '{param.name}': {parameters[param.name]}"
-            )
+    script_info.plan.validate(parameters)
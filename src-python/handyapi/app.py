@@ -1,17 +1,26 @@
 from pathlib import Path
+from contextlib import asynccontextmanager
 import logging
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 
 from .utiles.env import is_nuitka
-from .adb import router as adb_router
+from .adb import router as adb_router, warm_up
+from .adb.core.metrics import REGISTRY, CONTENT_TYPE
 from .sysapi.router import router as sys_router
-from .settings import router as settings_router
+from .sysapi.requestTiming import RequestTimingMiddleware
+from .settings import router as settings_router, settingsStore
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动后在后台加载脚本包, 不阻塞服务启动
+    warm_up()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(adb_router)
 app.include_router(sys_router)
@@ -37,11 +46,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 最外层: 计入其他中间件的耗时
+app.add_middleware(
+    RequestTimingMiddleware, threshold=lambda: settingsStore.get().slowRequestMs / 1000
+)
+
 
 @app.get("/")
 def root():
     return RedirectResponse(url="/static/index.html")
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus 指标"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/docs/")
 def root():
     return RedirectResponse(url="/static/docs/index.html")
\ No newline at end of file
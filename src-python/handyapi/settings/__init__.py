@@ -1,9 +1,12 @@
-from .globalSetings import get_global_settings, get_script_manager_settings, save_global_settings
+from .globalSetings import get_global_settings, get_script_manager_settings, save_global_settings, settingsStore
+from .settingsStore import SettingsStore
 from .router import router
 
 __all__ = [
     "get_global_settings",
     "get_script_manager_settings",
     "save_global_settings",
+    "settingsStore",
+    "SettingsStore",
     "router"
 ]
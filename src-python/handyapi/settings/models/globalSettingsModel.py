@@ -10,6 +10,7 @@ class GlobalSettings(BaseModel):
 
     theme: Literal["dark", "light"] = Field(default="dark", description="主题")
     collapsed: bool = Field(default=False, description="侧边栏折叠状态")
+    slowRequestMs: float = Field(default=1000, gt=0, description="超过该耗时(毫秒)的请求记录日志")
     lastUpdate: float = Field(default_factory=lambda: datetime.now().timestamp())
 
     scriptManager: ScriptManagerSettings = Field(default_factory=ScriptManagerSettings)
@@ -3,9 +3,14 @@ import os
 from pydantic import BaseModel, Field
 
 
-# 日志配置
+# 日志配置(目录由脚本管理器初始化时创建)
 LOG_DIR = Path.home() / ".handy/scripts/logs/"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+# 任务历史
+HISTORY_DB = Path.home() / ".handy/scripts/history.db"
+
+# 脚本结果缓存(不能放在日志目录中, 归档按日志目录清理)
+RESULT_CACHE_DIR = Path.home() / ".handy/scripts/cache/"
 
 # 脚本配置
 USER_SCRIPTS_JSON = Path.home() / ".handy/scripts/scripts_package.json"
@@ -21,4 +26,33 @@ class ScriptManagerSettings(BaseModel):
 
     scriptPath: str = Field(default=str(SCRIPTS_JSON), description="脚本存储路径")
     logPath: str = Field(default=str(LOG_DIR), description="日志存储路径")
-    scriptPackages: list[Path] = Field(default=[Path(SCRIPTS_JSON)], description="脚本包列表")
+    scriptPackages: list[Path] = Field(default=[Path(SCRIPTS_JSON)], description="脚本包列表(与 scriptPath 一起加载)")
+    lazyLoadPackages: bool = Field(default=True, description="多个脚本包时, 除主脚本包外在首次展开或执行时才加载")
+    captureOutput: bool = Field(default=False, description="经管道捕获脚本输出, 最近输出从内存读取")
+    ringBufferSize: int = Field(default=1024 * 1024, ge=0, description="每个任务的输出环形缓冲区大小(字节)")
+    archiveLogs: bool = Field(default=False, description="压缩已结束任务的日志(日志文件替换为 .hlz 归档)")
+    logRetentionDays: float = Field(default=30, gt=0, description="日志保留天数")
+    logQuotaMB: float = Field(default=2048, gt=0, description="日志目录总大小上限(MB)")
+    maxConcurrency: int = Field(default=0, ge=0, description="同时运行的最大任务数(0 表示不限制)")
+    resourceParams: list[str] = Field(
+        default=["serial", "-s", "--serial"], description="视为独占资源的参数名(如设备序列号)"
+    )
+    resourceSlots: int = Field(default=1, ge=1, description="每个资源同时运行的最大任务数")
+    historyPath: str = Field(default=str(HISTORY_DB), description="任务历史数据库路径")
+    maxTasksInMemory: int = Field(default=200, ge=0, description="内存中保留的已结束任务数(0 表示不限制)")
+    archiveInterval: float = Field(default=300, gt=0, description="日志归档与清理间隔(秒)")
+    resultCacheMB: float = Field(default=64, ge=0, description="可缓存脚本的结果缓存大小上限(MB, 0 表示不缓存)")
+    resultCachePath: str = Field(default=str(RESULT_CACHE_DIR), description="结果缓存目录(缓存文件放在其中的 handy-result-cache 子目录)")
+    watchScripts: bool = Field(default=False, description="脚本包文件变化时自动重新加载")
+    watchInterval: float = Field(default=1.0, gt=0, description="脚本包文件检查间隔(秒)")
+    watchDebounce: float = Field(default=0.5, ge=0, description="脚本包文件停止变化多久后重新加载(秒)")
+    warmUp: bool = Field(default=True, description="启动后在后台预先初始化脚本管理器")
+    adbDevices: bool = Field(default=True, description="后台跟踪 ADB 设备并把设备列表传给脚本")
+    adbHost: str = Field(default="127.0.0.1", description="adb server 地址")
+    adbPort: int = Field(default=5037, ge=1, le=65535, description="adb server 端口")
+    adbRetryInterval: float = Field(default=5.0, gt=0, description="adb server 不可用时的重试间隔(秒)")
+    pythonForkServer: bool = Field(default=False, description="python 脚本由预先启动的解释器 fork 执行(仅 POSIX)")
+    forkServerPreload: list[str] = Field(
+        default=["argparse", "json", "logging", "pathlib", "re", "subprocess", "time"],
+        description="fork 服务器预先导入的模块",
+    )
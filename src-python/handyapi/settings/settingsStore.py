@@ -0,0 +1,146 @@
+"""设置存储模块
+
+更新立即在内存中生效并通知订阅者; 写入配置文件由后台线程延迟完成,
+短时间内的多次更新只写入最后一次, 写入时先写临时文件再替换, 不会留下不完整的文件。
+"""
+
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import typing as t
+from pathlib import Path
+
+from .models.globalSettingsModel import GlobalSettings
+
+Subscriber = t.Callable[[t.Any, t.Any], None]
+
+
+def atomic_write(path: Path, data: str) -> None:
+    """原子写入文本文件(临时文件 + 替换)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class SettingsStore:
+    """全局设置存储
+
+    订阅者可只订阅某一部分设置(如 "scriptManager"), 该部分变化时以 (旧值, 新值)
+    调用; 不指定部分时每次更新都以 (旧设置, 新设置) 调用。
+    """
+
+    def __init__(self, path: Path, delay: float = 0.5):
+        self.path = path
+        self.delay = delay
+        self._settings: t.Optional[GlobalSettings] = None
+        self._subscribers: t.List[t.Tuple[t.Optional[str], Subscriber]] = []
+        self._lock = threading.RLock()
+        self._writeLock = threading.Lock()
+        self._notifyLock = threading.Lock()
+        self._pending = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+
+    def get(self) -> GlobalSettings:
+        """获取当前设置, 首次调用时从配置文件加载(不存在时写入默认配置)"""
+        with self._lock:
+            if self._settings is None:
+                if self.path.exists():
+                    self._settings = GlobalSettings.model_validate_json(
+                        self.path.read_text(encoding="utf-8")
+                    )
+                else:
+                    self._settings = GlobalSettings()
+                    atomic_write(self.path, self._settings.model_dump_json(indent=4))
+            return self._settings
+
+    def update(self, settings: GlobalSettings) -> None:
+        """更新设置: 立即生效并通知订阅者, 稍后在后台写入配置文件
+
+        并发更新时按顺序通知, 订阅者总是看到连续的 (旧值, 新值)。
+        """
+        with self._notifyLock:
+            with self._lock:
+                old = self.get()
+                self._settings = settings
+                self._pending = True
+                self._wake.set()
+                self._start()
+                subscribers = list(self._subscribers)
+            for section, callback in subscribers:
+                before = getattr(old, section) if section else old
+                after = getattr(settings, section) if section else settings
+                if section and before == after:
+                    continue
+                try:
+                    callback(before, after)
+                except Exception as e:
+                    logging.error(f"Settings subscriber failed: {e}", exc_info=True)
+
+    def subscribe(self, callback: Subscriber, section: t.Optional[str] = None) -> None:
+        """订阅设置变化"""
+        with self._lock:
+            self._subscribers.append((section, callback))
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        """取消订阅"""
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] != callback]
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SettingsStore", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            # 等待一段时间, 合并连续的更新; 停止时由 close 写入
+            if self._stop.wait(self.delay):
+                break
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Failed to save settings: {e}", exc_info=True)
+                self._stop.wait(self.delay)
+
+    def flush(self) -> None:
+        """立即写入尚未保存的设置"""
+        with self._writeLock:
+            with self._lock:
+                if not self._pending or self._settings is None:
+                    return
+                data = self._settings.model_dump_json(indent=4)
+                self._pending = False
+            try:
+                atomic_write(self.path, data)
+            except Exception:
+                # 写入失败, 下次重试
+                with self._lock:
+                    self._pending = True
+                    self._wake.set()
+                raise
+
+    def close(self) -> None:
+        """停止后台线程并写入尚未保存的设置"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,137 @@
+"""请求耗时统计中间件
+
+纯 ASGI 中间件(不缓冲响应体, 不影响流式响应与 WebSocket):
+按路由模板汇总请求次数与耗时, 超过阈值的慢请求记录日志,
+日志中区分处理耗时(到响应头发出)与发送响应体的耗时, 并附带请求到达时的线程池占用情况
+(同步接口在线程池中执行, 线程池占满时请求在排队上花费的时间也计入处理耗时)。
+"""
+
+import logging
+import threading
+import time
+import typing as t
+
+import anyio.to_thread
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# 未匹配任何路由的请求的汇总项
+UNMATCHED = "<unmatched>"
+
+
+def thread_pool_stats() -> dict:
+    """同步接口所用线程池的占用情况(需在事件循环中调用)"""
+    stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    return {
+        "total": stats.total_tokens,
+        "busy": stats.borrowed_tokens,
+        "waiting": stats.tasks_waiting,
+    }
+
+
+class RouteStats:
+    """单个路由的耗时汇总"""
+
+    __slots__ = ("count", "total", "max", "slow", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.errors = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "slow": self.slow,
+            "errors": self.errors,
+        }
+
+
+class RequestTimingMiddleware:
+    """请求耗时统计
+
+    threshold 返回慢请求阈值(秒), 每个请求调用一次, 便于设置修改后立即生效。
+    """
+
+    def __init__(self, app: ASGIApp, threshold: t.Callable[[], float] = lambda: 1.0):
+        self.app = app
+        self.threshold = threshold
+        self.routes: t.Dict[t.Tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+        REQUEST_TIMERS.append(self)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        pool = thread_pool_stats()
+        headers_sent: t.Optional[float] = None
+        status = 500
+
+        async def timed_send(message: Message) -> None:
+            nonlocal headers_sent, status
+            if message["type"] == "http.response.start":
+                headers_sent = time.perf_counter()
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._record(scope, status, started, headers_sent, elapsed, pool)
+
+    def _record(
+        self,
+        scope: Scope,
+        status: int,
+        started: float,
+        headers_sent: t.Optional[float],
+        elapsed: float,
+        pool: dict,
+    ) -> None:
+        # 路由匹配后 starlette 会把路由对象写入 scope; 未匹配的请求(404、静态文件等)
+        # 路径任意, 全部汇总到同一项, 避免统计表随请求路径无限增长
+        route = scope.get("route")
+        path = getattr(route, "path", None) or UNMATCHED
+        key = (scope.get("method", ""), path)
+        slow = elapsed >= self.threshold()
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.slow += slow
+            stats.errors += status >= 500
+        if slow:
+            handler = (headers_sent if headers_sent is not None else started + elapsed) - started
+            logging.warning(
+                f"Slow request {key[0]} {path} ({scope.get('path', '')}): {elapsed:.3f}s, "
+                f"handler {handler:.3f}s, body {elapsed - handler:.3f}s, status {status}, "
+                f"thread pool on arrival {pool['busy']}/{pool['total']} busy, {pool['waiting']} waiting"
+            )
+
+    def snapshot(self) -> t.List[dict]:
+        """各路由的耗时汇总(按总耗时降序)"""
+        with self._lock:
+            items = [(key, stats.to_dict()) for key, stats in self.routes.items()]
+        items.sort(key=lambda item: item[1]["total"], reverse=True)
+        return [{"method": method, "route": path, **stats} for (method, path), stats in items]
+
+    def reset(self) -> None:
+        """清空汇总"""
+        with self._lock:
+            self.routes.clear()
+
+
+# 已创建的中间件实例(由 /sys/requests 读取; starlette 在首次请求时才创建中间件)
+REQUEST_TIMERS: t.List[RequestTimingMiddleware] = []
@@ -1,8 +1,17 @@
 
 import subprocess
 
-from typing import Annotated
-from fastapi import APIRouter, Body
+from typing import Annotated, Literal
+import anyio
+from fastapi import APIRouter, Body, Query, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from .profiler import SamplingProfiler, collapse, to_tree
+from .requestTiming import REQUEST_TIMERS, thread_pool_stats
+
+profiler = SamplingProfiler()
+# 采样在独立线程中进行, 不占用同步接口的线程池
+_profileLimiter = anyio.CapacityLimiter(1)
 
 router = APIRouter(prefix="/sys", tags=["SYS"])
 
@@ -12,3 +21,50 @@ async def sys_start(path:Annotated[str,  Body()]):
     subprocess.run(['start', path], shell=True)
     return {"status": "ok", "code": 0}
 
+
+
+@router.get('/profile', summary='采样分析服务进程')
+async def sys_profile(
+    seconds: float = Query(default=5, gt=0, le=60, title="采样时长(秒)"),
+    interval: float = Query(default=0.005, ge=0.001, le=1, title="采样间隔(秒)"),
+    fmt: Literal["collapsed", "json"] = Query(default="collapsed", alias="format", title="输出格式"),
+    idle: bool = Query(default=False, title="包括空闲等待的线程"),
+):
+    """
+    在 seconds 秒内按 interval 采集所有线程的调用栈
+
+    Returns:
+        collapsed: 每行 "线程;帧;...;帧 次数" 的文本(flamegraph.pl / speedscope 可直接读取)
+        json: d3-flame-graph 使用的 {"name", "value", "children"} 树
+    """
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        stacks, samples = await anyio.to_thread.run_sync(
+            profiler.sample, seconds, interval, idle, limiter=_profileLimiter
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if fmt == "json":
+        return to_tree(stacks, f"{samples} samples")
+    return PlainTextResponse(collapse(stacks))
+
+@router.get('/requests', summary='获取请求耗时统计')
+def sys_requests():
+    """
+    各路由的请求次数、总耗时、平均/最大耗时、慢请求与 5xx 数量(按总耗时降序)
+    """
+    return REQUEST_TIMERS[-1].snapshot() if REQUEST_TIMERS else []
+
+@router.delete('/requests', summary='清空请求耗时统计')
+def sys_requests_reset():
+    for timer in REQUEST_TIMERS:
+        timer.reset()
+    return {"status": "ok", "code": 0}
+
+@router.get('/threadpool', summary='获取线程池占用情况')
+async def sys_threadpool():
+    """
+    同步接口所用线程池的大小、占用数与排队数(busy 长期等于 total 说明线程池已饱和)
+    """
+    return thread_pool_stats()
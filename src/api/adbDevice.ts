@@ -1,3 +1,5 @@
+import { server } from '@/utils/server'
+
 export interface devInfoItem {
   label: string
   value: string
@@ -23,53 +25,46 @@ export interface quickBtn {
   icon?: string
 }
 
-export function get_devs(): dev[] {
-  return [
-    {
-      basicInfo: {
-        label: '基本信息',
-        serial: { label: '序列号', value: '1234567890' },
-        model: { label: '型号', value: 'Pixel 6 Pro' },
-        project: { label: '项目', value: 'Android 12' },
-        more: [
-          { label: 'Android版本', value: '12.0.0' },
-          { label: '内核版本', value: '4.14.232' },
-          { label: '安全补丁级别', value: '2023-10-01' },
-        ],
-      },
-      otherInfo: [
-        {
-          label: '其他信息',
-          more: [
-            { label: 'IMEI', value: '123456789012345' },
-            { label: 'Wi-Fi MAC地址', value: '00:11:22:33:44:55' },
-            { label: '蓝牙MAC地址', value: '66:77:88:99:A0:B1' },
-          ],
-        },
-      ],
-    },
-    {
-      basicInfo: {
-        label: '基本信息',
-        serial: { label: '序列号', value: '0987654321' },
-        model: { label: '型号', value: 'Pixel 5' },
-        project: { label: '项目', value: 'Android 11' },
-        more: [
-          { label: 'Android版本', value: '11.0.0' },
-          { label: '内核版本', value: '4.14.232' },
-          { label: '安全补丁级别', value: '2023-10-01' },
-        ],
-      },
-      otherInfo: [
-        {
-          label: '其他信息',
-          more: [
-            { label: 'IMEI', value: '543216789012345' },
-            { label: 'Wi-Fi MAC地址', value: '55:44:33:22:11:00' },
-            { label: '蓝牙MAC地址', value: 'B1:A0:99:88:77:66' },
-          ],
-        },
-      ],
+export interface AdbDevice {
+  serial: string
+  state: string
+  model?: string | null
+  product?: string | null
+  device?: string | null
+  usb?: string | null
+  transportId?: number | null
+}
+
+export interface DeviceList {
+  version: number
+  devices: AdbDevice[]
+  error: string | null
+  updatedAt: number | null
+}
+
+/**
+ * 获取后端缓存的 ADB 设备列表
+ * @param refresh - 是否让后端立即向 adb server 重新查询
+ */
+export async function getDevices(refresh = false): Promise<DeviceList> {
+  const res = await server.get('/adb/devices', { params: { refresh } })
+  return res.data
+}
+
+/** 转换为设备信息卡片的数据 */
+export function toDev(device: AdbDevice): dev {
+  const more: devInfoItem[] = [{ label: '状态', value: device.state }]
+  if (device.device) more.push({ label: '设备', value: device.device })
+  if (device.usb) more.push({ label: 'USB', value: device.usb })
+  if (device.transportId != null) more.push({ label: 'Transport ID', value: String(device.transportId) })
+  return {
+    basicInfo: {
+      label: '基本信息',
+      serial: { label: '序列号', value: device.serial },
+      model: { label: '型号', value: device.model ?? '' },
+      project: { label: '项目', value: device.product ?? device.serial },
+      more,
     },
-  ]
+    otherInfo: [],
+  }
 }
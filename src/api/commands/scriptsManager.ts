@@ -2,6 +2,7 @@ import lodash from 'lodash'
 
 import { server } from '../../utils/server.ts'
 import { AxiosError, type AxiosResponse } from 'axios'
+import { type AdbDevice } from '../adbDevice'
 
 // 统一错误处理
 const handleError = (error: import('axios').AxiosError) => {
@@ -55,14 +56,29 @@ export interface Parameter {
 export interface Command extends CommandBase {
   type: 'winpowershell' | 'powershell'
   parameters: Parameter[]
+  cacheable?: boolean
+  cacheTtl?: number
 }
 
 /**
- * 命令组接口
+ * 命令组接口(延迟加载的脚本包分组 lazy 为 true, 没有 children)
  */
 export interface CommandGroup extends CommandBase {
   type: 'scriptgroup'
-  children: (CommandGroup | Command)[]
+  lazy?: boolean
+  children?: (CommandGroup | Command)[]
+}
+
+/**
+ * 命令树增量更新中的一个节点(新增或内容/位置有变化)
+ * parent 为父分组ID(顶层为 null), after 为前一个兄弟节点ID(第一个为 null),
+ * order 为节点在新命令树中的先序序号, item 不含 children
+ */
+export interface CommandPatch {
+  parent: number | null
+  after: number | null
+  order: number
+  item: CommandGroup | Command
 }
 
 interface ErrorDetail {
@@ -83,6 +99,15 @@ export async function getCommands(): Promise<CommandGroup[]> {
   }
 }
 
+/**
+ * 获取脚本包的命令树, 延迟加载的脚本包在此时加载
+ * @param packageId - 脚本包分组ID
+ */
+export async function getPackageCommands(packageId: number): Promise<(CommandGroup | Command)[]> {
+  const res = await server.get('/adb/commands/packages/' + packageId)
+  return res.data
+}
+
 /**
  * Executes a command on the specified device.
  * @param commandId - The ID of the command to execute
@@ -99,6 +124,7 @@ export enum statusCode {
   RUNNING,
   FINISH,
   TERMINATED,
+  QUEUED,
 }
 
 export interface CommandStatus {
@@ -130,20 +156,66 @@ export async function getTaskLog(
   return res.data
 }
 
+/** 下载已结束任务完整日志的地址(已归档的日志由服务端解压后返回) */
+export function taskLogFileUrl(taskId: number): string {
+  return `${server.defaults.baseURL}adb/commands/tasks/${taskId}/logfile`
+}
+
+/**
+ * Follows a task log from `pos`; new bytes arrive as binary messages and the
+ * socket is closed normally (code 1000) once the task has finished.
+ */
+export function followTaskLog(taskId: number, pos: number = 0): WebSocket {
+  const socket = new WebSocket(`ws://127.0.0.1:8001/adb/commands/tasks/${taskId}/log/follow?pos=${pos}`)
+  socket.binaryType = 'arraybuffer'
+  return socket
+}
+
 export interface Task {
   taskId: number
   commandId: number
   status: statusCode
   createdAt?: string
+  endedAt?: number
+  exitCode?: number
+  queuedAt?: number
+  waitTime?: number
+  priority?: number
   cmdline: string
-  logfile: string
+  logfile: string | null
+  /** 日志已压缩归档时为归档文件路径(原日志文件已删除) */
+  archive?: string | null
+  cached?: boolean
 }
 
 export interface TaskResult {
   lastUpdate: number
+  queueDepth?: number
   tasks: Task[]
 }
 
+export type TaskEvent =
+  | ({ type: 'snapshot'; seq: number } & TaskResult)
+  | { type: 'add' | 'update'; seq: number; task: Task }
+  | { type: 'remove'; seq: number; taskId: number }
+  | {
+      type: 'catalog'
+      seq: number
+      version: number
+      added: number[]
+      removed: number[]
+      changed: Record<string, CommandPatch>
+    }
+  | {
+      type: 'devices'
+      seq: number
+      version: number
+      devices: AdbDevice[]
+      added: string[]
+      removed: string[]
+      changed: string[]
+    }
+
 export async function getTasks(): Promise<TaskResult | undefined> {
   try {
     const res = await server.get('/adb/commands/tasks')
@@ -8,3 +8,20 @@ export async function sys_start(path:string){
   }
   return false
 }
+
+export interface FlameNode {
+  name: string
+  value: number
+  children: FlameNode[]
+}
+
+/**
+ * 采样分析服务进程, 返回 d3-flame-graph 使用的调用栈树
+ */
+export async function sys_profile(seconds: number = 5, idle: boolean = false): Promise<FlameNode> {
+  const res = await server.get('/sys/profile', {
+    params: { seconds, idle, format: 'json' },
+    timeout: (seconds + 10) * 1000,
+  })
+  return res.data
+}
@@ -1,7 +1,12 @@
 import { ref, computed } from 'vue'
 import { defineStore } from 'pinia'
 
-import { type Command, type CommandGroup, getCommands } from '@/api/commands/scriptsManager'
+import {
+  type Command,
+  type CommandGroup,
+  type CommandPatch,
+  getCommands,
+} from '@/api/commands/scriptsManager'
 
 export const useCommandStore = defineStore('commands', () => {
   const commandTree = ref<CommandGroup[]>([])
@@ -18,8 +23,9 @@ export const useCommandStore = defineStore('commands', () => {
   })
 
   function treeToMap() {
+    commandMap.clear()
     function iterGroup(grp: CommandGroup) {
-      for (const item of grp.children) {
+      for (const item of grp.children ?? []) {
         commandMap.set(item.id, item as Command)
         if (item.type == 'scriptgroup') {
           iterGroup(item)
@@ -41,6 +47,60 @@ export const useCommandStore = defineStore('commands', () => {
       console.log('Setting current command to first command in tree')
     }
   }
+  /**
+   * 按目录变化增量更新命令树(不重新获取整棵树)
+   * 父分组尚未加载(延迟加载的脚本包)的节点跳过, 展开时再获取
+   */
+  function applyCatalogPatch(changed: Record<string, CommandPatch>, removed: number[]) {
+    if (commandTree.value.length == 0) {
+      // 还没有获取过命令树
+      return updateCommandTree()
+    }
+    type Node = CommandGroup | Command
+    const nodes = new Map<number, { node: Node; siblings: Node[] }>()
+    function index(items: Node[]) {
+      for (const item of items) {
+        nodes.set(item.id, { node: item, siblings: items })
+        if (item.type == 'scriptgroup') {
+          index(item.children ?? [])
+        }
+      }
+    }
+    index(commandTree.value)
+
+    function detach(id: number) {
+      const found = nodes.get(id)
+      if (found) {
+        const i = found.siblings.indexOf(found.node)
+        if (i >= 0) found.siblings.splice(i, 1)
+        nodes.delete(id)
+      }
+      return found?.node
+    }
+
+    removed.forEach(detach)
+    const patches = Object.values(changed).sort((a, b) => a.order - b.order)
+    // 先全部摘下, 再按先序插入, 保证父分组与前一个兄弟节点已就位
+    const detached = new Map(patches.map((patch) => [patch.item.id, detach(patch.item.id)]))
+    for (const patch of patches) {
+      let siblings: Node[] | undefined = commandTree.value
+      if (patch.parent != null) {
+        const parent = nodes.get(patch.parent)?.node
+        siblings = parent?.type == 'scriptgroup' && !parent.lazy ? (parent.children ??= []) : undefined
+      }
+      if (!siblings) continue
+      const previous = detached.get(patch.item.id)
+      const node: Node = { ...patch.item }
+      if (node.type == 'scriptgroup' && previous?.type == 'scriptgroup') {
+        node.lazy = previous.lazy
+        node.children = previous.children
+      }
+      const after = patch.after == null ? undefined : nodes.get(patch.after)?.node
+      siblings.splice(after ? siblings.indexOf(after) + 1 : 0, 0, node)
+      nodes.set(node.id, { node, siblings })
+    }
+    treeToMap()
+  }
   function getCommand(id: number) {
     return commandMap.get(id)
   }
@@ -51,7 +111,7 @@ export const useCommandStore = defineStore('commands', () => {
       const ret = items.find((item) => {
         if (item.type == 'scriptgroup') {
           path.push(item.label)
-          if (itercmd(item.children)) {
+          if (itercmd(item.children ?? [])) {
             return true
           } else {
             path.pop()
@@ -76,6 +136,7 @@ export const useCommandStore = defineStore('commands', () => {
     commandTree,
     currentCommand,
     updateCommandTree,
+    applyCatalogPatch,
     currentSn,
     firstCommand,
     getCommandPath,
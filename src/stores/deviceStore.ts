@@ -0,0 +1,30 @@
+import { ref, computed } from 'vue'
+import { defineStore } from 'pinia'
+
+import { type AdbDevice, getDevices, toDev } from '@/api/adbDevice'
+
+export const useDeviceStore = defineStore('devices', () => {
+  const devices = ref<AdbDevice[]>([])
+  const error = ref<string | null>(null)
+  const version = ref(0)
+
+  const devInfoList = computed(() => devices.value.map(toDev))
+
+  async function updateDevices(refresh = false) {
+    try {
+      const res = await getDevices(refresh)
+      devices.value = res.devices
+      error.value = res.error
+      version.value = res.version
+    } catch (e) {
+      console.error('Failed to get devices:', e)
+    }
+  }
+
+  function setDevices(newDevices: AdbDevice[], newVersion: number) {
+    devices.value = newDevices
+    version.value = newVersion
+  }
+
+  return { devices, error, version, devInfoList, updateDevices, setDevices }
+})
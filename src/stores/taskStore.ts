@@ -1,12 +1,15 @@
 import { ref } from 'vue'
 import { defineStore } from 'pinia'
-import { getTasks, type Task, getSocket } from '@/api/commands/scriptsManager'
+import { getTasks, type Task, type TaskEvent, getSocket } from '@/api/commands/scriptsManager'
+import { useCommandStore } from '@/stores/commandStore'
+import { useDeviceStore } from '@/stores/deviceStore'
 
 const useTaskStore = defineStore('tasks', () => {
   const tasks = ref<Task[]>([])
   const currentTask = ref<Task | null>(null)
   const taskMap = ref<Map<number, Task>>(new Map())
   const lastUpdate = ref(0)
+  let seq = 0
   let socket: WebSocket | null = null
 
   async function updateTasks() {
@@ -55,25 +58,46 @@ const useTaskStore = defineStore('tasks', () => {
     }
 
     socket.addEventListener('message', ({ data }) => {
-      if (data === 'ping') {
-        // console.log('Received pong from server')
-        socket?.send('pong') // Send pong response
-        return
-      }
-
       try {
-        const newTasks = JSON.parse(data)
-        // console.log('Received WebSocket message:', newTasks);
+        const event: TaskEvent = JSON.parse(data)
 
-        if (newTasks?.lastUpdate != lastUpdate.value) {
-          console.log('Tasks updated:', newTasks)
-          lastUpdate.value = newTasks.lastUpdate
-          tasks.value = newTasks.tasks
-          console.log('Tasks updated:', tasks.value)
+        if (event.type === 'snapshot') {
+          seq = event.seq
+          lastUpdate.value = event.lastUpdate
+          tasks.value = event.tasks
           taskMap.value.clear()
-          newTasks.tasks.forEach((task: Task) => {
+          event.tasks.forEach((task: Task) => {
             taskMap.value.set(task.taskId, task)
           })
+          // 快照期间可能错过设备变化
+          useDeviceStore().updateDevices()
+          return
+        }
+
+        if (event.seq != seq + 1) {
+          // 丢失了增量, 请求全量快照
+          socket?.send('resync')
+          return
+        }
+        seq = event.seq
+        lastUpdate.value = Date.now() / 1000
+
+        if (event.type === 'catalog') {
+          // 脚本目录已重新加载, 任务不受影响, 按变化增量更新命令树
+          useCommandStore().applyCatalogPatch(event.changed, event.removed)
+        } else if (event.type === 'devices') {
+          useDeviceStore().setDevices(event.devices, event.version)
+        } else if (event.type === 'remove') {
+          taskMap.value.delete(event.taskId)
+          tasks.value = tasks.value.filter((task) => task.taskId != event.taskId)
+        } else {
+          const index = tasks.value.findIndex((task) => task.taskId == event.task.taskId)
+          if (index >= 0) {
+            tasks.value.splice(index, 1, event.task)
+          } else {
+            tasks.value.push(event.task)
+          }
+          taskMap.value.set(event.task.taskId, event.task)
         }
       } catch (error) {
         console.error('Error processing WebSocket message:', error)